@@ -1,16 +1,17 @@
 import os
 import time
-import random
-import hashlib
-from datetime import datetime
 
 from dotenv import load_dotenv
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from pymongo import MongoClient
-from geopy.distance import geodesic
 
 from model import HawkerCrowdPredictor
+from hawker_index import HawkerIndex
+from db_indexes import ensure_indexes
+from api_projections import ENDPOINT_FIELDS, build_projection, parse_fields
+from prediction_table import PredictionTable
+from forecast_cache import ForecastCache
 
 # Load environment variables
 load_dotenv()
@@ -21,9 +22,12 @@ CORS(app)  # Enable CORS for all routes
 
 # Initialize MongoDB connection
 mongo_uri = os.getenv("MONGO_DB", "mongodb://localhost:27017/")
-mongo_client = MongoClient(mongo_uri)
+mongo_client = MongoClient(mongo_uri, connect=False) # Connects on first use, so it is safe to fork after import
 db = mongo_client["hawkergo"]
 
+# Consistent mock predictions for when no model is available, shared with the predictor
+mock_engine = HawkerCrowdPredictor.mock_engine
+
 # Initialize HawkerCrowdPredictor
 lta_api_key = os.getenv("LTA_DATAMALL_API_KEY")
 model_path = "hawker_crowd_model.pkl"
@@ -41,53 +45,187 @@ except Exception as e:
     print(f"Error initializing predictor: {e}")
     predictor = None
 
+# Share the predictor's hawker center index, or keep one for the API's own queries
+if predictor is not None and predictor.hawker_index is not None:
+    hawker_index = predictor.hawker_index
+else:
+    hawker_index = HawkerIndex(db["hawker_centers"], max_age=float(os.getenv("HAWKER_INDEX_MAX_AGE", 300)))
+
+# Current predictions of every hawker center, recomputed once per minute or live feature refresh
+prediction_table = PredictionTable(predictor) if predictor is not None else None
+
+# Forecasts of the coming hours, precomputed for every hawker center after each live feature refresh
+forecast_hours = float(os.getenv("FORECAST_HOURS", 3))
+forecast_step = int(os.getenv("FORECAST_STEP", 15))
+forecast_cache = ForecastCache(predictor, maxsize=int(os.getenv("FORECAST_CACHE_SIZE", 20000))) if predictor is not None else None
+
+def create_indexes():
+    """Create the indexes the API's queries rely on, if they do not exist yet, migrating existing hawker centers to them.
+
+    Uses its own MongoDB connection, closed afterwards, so a multi-process server can call this
+    once before forking its workers without them inheriting an open connection.
+    """
+    try:
+        with MongoClient(mongo_uri, serverSelectionTimeoutMS=5000) as client:
+            ensure_indexes(client["hawkergo"])
+    except Exception as e:
+        print(f"Error creating MongoDB indexes: {e}")
+
+def start_background_tasks(indexes=True):
+    """Build the hawker center index and start the live feature refresher, creating the MongoDB indexes first.
+
+    Called on import, unless HAWKERGO_DEFER_STARTUP is set: a multi-process server imports the
+    API once before forking its workers, creates the indexes once, and calls this in each worker
+    with indexes=False, as the refresher's thread is not carried over a fork. Each worker then
+    polls LTA DataMall with its own refresher.
+
+    Args:
+        indexes (bool, optional): Whether to create the MongoDB indexes. Defaults to True.
+    """
+    if indexes:
+        create_indexes()
+
+    # Build the hawker center index up front so the first requests do not pay for it
+    try:
+        if predictor is not None:
+            predictor.load_bus_stop_index()
+        hawker_index.build()
+    except Exception as e:
+        print(f"Error building hawker center index, will retry on first use: {e}")
+
+    # Precompute live LTA features in the background, so predictions do not wait on LTA DataMall,
+    # and forecasts after each refresh, including the first one that runs as the refresher starts
+    if predictor is not None and os.getenv("LIVE_FEATURES", "true").lower() != "false":
+        listeners = [precompute_forecasts] if forecast_cache is not None else []
+        try:
+            predictor.start_live_feature_refresher(listeners=listeners)
+        except Exception as e:
+            print(f"Error starting live feature refresher, predictions will fetch live data: {e}")
+
+def precompute_forecasts():
+    """Forecast every hawker center for the coming hours, after the live features are refreshed."""
+    forecast_cache.precompute(forecast_hours, forecast_step)
+
+def reload_model():
+    """Load the model file again, e.g. after it was retrained.
+
+    The old model is kept if the new one cannot be loaded.
+
+    Returns:
+        bool: True if the model was reloaded, False otherwise.
+    """
+    if predictor is None or not os.path.exists(model_path):
+        return False
+    try:
+        predictor.load_model(model_path)
+        return True
+    except Exception as e:
+        print(f"Error reloading model, keeping the current one: {e}")
+        return False
+
+if not os.getenv("HAWKERGO_DEFER_STARTUP"):
+    start_background_tasks()
+
+def current_predictions():
+    """Get the current prediction snapshot, or None if predictions must be made by the predictor."""
+    if prediction_table is None:
+        return None
+    try:
+        return prediction_table.current()
+    except Exception as e:
+        print(f"Error computing prediction table: {e}")
+        return None
+
+def predict_crowds(hawker_ids):
+    """Predict crowd levels from the prediction table, using the predictor for hawker centers not in it."""
+    snapshot = current_predictions()
+    predictions = [snapshot.lookup(hawker_id) if snapshot is not None else None for hawker_id in hawker_ids]
+
+    missing = [hawker_id for hawker_id, prediction in zip(hawker_ids, predictions) if prediction is None]
+    if missing:
+        fallback = iter(predictor.predict_crowd_batch(missing))
+        predictions = [prediction if prediction is not None else next(fallback) for prediction in predictions]
+    return predictions
+
+def prediction_etag(hawker_id):
+    """Get the ETag of a hawker center's prediction, or None if it is not served from the prediction table.
+
+    The ETag is weak, as the response's timestamp changes while the prediction does not.
+    """
+    snapshot = current_predictions()
+    if snapshot is None or snapshot.lookup(hawker_id) is None:
+        return None
+    return f"{snapshot.etag}-{hawker_id}"
+
+def not_modified(etag, weak=False):
+    """Get an empty 304 response for a conditional GET whose If-None-Match matches etag, or None."""
+    if etag is None:
+        return None
+    matches = request.if_none_match.contains_weak(etag) if weak else request.if_none_match.contains(etag)
+    if not matches:
+        return None
+    response = app.response_class(status=304)
+    response.set_etag(etag, weak=weak)
+    return response
+
 @app.route('/api/hawkers', methods=['GET'])
 def get_hawkers():
-    """Get all hawker centers or filter by postal code."""
+    """Get all hawker centers or filter by postal code.
+
+    Only the summary fields are returned unless others are listed in `fields`,
+    e.g. ?fields=id,displayName,bus_stops.
+    """
     postal_code = request.args.get('postal_code')
+    try:
+        projection = build_projection(parse_fields(request.args.get('fields'), ENDPOINT_FIELDS["hawkers"]))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     if postal_code:
         # Filter hawkers by postal code prefix (first 2 digits)
         postal_prefix = postal_code[:2] if len(postal_code) >= 2 else postal_code
         query = {"postal_code": {"$regex": f"^{postal_prefix}"}}
-        hawkers = list(db["hawker_centers"].find(query, {"_id": 0}))
+        hawkers = list(db["hawker_centers"].find(query, projection))
     else:
         # Get all hawkers
-        hawkers = list(db["hawker_centers"].find({}, {"_id": 0}))
+        hawkers = list(db["hawker_centers"].find({}, projection))
 
     return jsonify(hawkers)
 
 @app.route('/api/hawkers/nearby', methods=['GET'])
 def get_nearby_hawkers():
-    """Get hawker centers near a given location."""
+    """Get hawker centers near a given location.
+
+    Only the summary fields and distance are returned unless others are listed in `fields`.
+    """
     try:
         latitude = float(request.args.get('latitude'))
         longitude = float(request.args.get('longitude'))
         radius = float(request.args.get('radius', 2000))  # Default 2km radius
     except (TypeError, ValueError):
         return jsonify({"error": "Invalid location parameters"}), 400
+    try:
+        projection = build_projection(parse_fields(request.args.get('fields'), ENDPOINT_FIELDS["nearby_hawkers"]),
+                                      include_id=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    # Get all hawkers
-    hawkers = list(db["hawker_centers"].find({}, {"_id": 0}))
-
-    # Calculate distance and filter by radius
-    nearby_hawkers = []
-    for hawker in hawkers:
-        hawker_lat = hawker.get('latitude')
-        hawker_lng = hawker.get('longitude')
-
-        if hawker_lat is not None and hawker_lng is not None:
-            distance = geodesic(
-                (latitude, longitude),
-                (hawker_lat, hawker_lng)
-            ).meters
+    # Find hawkers within the radius using the in-memory spatial index, nearest first
+    nearby = hawker_index.nearby(latitude, longitude, radius)
 
-            if distance <= radius:
-                hawker['distance'] = round(distance)
-                nearby_hawkers.append(hawker)
+    # Only fetch the documents of the hawkers found
+    hawkers = {
+        str(hawker.pop("_id")): hawker
+        for hawker in db["hawker_centers"].find(
+            {"_id": {"$in": [descriptor.document_id for descriptor, _ in nearby]}}, projection)
+    }
 
-    # Sort by distance
-    nearby_hawkers.sort(key=lambda x: x.get('distance', float('inf')))
+    nearby_hawkers = []
+    for descriptor, distance in nearby:
+        hawker = hawkers.get(descriptor.object_id)
+        if hawker is not None:
+            hawker['distance'] = round(distance)
+            nearby_hawkers.append(hawker)
 
     return jsonify(nearby_hawkers)
 
@@ -98,17 +236,83 @@ def get_hawker_crowd(hawker_id):
         return jsonify({"error": "Predictor not initialized"}), 500
         
     try:
-        level, confidence = predictor.predict_crowd(hawker_id)
-        return jsonify({
+        etag = prediction_etag(hawker_id)
+        cached = not_modified(etag, weak=True)
+        if cached is not None:
+            return cached
+
+        level, confidence = predict_crowds([hawker_id])[0]
+        response = jsonify({
             "hawker_id": hawker_id,
             "crowd_level": level,
             "confidence": confidence,
-            "timestamp": time.time()
+            "timestamp": time.time(),
+            "features_as_of": predictor.live_features_as_of()
         })
+        if etag is not None:
+            response.set_etag(etag, weak=True)
+        return response
     except Exception as e:
         print(f"Error predicting crowd for hawker {hawker_id}: {e}")
         return jsonify({"error": str(e)}), 500
 
+def parse_forecast_window():
+    """Parse the hours and step query parameters of the forecast endpoints."""
+    hours = float(request.args.get('hours', forecast_hours))
+    step = int(request.args.get('step', forecast_step))
+    if not 0 <= hours <= 24 or not 1 <= step <= 240:
+        raise ValueError("Expected 0 <= hours <= 24 and 1 <= step <= 240")
+    return hours, step
+
+@app.route('/api/hawkers/<hawker_id>/forecast', methods=['GET'])
+def get_hawker_forecast(hawker_id):
+    """Get the crowd forecast of a hawker center for the coming hours, e.g. ?hours=3&step=15."""
+    if predictor is None or predictor.model is None:
+        return jsonify({"error": "Predictor not initialized"}), 500
+    try:
+        hours, step = parse_forecast_window()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid forecast parameters: {e}"}), 400
+
+    try:
+        forecasts = forecast_cache.forecast([hawker_id], hours=hours, step=step)[hawker_id]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+
+    return jsonify({
+        "hawker_id": hawker_id,
+        "forecast": [{
+            "time": forecast.time.isoformat(),
+            "crowd_level": forecast.crowd_level,
+            "confidence": forecast.confidence
+        } for forecast in forecasts],
+        "features_as_of": predictor.live_features_as_of()
+    })
+
+@app.route('/api/hawkers/<hawker_id>/best-time', methods=['GET'])
+def get_best_time(hawker_id):
+    """Get the least crowded time to visit a hawker center in the coming hours, e.g. ?hours=3."""
+    if predictor is None or predictor.model is None:
+        return jsonify({"error": "Predictor not initialized"}), 500
+    try:
+        hours, step = parse_forecast_window()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid forecast parameters: {e}"}), 400
+
+    try:
+        best = forecast_cache.best_time(hawker_id, hours=hours, step=step)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+
+    return jsonify({
+        "hawker_id": hawker_id,
+        "best_time": best.time.isoformat(),
+        "crowd_level": best.crowd_level,
+        "confidence": best.confidence,
+        "hours": hours,
+        "features_as_of": predictor.live_features_as_of()
+    })
+
 @app.route('/api/hawkers/batch-crowd', methods=['POST'])
 def get_batch_crowd():
     """Get crowd level predictions for multiple hawker centers."""
@@ -123,30 +327,34 @@ def get_batch_crowd():
     hawker_ids = data.get('hawker_ids', [])
     results = []
 
-    for hawker_id in hawker_ids:
-        try:
-            # Get hawker name if available
-            hawker = db["hawker_centers"].find_one({"id": hawker_id})
-            hawker_name = hawker.get("displayName", "Unknown") if hawker else "Unknown"
-            
-            level, confidence = predictor.predict_crowd(hawker_id)
+    try:
+        # Get hawker names if available
+        hawker_names = {
+            hawker.get("id"): hawker.get("displayName", "Unknown")
+            for hawker in db["hawker_centers"].find(
+                {"id": {"$in": hawker_ids}}, build_projection(ENDPOINT_FIELDS["batch_crowd"]))
+        }
+
+        predictions = predict_crowds(hawker_ids)
+        for hawker_id, (level, confidence) in zip(hawker_ids, predictions):
             results.append({
                 "hawker_id": hawker_id,
-                "hawker_name": hawker_name,
+                "hawker_name": hawker_names.get(hawker_id, "Unknown"),
                 "crowd_level": level,
                 "confidence": confidence
             })
-        except Exception as e:
-            print(f"Error predicting for hawker {hawker_id}: {str(e)}")
-            results.append({
-                "hawker_id": hawker_id,
-                "hawker_name": "Unknown",
-                "error": str(e)
-            })
+    except Exception as e:
+        print(f"Error predicting for hawkers {hawker_ids}: {str(e)}")
+        results = [{
+            "hawker_id": hawker_id,
+            "hawker_name": "Unknown",
+            "error": str(e)
+        } for hawker_id in hawker_ids]
 
     return jsonify({
         "results": results,
-        "timestamp": time.time()
+        "timestamp": time.time(),
+        "features_as_of": predictor.live_features_as_of()
     })
 
 @app.route('/api/postal-codes', methods=['GET'])
@@ -166,165 +374,98 @@ def predict_crowd(hawker_id):
     """Get crowd level prediction for a hawker center (endpoint for mlService.js)."""
     if predictor is None:
         # Use consistent mock prediction strategy
-        # Import everything upfront before any operations
-        import random
-        import hashlib
-        import time as time_module
-
-        # Create hash-based seed for consistent randomness
-        hash_obj = hashlib.md5(hawker_id.encode())
-        hash_int = int(hash_obj.hexdigest(), 16)
-        random.seed(hash_int)
-
-        # Levels and their probabilities
-        levels = ['Low', 'Medium', 'High']
-        level_weights = [0.4, 0.4, 0.2]  # More low and medium, less high
-
-        # Get current time for context-aware prediction
-        now = datetime.now()
-        hour = now.hour
-        weekday = now.weekday()
-        is_weekend = weekday >= 5
-
-        # Adjust prediction based on time of day
-        if is_weekend and (11 <= hour <= 14 or 17 <= hour <= 20):
-            # Weekend lunch/dinner - more likely to be high
-            level_weights = [0.1, 0.3, 0.6]
-        elif not is_weekend and (11 <= hour <= 14):
-            # Weekday lunch - medium to high
-            level_weights = [0.2, 0.5, 0.3]
-        elif 17 <= hour <= 20:
-            # Dinner time - more medium
-            level_weights = [0.2, 0.6, 0.2]
-
-        # Choose level based on weighted random selection
-        level = random.choices(levels, weights=level_weights)[0]
-
-        # Generate consistent confidence based on hawker ID
-        confidence = 0.5 + (hash_int % 50) / 100.0  # 0.5 to 1.0
-
+        level, confidence = mock_engine.predict(hawker_id)
         return jsonify({
             "hawker_id": hawker_id,
             "crowd_level": level,
             "confidence": confidence,
-            "timestamp": time_module.time(),
+            "timestamp": time.time(),
             "source": "mock_prediction"
         })
 
     try:
-        level, confidence = predictor.predict_crowd(hawker_id)
-        return jsonify({
+        etag = prediction_etag(hawker_id)
+        cached = not_modified(etag, weak=True)
+        if cached is not None:
+            return cached
+
+        level, confidence = predict_crowds([hawker_id])[0]
+        response = jsonify({
             "hawker_id": hawker_id,
             "crowd_level": level,
             "confidence": confidence,
-            "timestamp": time.time()
+            "timestamp": time.time(),
+            "features_as_of": predictor.live_features_as_of()
         })
+        if etag is not None:
+            response.set_etag(etag, weak=True)
+        return response
     except Exception as e:
         print(f"Error predicting crowd for hawker {hawker_id}: {e}")
 
         # Fallback to consistent mock prediction
-        # Reusing the mock prediction logic from above
-        import random
-        import hashlib
-        import time as time_module
-
-        # Create hash-based seed for consistent randomness
-        hash_obj = hashlib.md5(hawker_id.encode())
-        hash_int = int(hash_obj.hexdigest(), 16)
-        random.seed(hash_int)
-
-        # Levels and their probabilities
-        levels = ['Low', 'Medium', 'High']
-        level_weights = [0.4, 0.4, 0.2]  # More low and medium, less high
-
-        # Get current time for context-aware prediction
-        now = datetime.now()
-        hour = now.hour
-        weekday = now.weekday()
-        is_weekend = weekday >= 5
-
-        # Adjust prediction based on time of day
-        if is_weekend and (11 <= hour <= 14 or 17 <= hour <= 20):
-            # Weekend lunch/dinner - more likely to be high
-            level_weights = [0.1, 0.3, 0.6]
-        elif not is_weekend and (11 <= hour <= 14):
-            # Weekday lunch - medium to high
-            level_weights = [0.2, 0.5, 0.3]
-        elif 17 <= hour <= 20:
-            # Dinner time - more medium
-            level_weights = [0.2, 0.6, 0.2]
-
-        # Choose level based on weighted random selection
-        level = random.choices(levels, weights=level_weights)[0]
-
-        # Generate consistent confidence based on hawker ID
-        confidence = 0.5 + (hash_int % 50) / 100.0  # 0.5 to 1.0
-
+        level, confidence = mock_engine.predict(hawker_id)
         return jsonify({
             "hawker_id": hawker_id,
             "crowd_level": level,
             "confidence": confidence,
-            "timestamp": time_module.time(),
+            "timestamp": time.time(),
             "source": "error_fallback"
         })
 
 @app.route('/predict/all', methods=['GET'])
 def predict_all_crowds():
-    """Get crowd level predictions for all hawker centers."""
+    """Get crowd level predictions for all hawker centers.
+
+    Served from the prediction table when it is available, with an ETag so clients
+    polling with If-None-Match get an empty 304 until the predictions change.
+    """
+    snapshot = current_predictions()
+    if snapshot is not None:
+        cached = not_modified(snapshot.etag)
+        if cached is not None:
+            return cached
+        response = app.response_class(snapshot.all_body(), mimetype='application/json')
+        response.set_etag(snapshot.etag)
+        return response
+
     try:
-        # Get all hawker centers
-        hawkers = list(db["hawker_centers"].find())
+        # Get all hawker centers, reading only their ids and names
+        hawkers = list(db["hawker_centers"].find({}, build_projection(ENDPOINT_FIELDS["predict_all"], include_id=True)))
         if not hawkers:
             # If no hawkers found, return a mock empty response
             return jsonify([])
 
-        results = []
-
-        for hawker in hawkers:
-            # Use either '_id' or 'id' field based on what's available
-            hawker_id = str(hawker.get("_id", hawker.get("id", "")))
-            if not hawker_id:
-                continue
+        # Use either '_id' or 'id' field based on what's available
+        hawkers = [hawker for hawker in hawkers if str(hawker.get("_id", hawker.get("id", "")))]
+        hawker_ids = [str(hawker.get("_id", hawker.get("id", ""))) for hawker in hawkers]
 
+        features_as_of = None
+        if predictor is not None:
             try:
-                if predictor is not None:
-                    level, confidence = predictor.predict_crowd(hawker_id)
-                    results.append({
-                        "hawker_id": hawker_id,
-                        "hawker_name": hawker.get("displayName", "Unknown"),
-                        "crowd_level": level,
-                        "confidence": confidence
-                    })
-                else:
-                    # Mock prediction if predictor isn't available
-                    import random
-                    levels = ['Low', 'Medium', 'High']
-                    random_level = levels[random.randint(0, 2)]
-                    random_confidence = 0.5 + (random.random() * 0.4)
-                    
-                    results.append({
-                        "hawker_id": hawker_id,
-                        "hawker_name": hawker.get("displayName", "Unknown"),
-                        "crowd_level": random_level,
-                        "confidence": random_confidence,
-                        "source": "mock_prediction"
-                    })
+                # Hawker centers whose prediction failed are tagged with their mock fallback's source
+                predictions = predictor.predict_crowd_batch(hawker_ids, with_sources=True)
+                features_as_of = predictor.live_features_as_of()
             except Exception as e:
-                print(f"Error predicting for hawker {hawker_id}: {str(e)}")
-                
-                # Generate mock data instead of error
-                import random
-                levels = ['Low', 'Medium', 'High']
-                random_level = levels[random.randint(0, 2)]
-                random_confidence = 0.5 + (random.random() * 0.4)
-                
-                results.append({
-                    "hawker_id": hawker_id,
-                    "hawker_name": hawker.get("displayName", "Unknown"),
-                    "crowd_level": random_level,
-                    "confidence": random_confidence,
-                    "source": "error_fallback"
-                })
+                print(f"Error predicting for all hawkers: {str(e)}")
+                predictions = [(*prediction, "error_fallback") for prediction in mock_engine.predict_batch(hawker_ids)]
+        else:
+            # Generate consistent mock data instead of error
+            predictions = [(*prediction, "mock_prediction") for prediction in mock_engine.predict_batch(hawker_ids)]
+
+        results = []
+        for hawker, hawker_id, (level, confidence, source) in zip(hawkers, hawker_ids, predictions):
+            result = {
+                "hawker_id": hawker_id,
+                "hawker_name": hawker.get("displayName", "Unknown"),
+                "crowd_level": level,
+                "confidence": confidence
+            }
+            if source:
+                result["source"] = source
+            else:
+                result["features_as_of"] = features_as_of
+            results.append(result)
 
         return jsonify(results)
     except Exception as e:
@@ -339,6 +480,9 @@ def update_mappings():
         mappings = request.get_json()
         # Here you could implement storing the mappings in MongoDB
         # For now, we'll just acknowledge receipt
+
+        # Hawker center data may have changed, so rebuild the index on next use
+        hawker_index.invalidate()
         return jsonify({
             "status": "success",
             "message": "Mappings received",
@@ -347,6 +491,17 @@ def update_mappings():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/stats/cache', methods=['GET'])
+def get_cache_stats():
+    """Get hit/miss statistics of the predictor's LTA data caches and prediction table."""
+    if predictor is None:
+        return jsonify({"error": "Predictor not initialized"}), 500
+
+    stats = predictor.cache_stats()
+    stats["predictions"] = prediction_table.stats()
+    stats["forecasts"] = forecast_cache.stats()
+    return jsonify(stats)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """API health check endpoint."""
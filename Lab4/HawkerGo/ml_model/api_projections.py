@@ -0,0 +1,58 @@
+""" Contains the fields of hawker center documents returned by each API endpoint. """
+
+# Top-level fields of a hawker center document that clients may ask for
+HAWKER_FIELDS = ("id", "displayName", "latitude", "longitude", "postal_code", "bus_stops", "carparks", "location")
+
+# Fields returned by default; bus_stops and carparks make up most of each document
+SUMMARY_FIELDS = ("id", "displayName", "latitude", "longitude", "postal_code")
+
+# The fields each endpoint reads from MongoDB by default
+ENDPOINT_FIELDS = {
+    "hawkers": SUMMARY_FIELDS,
+    "nearby_hawkers": SUMMARY_FIELDS,
+    "batch_crowd": ("id", "displayName"),
+    "predict_all": ("id", "displayName"),
+}
+
+def parse_fields(value: str | None, default: tuple) -> tuple:
+    """Parses the `fields` query parameter, e.g. "id,displayName,bus_stops.displayName".
+
+    Subfields of embedded arrays can be requested with dotted names.
+
+    Args:
+        value (str | None): The comma-separated field names, or None to use the default.
+        default (tuple): The fields returned when value is None or empty.
+
+    Returns:
+        tuple: The field names, in the order given.
+
+    Raises:
+        ValueError: If any field is not a field of hawker center documents.
+    """
+    if not value:
+        return default
+
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(",") if field.strip()))
+    unknown = [field for field in fields if field.split(".")[0] not in HAWKER_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available fields: {', '.join(HAWKER_FIELDS)}")
+    return fields or default
+
+def build_projection(fields: tuple, include_id: bool = False) -> dict:
+    """Builds a MongoDB projection returning only the given fields.
+
+    Args:
+        fields (tuple): The field names, which may be dotted.
+        include_id (bool, optional): Whether to return `_id`, which cannot be serialized
+            to JSON as is. Defaults to False.
+
+    Returns:
+        dict: The projection.
+    """
+    projection = {field: 1 for field in fields}
+    # A parent field already returns its subfields, and MongoDB rejects projecting both
+    for field in fields:
+        if "." in field and field.split(".")[0] in projection:
+            del projection[field]
+    projection["_id"] = 1 if include_id else 0
+    return projection
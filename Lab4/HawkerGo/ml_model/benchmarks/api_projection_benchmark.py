@@ -0,0 +1,55 @@
+""" Compares the response size and latency of the API endpoints with and without their projections.
+
+Runs the Flask app in process against the MongoDB configured in MONGO_DB, so the
+numbers include reading and decoding the documents but not the network to the client.
+Each endpoint is timed with its default fields, and with every field requested
+through `fields=`, which is what the endpoints returned before they were trimmed.
+
+Usage:
+    python benchmarks/api_projection_benchmark.py [requests]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import app, db
+from api_projections import HAWKER_FIELDS
+
+ALL_FIELDS = ",".join(field for field in HAWKER_FIELDS if field != "location")
+
+def run(client, label, url, total):
+    latencies = []
+    size = 0
+    for _ in range(total):
+        start = time.perf_counter()
+        response = client.get(url)
+        latencies.append(time.perf_counter() - start)
+        size = len(response.data)
+
+    latencies.sort()
+    print(f"{label:<34} {size / 1024:9.1f} KB   "
+          f"p50 {latencies[len(latencies) // 2] * 1000:7.2f} ms   "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.2f} ms")
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    # Search around a stored hawker center, so the nearby endpoint has results
+    center = db["hawker_centers"].find_one({"latitude": {"$ne": None}}, {"latitude": 1, "longitude": 1}) or {}
+    nearby = f"/api/hawkers/nearby?latitude={center.get('latitude', 1.3)}&longitude={center.get('longitude', 103.8)}&radius=5000"
+
+    client = app.test_client()
+    print(f"{db['hawker_centers'].estimated_document_count()} hawker centers, {total} requests per endpoint")
+    run(client, "/api/hawkers (all fields)", f"/api/hawkers?fields={ALL_FIELDS}", total)
+    run(client, "/api/hawkers", "/api/hawkers", total)
+    run(client, "/api/hawkers?postal_code (all)", f"/api/hawkers?postal_code=06&fields={ALL_FIELDS}", total)
+    run(client, "/api/hawkers?postal_code", "/api/hawkers?postal_code=06", total)
+    run(client, "/api/hawkers/nearby (all fields)", f"{nearby}&fields={ALL_FIELDS}", total)
+    run(client, "/api/hawkers/nearby", nearby, total)
+    run(client, "/predict/all", "/predict/all", total)
+
+if __name__ == "__main__":
+    main()
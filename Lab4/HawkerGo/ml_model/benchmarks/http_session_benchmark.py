@@ -0,0 +1,77 @@
+""" Compares one-off requests against the pooled session used by the API clients.
+
+Starts a local HTTP/1.1 stub that answers like LTA DataMall, so the numbers only
+measure connection handling and not the network or the API itself.
+
+Usage:
+    python benchmarks/http_session_benchmark.py [requests] [threads]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lta_datamall import LTADataMallClient, LTADataMallEndpoints
+
+RESPONSE_BODY = json.dumps({"value": [{"CarParkID": str(i), "AvailableLots": i} for i in range(50)]}).encode()
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keeps connections open between requests
+    disable_nagle_algorithm = True # Otherwise delayed ACKs stall each kept-alive response by ~40 ms
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE_BODY)))
+        self.end_headers()
+        self.wfile.write(RESPONSE_BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+def run(label, send, total, threads):
+    latencies = []
+    def timed():
+        start = time.perf_counter()
+        send()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(timed) for _ in range(total)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{label:<24} {total / elapsed:8.0f} req/s   "
+          f"p50 {latencies[len(latencies) // 2] * 1000:6.2f} ms   "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms")
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/"
+    url = base_url + LTADataMallEndpoints.CARPARK_AVAILABILITY.value
+
+    client = LTADataMallClient("benchmark", base_url=base_url, pool_size=threads)
+
+    print(f"{total} requests over {threads} threads")
+    run("requests.get", lambda: requests.get(url, headers={"AccountKey": "benchmark"}).json(), total, threads)
+    run("LTADataMallClient", lambda: client.fetch(LTADataMallEndpoints.CARPARK_AVAILABILITY), total, threads)
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+""" Load tests a running API server, e.g. to compare `api.py` against `main.py serve`.
+
+Sends GET requests to one path over a pool of keep-alive sessions and reports the
+throughput and latency percentiles.
+
+Usage:
+    python benchmarks/serve_load_benchmark.py [url] [requests] [threads]
+
+Example:
+    python main.py serve --workers 4 --threads 8 &
+    python benchmarks/serve_load_benchmark.py http://127.0.0.1:5000/health 5000 32
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+def run(label, url, total, threads):
+    sessions = threading.local() # One keep-alive session per client thread
+    latencies = []
+    errors = []
+
+    def timed():
+        session = getattr(sessions, "session", None)
+        if session is None:
+            session = sessions.session = requests.Session()
+        start = time.perf_counter()
+        response = session.get(url)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            errors.append(response.status_code)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(timed) for _ in range(total)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{label:<24} {total / elapsed:8.0f} req/s   "
+          f"p50 {latencies[len(latencies) // 2] * 1000:6.2f} ms   "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms   "
+          f"errors {len(errors)}")
+
+def main():
+    url = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:5000/health"
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+
+    requests.get(url) # Warm up the server before timing
+    print(f"{total} requests over {threads} threads")
+    run(url.split("/", 3)[-1] or "/", url, total, threads)
+
+if __name__ == "__main__":
+    main()
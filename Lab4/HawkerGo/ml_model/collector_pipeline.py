@@ -0,0 +1,123 @@
+""" Contains a staged, multi-threaded pipeline for enriching hawker centers one by one. """
+
+import queue
+import threading
+import time
+from typing import Callable, NamedTuple
+
+class RateLimiter:
+    ''' Spaces out calls so that at most `rate` of them start per second, across all threads. '''
+
+    def __init__(self, rate: float):
+        if rate <= 0:
+            raise ValueError("Parameter 'rate' must be positive.")
+
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self):
+        """Blocks until the calling thread may make its call."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        time.sleep(start - now)
+
+class Stage(NamedTuple):
+    '''A step of the pipeline, run on its own pool of worker threads.'''
+
+    name: str
+    function: Callable # Takes an item and returns it, enriched, for the next stage
+    workers: int = 1
+    rate_limit: float = None # Calls per second across the stage's workers, or None for no limit
+
+class Pipeline:
+    ''' Passes items through a sequence of stages, each with its own worker pool and limits.
+
+    Items flow between stages through bounded queues, so a slow stage (such as a rate-limited
+    geocoder) holds back the stages before it instead of buffering every item, while the
+    stages after it process the items it has finished. An item whose stage function raises
+    an exception is logged and dropped.
+    '''
+
+    _DONE = object() # Tells a worker that no more items will arrive
+
+    def __init__(self, stages: list[Stage], queue_size: int = 16):
+        """Initializes the pipeline.
+
+        Args:
+            stages (list[Stage]): The stages, in the order items pass through them.
+            queue_size (int, optional): The number of items waiting for each stage at most.
+                Defaults to 16.
+        """
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage.")
+
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats = {stage.name: {"completed": 0, "failed": 0, "busy_seconds": 0.0} for stage in stages}
+        self._stats_lock = threading.Lock()
+
+    def _work(self, position: int, queues: list[queue.Queue], results: dict, limiter: RateLimiter):
+        stage = self.stages[position]
+        stats = self.stats[stage.name]
+        while True:
+            entry = queues[position].get()
+            if entry is self._DONE:
+                return
+
+            index, item = entry
+            if limiter is not None:
+                limiter.wait()
+
+            start = time.perf_counter()
+            try:
+                item = stage.function(item)
+                failed = False
+            except Exception as e:
+                print(f"Error in stage '{stage.name}' for item {index}: {e}")
+                failed = True
+
+            with self._stats_lock:
+                stats["busy_seconds"] += time.perf_counter() - start
+                stats["failed" if failed else "completed"] += 1
+                if not failed and position == len(self.stages) - 1:
+                    results[index] = item
+
+            if not failed and position < len(self.stages) - 1:
+                queues[position + 1].put((index, item))
+
+    def run(self, items) -> list:
+        """Passes every item through the pipeline, blocking until all of them are done.
+
+        Returns:
+            list: The items that made it through every stage, in their original order.
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results = {}
+        pools = []
+        for position, stage in enumerate(self.stages):
+            limiter = RateLimiter(stage.rate_limit) if stage.rate_limit else None
+            pool = [
+                threading.Thread(target=self._work,
+                                 args=(position, queues, results, limiter),
+                                 name=f"pipeline-{stage.name}-{i}",
+                                 daemon=True)
+                for i in range(stage.workers)
+            ]
+            for thread in pool:
+                thread.start()
+            pools.append(pool)
+
+        for index, item in enumerate(items):
+            queues[0].put((index, item))
+
+        # Shut the stages down in order, once every item has left the stage before
+        for position, pool in enumerate(pools):
+            for _ in pool:
+                queues[position].put(self._DONE)
+            for thread in pool:
+                thread.join()
+
+        return [results[index] for index in sorted(results)]
@@ -1,14 +1,22 @@
 import os
 import csv
 import json
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+import numpy as np
 from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
 
 # Import your existing modules
-from hawker_finder import HawkerInfoFinder, HawkerInfo
-from lta_datamall import LTADataMallClient, LTADataMallEndpoints
+from hawker_finder import HawkerInfoFinder, HawkerInfo, NearbySearchCache
+from lta_datamall import LTADataMallClient, LTADataMallEndpoints, BusStopIndex, BUS_STOP_CODE_PATTERN
+from geo import GridIndex, PostalCodeIndex, DEFAULT_TABLE_PATH, haversine_distances
+from collector_pipeline import Pipeline, RateLimiter, Stage
+from db_indexes import location_of
 
 def init_mongodb_connection():
     """Initialize MongoDB connection"""
@@ -45,69 +53,83 @@ def collect_hawker_centers(api_key, amount=100):
     print(f"Found {len(all_hawkers)} hawker centers")
     return all_hawkers
 
-def get_postal_code(latitude, longitude, geolocator):
-    """Get postal code from latitude and longitude"""
+def get_postal_code(latitude, longitude, geolocator, postal_code_index=None, rate_limiter=None):
+    """Get postal code from latitude and longitude
+    
+    If a PostalCodeIndex is given, it is looked up first and the geocoder is only
+    called for locations it does not know; postal codes found that way are added
+    to it. A RateLimiter can be given to throttle the geocoder calls only.
+    """
+    if postal_code_index is not None:
+        postal_code = postal_code_index.lookup(latitude, longitude)
+        if postal_code is not None:
+            return postal_code
+    
     try:
+        if rate_limiter is not None:
+            rate_limiter.wait()
         location = geolocator.reverse((latitude, longitude), exactly_one=True)
         address = location.raw.get('address', {})
-        return address.get('postcode')
+        postal_code = address.get('postcode')
     except Exception as e:
         print(f"Error getting postal code: {e}")
         return None
+    
+    if postal_code and postal_code_index is not None:
+        postal_code_index.add(postal_code, latitude, longitude)
+    return postal_code
 
-def collect_nearby_bus_stops(lta_client, hawker_info, finder, radius=500):
-    """Collect nearby bus stops using HawkerInfoFinder and validate with LTA API"""
+def collect_nearby_bus_stops(lta_client, hawker_info, finder, radius=500, bus_stop_index=None):
+    """Collect nearby bus stops using HawkerInfoFinder and validate with LTA API
+    
+    Pass a BusStopIndex built from the LTA BusStops feed as bus_stop_index to reuse
+    one download across hawker centers; otherwise the feed is downloaded for this call.
+    """
     # Get bus stops from Google Places API
     google_bus_stops = finder.findNearbyBusStops(hawker_info, radius=radius)
     
     # Get all bus stops from LTA DataMall for validation and enrichment
-    try:
-        lta_bus_stops_data = lta_client.fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1)
-        lta_bus_stops = lta_bus_stops_data.get('value', [])
-    except Exception as e:
-        print(f"Error fetching LTA bus stops: {e}")
-        lta_bus_stops = []
+    if bus_stop_index is None:
+        try:
+            bus_stop_index = BusStopIndex.from_client(lta_client)
+        except Exception as e:
+            print(f"Error fetching LTA bus stops: {e}")
+            bus_stop_index = BusStopIndex([])
+    
+    # Distances from the hawker center to every Google bus stop in a single array operation
+    google_coordinates = np.array(
+        [(bus_stop.get("latitude", np.nan), bus_stop.get("longitude", np.nan)) for bus_stop in google_bus_stops],
+        dtype=float
+    ).reshape(-1, 2)
+    hawker_distances = haversine_distances(hawker_info.latitude, hawker_info.longitude,
+                                           google_coordinates[:, 0], google_coordinates[:, 1],
+                                           ellipsoidal=True)
     
     # Extract bus stop codes from Google bus stop names using regex
-    import re
     valid_bus_stops = []
     
-    for bus_stop in google_bus_stops:
+    for i, bus_stop in enumerate(google_bus_stops):
         try:
             bus_stop_name = bus_stop["displayName"]
             # Look for 5-digit bus stop codes in the name
-            code_match = re.search(r'\b(\d{5})\b', bus_stop_name)
-            bus_stop_code = code_match.group(1) if code_match else None
+            code_match = BUS_STOP_CODE_PATTERN.search(bus_stop_name)
+            bus_stop_code = code_match.group() if code_match else None
             
             # Calculate distance from hawker center
-            distance = geodesic(
-                (hawker_info.latitude, hawker_info.longitude),
-                (bus_stop["latitude"], bus_stop["longitude"])
-            ).meters
+            distance = float(hawker_distances[i])
             
             # Find matching LTA bus stop data to enrich our information
             lta_match = None
             if bus_stop_code:
                 # Direct code match
-                lta_match = next((bs for bs in lta_bus_stops if bs.get('BusStopCode') == bus_stop_code), None)
+                lta_match = bus_stop_index.get(bus_stop_code)
             
             if not lta_match:
                 # Try location-based matching if no code match found
-                for lta_stop in lta_bus_stops:
-                    try:
-                        lta_lat = float(lta_stop.get('Latitude', 0))
-                        lta_lng = float(lta_stop.get('Longitude', 0))
-                        
-                        # If coordinates are within 50m, consider it a match
-                        if geodesic(
-                            (lta_lat, lta_lng),
-                            (bus_stop["latitude"], bus_stop["longitude"])
-                        ).meters < 50:
-                            lta_match = lta_stop
-                            bus_stop_code = lta_stop.get('BusStopCode')
-                            break
-                    except (ValueError, TypeError):
-                        continue
+                # If coordinates are within 50m, consider it a match
+                lta_match, _ = bus_stop_index.nearest(bus_stop["latitude"], bus_stop["longitude"], max_distance=50)
+                if lta_match:
+                    bus_stop_code = lta_match.get('BusStopCode')
             
             # Create enhanced bus stop record with combined data
             enhanced_bus_stop = {
@@ -140,66 +162,172 @@ def collect_nearby_bus_stops(lta_client, hawker_info, finder, radius=500):
     
     return valid_bus_stops
 
-def collect_nearby_carparks(lta_client, hawker_info, radius=500):
-    """Find nearby carparks using LTA DataMall API"""
-    try:
-        # Fetch all carparks
-        carpark_data = lta_client.fetch(
-            LTADataMallEndpoints.CARPARK_AVAILABILITY,
-            amount=-1  # Get all available carparks
-        )
-        
-        nearby_carparks = []
+def associate_carparks(hawker_infos, carpark_records, radius=500, batch_size=500):
+    """Find the carparks near every hawker center in one pass over the carpark feed.
+
+    The carpark records are consumed as a stream, one batch at a time: each batch is
+    bucketed into a spatial grid, and each hawker center is then matched against the
+    grid cells around it only. Only one batch and the matches found so far are held
+    in memory, and passing the iter_records stream of an LTADataMallClient lets the
+    matching overlap with the download.
+
+    Args:
+        hawker_infos (list[HawkerInfo]): The hawker centers to find carparks for.
+        carpark_records (Iterable[dict]): All records of the CarParkAvailability feed.
+        radius (float, optional): The search radius in meters. Defaults to 500 meters.
+        batch_size (int, optional): The number of carparks matched at a time. Defaults to 500,
+            one page of the feed.
+
+    Returns:
+        list[list[dict]]: For each hawker center, its nearby carparks sorted by distance.
+    """
+    carparks_by_hawker = [[] for _ in hawker_infos]
+    carpark_records = iter(carpark_records)
+    
+    while True:
+        batch = list(itertools.islice(carpark_records, batch_size))
+        if not batch:
+            break
         
-        # Filter carparks by distance
-        for carpark in carpark_data.get('value', []):
+        # Extract coordinates of every carpark in the batch
+        carparks = []
+        coordinates = []
+        for carpark in batch:
             # Skip if no location
             if not carpark.get('Location'):
                 continue
                 
             try:
-                # Extract coordinates
                 coords = carpark['Location'].split()
                 if len(coords) != 2:
                     continue
                 
-                cp_lat = float(coords[0])
-                cp_lon = float(coords[1])
-                
-                # Calculate distance
-                distance = geodesic(
-                    (hawker_info.latitude, hawker_info.longitude),
-                    (cp_lat, cp_lon)
-                ).meters
-                
-                # If carpark is within radius, add to list
-                if distance <= radius:
-                    nearby_carparks.append({
-                        "CarParkID": carpark.get('CarParkID'),
-                        "Development": carpark.get('Development'),
-                        "LotType": carpark.get('LotType'),
-                        "Agency": carpark.get('Agency'),
-                        "latitude": cp_lat,
-                        "longitude": cp_lon,
-                        "distance": distance
-                    })
+                coordinates.append((float(coords[0]), float(coords[1])))
+                carparks.append(carpark)
             except Exception as e:
                 print(f"Error processing carpark {carpark.get('CarParkID')}: {e}")
         
-        return nearby_carparks
+        coordinates = np.array(coordinates, dtype=float).reshape(-1, 2)
+        grid = GridIndex(coordinates[:, 0], coordinates[:, 1], cell_size=radius, ellipsoidal=True)
+        
+        for hawker_info, nearby_carparks in zip(hawker_infos, carparks_by_hawker):
+            positions, distances = grid.query_radius(hawker_info.latitude, hawker_info.longitude, radius)
+            nearby_carparks.extend(
+                {
+                    "CarParkID": carparks[i].get('CarParkID'),
+                    "Development": carparks[i].get('Development'),
+                    "LotType": carparks[i].get('LotType'),
+                    "Agency": carparks[i].get('Agency'),
+                    "latitude": float(coordinates[i, 0]),
+                    "longitude": float(coordinates[i, 1]),
+                    "distance": float(distance)
+                }
+                for i, distance in zip(positions, distances)
+            )
+    
+    # Sort by distance
+    for nearby_carparks in carparks_by_hawker:
+        nearby_carparks.sort(key=lambda carpark: carpark["distance"])
+    
+    return carparks_by_hawker
+
+def collect_nearby_carparks(lta_client, hawker_info, radius=500):
+    """Find nearby carparks using LTA DataMall API"""
+    try:
+        # Stream all carparks, matching each page while the next one downloads
+        carpark_records = lta_client.iter_records(LTADataMallEndpoints.CARPARK_AVAILABILITY)
+        
+        return associate_carparks([hawker_info], carpark_records, radius=radius)[0]
     except Exception as e:
         print(f"Error fetching carparks: {e}")
         return []
 
-def store_hawker_data(db, hawker_centers_data):
-    """Store hawker centers data in MongoDB"""
+def store_hawker_data(db, hawker_centers_data, batch_size=500):
+    """Store hawker centers data in MongoDB, upserting each hawker center by its id
+    
+    Rerunning the collector updates the stored hawker centers instead of adding
+    duplicates. The writes are sent in unordered bulk batches of batch_size, so one
+    failed write does not stop the others in its batch or the batches after it.
+    
+    Returns:
+        dict: The number of hawker centers inserted, updated, unchanged and failed.
+    """
     collection = db["hawker_centers"]
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0, "failed": 0}
+    
+    operations = []
+    for hawker_data in hawker_centers_data:
+        if not hawker_data.get("id"):
+            print(f"Skipping hawker center without an id: {hawker_data.get('displayName')}")
+            totals["failed"] += 1
+            continue
+        fields = {key: value for key, value in hawker_data.items() if key != "_id"}
+        location = location_of(hawker_data)
+        if location is not None:
+            fields["location"] = location # GeoJSON Point for the 2dsphere index
+        operations.append(UpdateOne({"id": hawker_data["id"]}, {"$set": fields}, upsert=True))
     
-    # Clear existing data if needed
-    # collection.delete_many({})
+    for start in range(0, len(operations), batch_size):
+        batch = operations[start:start + batch_size]
+        batch_start = time.perf_counter()
+        try:
+            result = collection.bulk_write(batch, ordered=False).bulk_api_result
+            failed = 0
+        except BulkWriteError as e:
+            # The other writes of an unordered batch still went through
+            result = e.details
+            failed = len(result.get("writeErrors", []))
+            for error in result.get("writeErrors", [])[:3]:
+                print(f"Failed to store hawker center: {error.get('errmsg')}")
+        except PyMongoError as e:
+            print(f"Failed to store a batch of {len(batch)} hawker centers: {e}")
+            result = {}
+            failed = len(batch)
+        elapsed = time.perf_counter() - batch_start
+        
+        inserted = result.get("nUpserted", 0)
+        updated = result.get("nModified", 0)
+        totals["inserted"] += inserted
+        totals["updated"] += updated
+        totals["unchanged"] += result.get("nMatched", 0) - updated
+        totals["failed"] += failed
+        print(f"Stored batch of {len(batch)} hawker centers in {elapsed:.2f}s "
+              f"({len(batch) / max(elapsed, 1e-9):.0f}/s): "
+              f"{inserted} inserted, {updated} updated, {failed} failed")
     
-    result = collection.insert_many(hawker_centers_data)
-    print(f"Inserted {len(result.inserted_ids)} hawker centers into MongoDB")
+    return totals
+
+class HawkerDataWriter:
+    ''' Buffers hawker centers as they are collected and stores them in batches with store_hawker_data. '''
+    
+    def __init__(self, db, batch_size=50):
+        self.db = db
+        self.batch_size = batch_size
+        self.totals = {"inserted": 0, "updated": 0, "unchanged": 0, "failed": 0}
+        self._buffer = []
+        self._lock = threading.Lock()
+    
+    def add(self, hawker_data):
+        """Adds a hawker center, storing the buffered ones once a batch is full"""
+        with self._lock:
+            self._buffer.append(hawker_data)
+            if len(self._buffer) < self.batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._store(batch)
+    
+    def flush(self):
+        """Stores the hawker centers still buffered"""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._store(batch)
+    
+    def _store(self, batch):
+        totals = store_hawker_data(self.db, batch, batch_size=self.batch_size)
+        with self._lock:
+            for key, count in totals.items():
+                self.totals[key] += count
 
 def main():
     # Load environment variables
@@ -210,7 +338,8 @@ def main():
     
     # Initialize LTA DataMall client
     lta_api_key = os.getenv("LTA_DATAMALL_API_KEY")
-    lta_client = LTADataMallClient(lta_api_key)
+    lta_client = LTADataMallClient(lta_api_key, cache_dir=os.getenv("LTA_CACHE_DIR", ".lta_cache"))
+    lta_prefetch = int(os.getenv("LTA_MAX_CONCURRENCY", 8)) # Pages downloaded ahead while a feed is consumed
     
     # Initialize MongoDB connection
     db = init_mongodb_connection()
@@ -218,46 +347,107 @@ def main():
     # Initialize geocoder for reverse geocoding
     geolocator = Nominatim(user_agent="hawkergo-data-collector")
     
-    # Initialize HawkerInfoFinder
-    finder = HawkerInfoFinder(google_api_key)
+    # Answer reverse geocoding from known postal codes first; Nominatim allows one request per second
+    postal_code_index = PostalCodeIndex(os.getenv("POSTAL_CODE_TABLE") or DEFAULT_TABLE_PATH,
+                                        max_distance=float(os.getenv("POSTAL_CODE_MAX_DISTANCE", 50)))
+    for seed_path, load in [("hawker_centers_data.json", postal_code_index.load_hawker_data),
+                            (os.getenv("POSTAL_CODE_REFERENCE_CSV"), postal_code_index.load_csv)]:
+        if seed_path and os.path.exists(seed_path):
+            print(f"Loaded {load(seed_path)} postal code locations from {seed_path}")
+    geocoder_limiter = RateLimiter(float(os.getenv("GEOCODE_MAX_RATE", 1)))
+    
+    # Initialize HawkerInfoFinder, reusing Nearby Search responses from previous runs
+    nearby_cache = NearbySearchCache(
+        os.getenv("PLACES_CACHE_PATH", ".places_cache/nearby_search.sqlite3"),
+        ttl=float(os.getenv("PLACES_CACHE_TTL_DAYS", 30)) * 24 * 60 * 60,
+        offline=os.getenv("PLACES_OFFLINE", "false").lower() in ("1", "true", "yes")
+    )
+    finder = HawkerInfoFinder(google_api_key, nearby_cache=nearby_cache)
     
     # Collect hawker centers
     hawker_centers = collect_hawker_centers(google_api_key, amount=50)
     
-    # Process each hawker center
-    hawker_centers_data = []
-    for hawker in hawker_centers:
+    # Stream each LTA reference feed once for the whole run, in the background
+    # so that geocoding can start while they download
+    print("Downloading LTA carpark and bus stop feeds...")
+    feed_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="lta-feed")
+    
+    def load_bus_stop_index():
+        try:
+            return BusStopIndex(lta_client.iter_records(LTADataMallEndpoints.BUS_STOPS, prefetch=lta_prefetch))
+        except Exception as e:
+            print(f"Error fetching {LTADataMallEndpoints.BUS_STOPS.value}: {e}")
+            return BusStopIndex([])
+    
+    def join_carparks():
+        # Get nearby carparks of every hawker center in one spatial join, as the feed downloads
+        try:
+            carparks_by_hawker = associate_carparks(
+                hawker_centers,
+                lta_client.iter_records(LTADataMallEndpoints.CARPARK_AVAILABILITY, prefetch=lta_prefetch)
+            )
+        except Exception as e:
+            print(f"Error fetching {LTADataMallEndpoints.CARPARK_AVAILABILITY.value}: {e}")
+            carparks_by_hawker = [[] for _ in hawker_centers]
+        return {hawker.id: carparks for hawker, carparks in zip(hawker_centers, carparks_by_hawker)}
+    
+    bus_stop_index = feed_pool.submit(load_bus_stop_index)
+    carparks_by_hawker = feed_pool.submit(join_carparks)
+    feed_pool.shutdown(wait=False)
+    
+    # Stage functions, each enriching the hawker center data object of one hawker center
+    def geocode(hawker):
         print(f"Processing {hawker.displayName}...")
-        
-        # Get postal code
-        postal_code = get_postal_code(hawker.latitude, hawker.longitude, geolocator)
-        
-        # Get nearby bus stops
-        bus_stops = collect_nearby_bus_stops(lta_client, hawker, finder)
-        
-        # Get nearby carparks
-        carparks = collect_nearby_carparks(lta_client, hawker)
-        
-        # Create hawker center data object
         hawker_data = {
             "id": hawker.id,
             "displayName": hawker.displayName,
             "latitude": hawker.latitude,
             "longitude": hawker.longitude,
-            "postal_code": postal_code,
-            "bus_stops": bus_stops,
-            "carparks": carparks
+            "postal_code": get_postal_code(hawker.latitude, hawker.longitude, geolocator,
+                                           postal_code_index=postal_code_index,
+                                           rate_limiter=geocoder_limiter)
         }
-        
-        hawker_centers_data.append(hawker_data)
+        return hawker, hawker_data
+    
+    def find_transit(item):
+        hawker, hawker_data = item
+        hawker_data["bus_stops"] = collect_nearby_bus_stops(lta_client, hawker, finder,
+                                                            bus_stop_index=bus_stop_index.result())
+        return item
+    
+    def find_carparks(item):
+        hawker, hawker_data = item
+        hawker_data["carparks"] = carparks_by_hawker.result().get(hawker.id, [])
+        return item
+    
+    # Hawker centers are upserted in batches as they finish, so a crash only loses the last batch
+    writer = HawkerDataWriter(db, batch_size=int(os.getenv("MONGO_WRITE_BATCH_SIZE", 50)))
+    
+    def persist(item):
+        _, hawker_data = item
+        writer.add(hawker_data)
+        return hawker_data
+    
+    # Nominatim takes one request at a time, while Google and MongoDB take several at once
+    pipeline = Pipeline([
+        Stage("geocode", geocode, workers=1),
+        Stage("transit", find_transit, workers=int(os.getenv("PLACES_MAX_CONCURRENCY", 4))),
+        Stage("carparks", find_carparks, workers=1),
+        Stage("persist", persist, workers=int(os.getenv("MONGO_WRITE_CONCURRENCY", 2))),
+    ])
+    hawker_centers_data = pipeline.run(hawker_centers)
+    writer.flush()
+    print(f"Stored hawker centers: {writer.totals}")
     
     # Export data to JSON file for backup
     with open('hawker_centers_data.json', 'w') as f:
         json.dump(hawker_centers_data, f, indent=2)
-
-    # Store hawker centers data in MongoDB
-    store_hawker_data(db, hawker_centers_data)
     
+    for stage, stats in pipeline.stats.items():
+        print(f"Stage {stage}: {stats['completed']} completed, {stats['failed']} failed, "
+              f"{stats['busy_seconds']:.1f}s busy")
+    print(f"Nearby search cache: {nearby_cache.stats()}")
+    print(f"Postal code index: {postal_code_index.stats()}")
     print("Data collection completed.")
 
 if __name__ == "__main__":
@@ -1,8 +1,11 @@
 from pymongo import MongoClient
 from dotenv import load_dotenv
 import os
+import sys
 import pprint
 
+from db_indexes import print_query_plans
+
 # Load environment variables
 load_dotenv()
 
@@ -19,6 +22,15 @@ try:
     # Select the hawker_centers collection
     collection = db["hawker_centers"]
     
+    # With --explain, check the query plan of each API query shape and index instead
+    if "--explain" in sys.argv:
+        flagged = print_query_plans(db)
+        if flagged:
+            print(f"\n{flagged} query shapes scan the whole collection; run 'python main.py init-db' to create the indexes.")
+        else:
+            print("\nNo unexpected collection scans.")
+        sys.exit(1 if flagged else 0)
+    
     # Print total number of documents
     total_docs = collection.count_documents({})
     print(f"Total documents in hawker_centers collection: {total_docs}")
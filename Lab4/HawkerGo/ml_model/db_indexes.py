@@ -0,0 +1,205 @@
+""" Contains the MongoDB indexes of the hawker_centers collection, their migration, and query plan checks. """
+
+import re
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, GEOSPHERE, TEXT, IndexModel, UpdateOne
+from pymongo.errors import OperationFailure
+
+HAWKER_CENTER_INDEXES = [
+    # Google Places id, used for lookups and upserts; documents without one are not indexed
+    IndexModel([("id", ASCENDING)], name="id_unique", unique=True,
+               partialFilterExpression={"id": {"$type": "string"}}),
+    # Exact and prefix (^06) postal code queries, and distinct("postal_code")
+    IndexModel([("postal_code", ASCENDING)], name="postal_code"),
+    # GeoJSON Point of the hawker center, for $nearSphere / $geoWithin queries
+    IndexModel([("location", GEOSPHERE)], name="location_2dsphere"),
+    # Word search on the hawker center name
+    IndexModel([("displayName", TEXT)], name="displayName_text"),
+]
+
+def location_of(hawker_data: dict) -> dict | None:
+    """Returns the GeoJSON Point of a hawker center document, or None if it has no coordinates."""
+    latitude, longitude = hawker_data.get("latitude"), hawker_data.get("longitude")
+    if not isinstance(latitude, (int, float)) or not isinstance(longitude, (int, float)):
+        return None
+    return {"type": "Point", "coordinates": [float(longitude), float(latitude)]}
+
+def migrate_locations(collection) -> int:
+    """Adds the GeoJSON location field to documents that only have latitude and longitude.
+
+    Returns:
+        int: The number of documents updated.
+    """
+    operations = []
+    for hawker_data in collection.find({"location": {"$exists": False}}, {"_id": 1, "latitude": 1, "longitude": 1}):
+        location = location_of(hawker_data)
+        if location is not None:
+            operations.append(UpdateOne({"_id": hawker_data["_id"]}, {"$set": {"location": location}}))
+
+    if not operations:
+        return 0
+    return collection.bulk_write(operations, ordered=False).modified_count
+
+def remove_duplicate_ids(collection) -> int:
+    """Deletes all but the most recently inserted document of each duplicated id.
+
+    Documents inserted by earlier runs of the data collector can share an id, which
+    prevents the unique index on id from being created.
+
+    Returns:
+        int: The number of documents deleted.
+    """
+    duplicates = collection.aggregate([
+        {"$match": {"id": {"$type": "string"}}},
+        {"$group": {"_id": "$id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ])
+
+    stale_ids = []
+    for duplicate in duplicates:
+        stale_ids.extend(sorted(duplicate["ids"])[:-1]) # ObjectIds sort by creation time
+
+    if not stale_ids:
+        return 0
+    return collection.delete_many({"_id": {"$in": stale_ids}}).deleted_count
+
+def ensure_indexes(db, migrate: bool = True) -> list[str]:
+    """Creates the indexes of the hawker_centers collection. Safe to call on every startup.
+
+    Args:
+        db (pymongo.database.Database): The hawkergo database.
+        migrate (bool, optional): Whether to first add the location field to documents
+            missing it. Defaults to True.
+
+    Returns:
+        list[str]: The names of the indexes that exist or were created.
+    """
+    collection = db["hawker_centers"]
+    if migrate:
+        migrated = migrate_locations(collection)
+        if migrated:
+            print(f"Added location to {migrated} hawker centers")
+
+    created = []
+    for index in HAWKER_CENTER_INDEXES:
+        name = index.document["name"]
+        try:
+            collection.create_indexes([index])
+            created.append(name)
+        except OperationFailure as e:
+            # e.g. duplicate ids left by earlier collector runs; see remove_duplicate_ids
+            print(f"Could not create index {name} on hawker_centers: {e}")
+    return created
+
+def _sample_values(collection) -> dict:
+    """Returns real values from the collection to build the sample queries with."""
+    sample = collection.find_one({"id": {"$type": "string"}}) or {}
+    postal_code = sample.get("postal_code") or "069184"
+    return {
+        "_id": sample.get("_id", ObjectId()),
+        "id": sample.get("id", "unknown-id"),
+        "postal_code": postal_code,
+        "postal_prefix": postal_code[:2],
+        "name": (sample.get("displayName") or "Maxwell").split()[0],
+        "longitude": sample.get("longitude", 103.8445),
+        "latitude": sample.get("latitude", 1.2803),
+    }
+
+# Query shapes issued by the API, the predictor and the data collector: (name, filter builder, whether a full scan is expected)
+QUERY_SHAPES = [
+    ("hawker by id (collector upsert)", lambda v: {"id": v["id"]}, False),
+    ("hawker by _id (predictor)", lambda v: {"_id": v["_id"]}, False),
+    ("hawker by _id or id (index resolve)", lambda v: {"$or": [{"id": v["id"]}, {"_id": v["_id"]}]}, False),
+    ("hawkers by _id list (nearby)", lambda v: {"_id": {"$in": [v["_id"]]}}, False),
+    ("hawker names by id list (batch-crowd)", lambda v: {"id": {"$in": [v["id"]]}}, False),
+    ("hawkers by postal code", lambda v: {"postal_code": v["postal_code"]}, False),
+    ("hawkers by postal code prefix", lambda v: {"postal_code": {"$regex": f"^{re.escape(v['postal_prefix'])}"}}, False),
+    ("all hawkers (/api/hawkers, /predict/all)", lambda v: {}, True),
+]
+
+# Queries that check the 2dsphere and text indexes can be used. No API route issues them, as
+# nearby and name lookups go through the in-memory HawkerIndex; they are for ad-hoc queries.
+INDEX_CHECKS = [
+    ("location_2dsphere: hawkers near a location", lambda v: {"location": {"$nearSphere": {
+        "$geometry": {"type": "Point", "coordinates": [v["longitude"], v["latitude"]]},
+        "$maxDistance": 2000}}}, False),
+    ("displayName_text: hawkers by name", lambda v: {"$text": {"$search": v["name"]}}, False),
+]
+
+def find_stages(plan: dict, stage: str) -> bool:
+    """Returns whether a query plan, or any of its input stages, is of the given stage, e.g. COLLSCAN."""
+    if not isinstance(plan, dict):
+        return False
+    if plan.get("stage") == stage:
+        return True
+    children = [plan.get("inputStage"), plan.get("queryPlan")] + list(plan.get("inputStages", []))
+    return any(find_stages(child, stage) for child in children if child)
+
+def winning_plan(explanation: dict) -> dict:
+    """Returns the winning plan of an explain() result, for classic and slot-based query engines."""
+    planner = explanation.get("queryPlanner", {})
+    return planner.get("winningPlan", {})
+
+def summarize_plan(plan: dict) -> str:
+    """Returns the stages of a plan from the top down, e.g. FETCH > IXSCAN(postal_code)."""
+    stages = []
+    while isinstance(plan, dict) and plan:
+        plan = plan.get("queryPlan", plan)
+        label = plan.get("stage", "?")
+        if plan.get("indexName"):
+            label += f"({plan['indexName']})"
+        stages.append(label)
+        inputs = plan.get("inputStages") or [plan.get("inputStage")]
+        plan = inputs[0] if inputs else None
+    return " > ".join(stages)
+
+def explain_queries(db, shapes: list = None) -> list[dict]:
+    """Runs explain() on each query shape, by default those of QUERY_SHAPES and distinct("postal_code").
+
+    Returns:
+        list[dict]: For each query shape, its name, plan summary, whether it scans
+            the whole collection, and whether that is expected.
+    """
+    collection = db["hawker_centers"]
+    values = _sample_values(collection)
+
+    explanations = []
+    for name, build_filter, full_scan_expected in QUERY_SHAPES if shapes is None else shapes:
+        try:
+            explanation = collection.find(build_filter(values)).explain()
+        except OperationFailure as e: # e.g. $text or $nearSphere without their index
+            explanations.append({"name": name, "plan": f"error: {e.details.get('errmsg', e)}",
+                                 "collscan": True, "expected": full_scan_expected})
+            continue
+        plan = winning_plan(explanation)
+        explanations.append({"name": name, "plan": summarize_plan(plan),
+                             "collscan": find_stages(plan, "COLLSCAN"), "expected": full_scan_expected})
+
+    if shapes is not None:
+        return explanations
+
+    explanation = db.command({"explain": {"distinct": "hawker_centers", "key": "postal_code"}})
+    plan = winning_plan(explanation)
+    explanations.append({"name": "distinct postal codes", "plan": summarize_plan(plan),
+                         "collscan": find_stages(plan, "COLLSCAN"), "expected": False})
+    return explanations
+
+def print_query_plans(db) -> int:
+    """Prints the plan of each query shape, then of each index check, flagging unexpected collection scans.
+
+    Returns:
+        int: The number of query shapes and index checks that scan the whole collection unexpectedly.
+    """
+    flagged = 0
+    for title, explanations in [("API query shapes", explain_queries(db)),
+                                ("Index checks (not issued by the API)", explain_queries(db, INDEX_CHECKS))]:
+        print(f"{title}:")
+        for explanation in explanations:
+            if explanation["collscan"] and not explanation["expected"]:
+                marker = "COLLSCAN"
+                flagged += 1
+            else:
+                marker = "ok"
+            print(f"[{marker:>8}] {explanation['name']}: {explanation['plan']}")
+    return flagged
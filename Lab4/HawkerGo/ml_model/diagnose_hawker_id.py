@@ -3,6 +3,8 @@ from dotenv import load_dotenv
 import os
 from bson.objectid import ObjectId
 
+from hawker_index import HawkerIndex
+
 # Load environment variables
 load_dotenv()
 
@@ -46,3 +48,6 @@ except Exception as e:
 
 print("\nPartial regex search:")
 print(collection.find_one({"id": {"$regex": problematic_id}}))
+
+print("\nResolver used by the predictor (ObjectId, Google Places ID or name):")
+print(HawkerIndex(collection).resolve(problematic_id))
\ No newline at end of file
@@ -0,0 +1,170 @@
+""" Contains a cache of crowd forecasts per hawker center and time of day. """
+
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import numpy as np
+
+from lta_datamall import TTLCache
+
+class Forecast(NamedTuple):
+    '''The predicted crowd of a hawker center at one time.'''
+
+    time: datetime
+    crowd_level: str
+    confidence: float
+    score: float # The expected crowd level from 0 (Low) to 2 (High), used to rank times
+
+CROWD_LEVELS = ('Low', 'Medium', 'High')
+
+class ForecastCache:
+    ''' Caches crowd predictions by (hawker center, minute, model inputs version), in a bounded LRU cache.
+
+    The time features of a prediction only change once a minute and the live features once
+    per refresh, so every client asking about the same hawker center and minute gets the
+    same prediction. Forecasts of later times hold the current live features constant, as
+    they are the best estimate available, and are computed for many hawker centers and
+    times in a single model evaluation.
+    '''
+
+    def __init__(self, predictor, maxsize: int = 20000, ttl: float = 3600.0):
+        """Initializes an empty cache.
+
+        Args:
+            predictor (HawkerCrowdPredictor): Provides the model, hawker center descriptors and live features.
+            maxsize (int, optional): The maximum number of cached predictions. Defaults to 20000.
+            ttl (float, optional): The number of seconds a prediction is kept at most. Entries are
+                keyed by the inputs version, so this only bounds how long unused entries stay.
+                Defaults to 3600 seconds.
+        """
+        self.predictor = predictor
+        self.cache = TTLCache(ttl=ttl, maxsize=maxsize)
+        self.evaluations = 0 # Number of predict_proba calls
+        self.rows = 0        # Number of feature rows scored
+
+    def version(self) -> tuple:
+        """Returns what the predictions depend on besides the hawker center and time."""
+        predictor = self.predictor
+        live_features = predictor.live_features
+        return (
+            live_features.refreshed_at if live_features is not None else None,
+            predictor.hawker_index.version if predictor.hawker_index is not None else None,
+            id(predictor.model),
+        )
+
+    @staticmethod
+    def times(start: datetime, hours: float, step: int) -> list[datetime]:
+        """Returns the forecast times for the given hours: start, rounded down to the minute,
+        then every step minutes since midnight, e.g. 12:07, 12:15, 12:30 for a step of 15.
+
+        Aligning the later times lets forecasts made at different minutes share them.
+        """
+        if step < 1:
+            raise ValueError("Parameter 'step' must be at least 1 minute.")
+
+        start = start.replace(second=0, microsecond=0)
+        end = start + timedelta(hours=hours)
+        minutes = start.hour * 60 + start.minute
+        when = start + timedelta(minutes=step - minutes % step)
+
+        times = [start]
+        while when <= end:
+            times.append(when)
+            when += timedelta(minutes=step)
+        return times
+
+    def forecast(self, hawker_ids: list[str], start: datetime = None, hours: float = 0, step: int = 15) -> dict[str, list[Forecast]]:
+        """Forecasts the crowd of hawker centers from start for the given number of hours.
+
+        Cached predictions are reused; all missing ones are computed in one batch.
+
+        Args:
+            hawker_ids (list[str]): Any IDs or names of the hawker centers.
+            start (datetime, optional): The first forecast time. Defaults to now.
+            hours (float, optional): How far ahead to forecast. Defaults to 0, i.e. only start.
+            step (int, optional): The minutes between forecast times. Defaults to 15.
+
+        Returns:
+            dict[str, list[Forecast]]: The forecasts of each hawker center ID, in time order.
+
+        Raises:
+            ValueError: If there is no model, or a hawker center is not found.
+        """
+        predictor = self.predictor
+        if predictor.model is None:
+            raise ValueError("No model loaded to forecast with")
+
+        times = self.times(start or datetime.now(), hours, step)
+        version = self.version()
+        descriptors = {hawker_id: predictor.get_hawker_descriptor(hawker_id) for hawker_id in dict.fromkeys(hawker_ids)}
+
+        forecasts = {}
+        missing = [] # (hawker ID, position, descriptor, time)
+        for hawker_id, descriptor in descriptors.items():
+            forecasts[hawker_id] = []
+            for when in times:
+                forecast = self.cache.get((descriptor.object_id or descriptor.id, when, version))
+                if forecast is None:
+                    missing.append((hawker_id, len(forecasts[hawker_id]), descriptor, when))
+                forecasts[hawker_id].append(forecast)
+
+        if missing:
+            for (hawker_id, position, descriptor, when), forecast in zip(missing, self._compute(missing)):
+                self.cache.put((descriptor.object_id or descriptor.id, when, version), forecast)
+                forecasts[hawker_id][position] = forecast
+
+        return forecasts
+
+    def _compute(self, missing) -> list[Forecast]:
+        """Scores the (hawker ID, position, descriptor, time) entries in a single model evaluation."""
+        predictor = self.predictor
+        now = datetime.now()
+
+        live_blocks = {}
+        rows = []
+        for _, _, descriptor, when in missing:
+            live = live_blocks.get(descriptor)
+            if live is None:
+                precomputed = predictor.live_features.get(descriptor) if predictor.live_features is not None else None
+                live = live_blocks[descriptor] = precomputed[0] if precomputed is not None else predictor.fetch_live_features(descriptor, now)
+            time_of_day, day_of_week = predictor.time_features(when)
+            rows.append([*time_of_day, *live, *day_of_week])
+
+        features = np.array(rows, dtype=float)
+        if predictor.scaler:
+            features = predictor.scaler.transform(features)
+        probabilities = predictor.model.predict_proba(features)
+        self.evaluations += 1
+        self.rows += len(rows)
+
+        classes = np.asarray(predictor.model.classes_)
+        best = probabilities.argmax(axis=1)
+        scores = probabilities @ classes
+        return [
+            Forecast(when, CROWD_LEVELS[classes[index]], float(row_probabilities[index]), float(score))
+            for (_, _, _, when), index, row_probabilities, score in zip(missing, best, probabilities, scores)
+        ]
+
+    def precompute(self, hours: float = 3, step: int = 15) -> int:
+        """Forecasts every indexed hawker center for the coming hours in one batch, e.g. after live features refresh.
+
+        Returns:
+            int: The number of hawker centers forecast.
+        """
+        hawker_ids = [descriptor.object_id for descriptor in self.predictor.hawker_index.all()]
+        if hawker_ids and self.predictor.model is not None:
+            self.forecast(hawker_ids, hours=hours, step=step)
+        return len(hawker_ids)
+
+    def best_time(self, hawker_id: str, start: datetime = None, hours: float = 3, step: int = 15) -> Forecast:
+        """Finds the least crowded time to visit a hawker center in the coming hours.
+
+        Returns:
+            Forecast: The forecast with the lowest expected crowd level, the earliest one on ties.
+        """
+        forecasts = self.forecast([hawker_id], start=start, hours=hours, step=step)[hawker_id]
+        return min(forecasts, key=lambda forecast: forecast.score)
+
+    def stats(self) -> dict:
+        """Returns the cache counters and the number of model evaluations."""
+        return {**self.cache.stats(), "evaluations": self.evaluations, "rows": self.rows}
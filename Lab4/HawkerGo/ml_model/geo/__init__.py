@@ -0,0 +1,3 @@
+from .distance import haversine_distances, pairwise_distances, EARTH_RADIUS_METERS
+from .grid_index import GridIndex
+from .postal_code_index import PostalCodeIndex, DEFAULT_TABLE_PATH
\ No newline at end of file
@@ -0,0 +1,77 @@
+""" Contains vectorized great-circle distance functions. """
+
+import numpy as np
+
+EARTH_RADIUS_METERS = 6371008.8 # Mean Earth radius (IUGG)
+
+WGS84_SEMI_MAJOR_AXIS = 6378137.0
+WGS84_ECCENTRICITY_SQUARED = 6.69437999014e-3
+
+def _distances(lat1, lon1, lat2, lon2, ellipsoidal: bool) -> np.ndarray:
+    """Computes the distances in meters between broadcastable arrays of points given in degrees."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    central_angle = 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    if not ellipsoidal:
+        return EARTH_RADIUS_METERS * central_angle
+
+    # Scale by the WGS84 radius of curvature at the mean latitude, in the direction
+    # of travel. This matches geodesic distances to within a few centimetres per
+    # kilometre over the short distances used in this project.
+    mean_lat = (lat1 + lat2) / 2
+    north = dlat
+    east = dlon * np.cos(mean_lat)
+    length_squared = north ** 2 + east ** 2
+    cos_squared = np.divide(north ** 2, length_squared, out=np.ones_like(length_squared), where=length_squared > 0)
+
+    w_squared = 1 - WGS84_ECCENTRICITY_SQUARED * np.sin(mean_lat) ** 2
+    meridian_radius = WGS84_SEMI_MAJOR_AXIS * (1 - WGS84_ECCENTRICITY_SQUARED) / w_squared ** 1.5
+    normal_radius = WGS84_SEMI_MAJOR_AXIS / np.sqrt(w_squared)
+    radius = 1 / (cos_squared / meridian_radius + (1 - cos_squared) / normal_radius)
+
+    return radius * central_angle
+
+def haversine_distances(latitude: float, longitude: float, latitudes, longitudes,
+                        ellipsoidal: bool = False) -> np.ndarray:
+    """Computes the great-circle distances from one point to many points.
+
+    Args:
+        latitude (float): The latitude of the origin, in degrees.
+        longitude (float): The longitude of the origin, in degrees.
+        latitudes (array-like): The latitudes of the destinations, in degrees.
+        longitudes (array-like): The longitudes of the destinations, in degrees.
+        ellipsoidal (bool, optional): Whether to correct for the WGS84 ellipsoid, giving
+            results close to geopy's geodesic distance. Defaults to False, which uses
+            a sphere of mean Earth radius (within 0.5% of the ellipsoid).
+
+    Returns:
+        numpy.ndarray: The distance in meters to each destination.
+    """
+    return _distances(latitude, longitude, latitudes, longitudes, ellipsoidal)
+
+def pairwise_distances(latitudes1, longitudes1, latitudes2, longitudes2,
+                       ellipsoidal: bool = False) -> np.ndarray:
+    """Computes the great-circle distances between every pair of points from two sets.
+
+    The result holds len(latitudes1) x len(latitudes2) values, so for very large
+    sets prefer querying a GridIndex built over one of them.
+
+    Args:
+        latitudes1 (array-like): The latitudes of the first set of points, in degrees.
+        longitudes1 (array-like): The longitudes of the first set of points, in degrees.
+        latitudes2 (array-like): The latitudes of the second set of points, in degrees.
+        longitudes2 (array-like): The longitudes of the second set of points, in degrees.
+        ellipsoidal (bool, optional): Whether to correct for the WGS84 ellipsoid.
+            See haversine_distances. Defaults to False.
+
+    Returns:
+        numpy.ndarray: The matrix of distances in meters, where entry [i, j] is the
+            distance from point i of the first set to point j of the second set.
+    """
+    latitudes1 = np.asarray(latitudes1, dtype=float)[:, np.newaxis]
+    longitudes1 = np.asarray(longitudes1, dtype=float)[:, np.newaxis]
+    return _distances(latitudes1, longitudes1, latitudes2, longitudes2, ellipsoidal)
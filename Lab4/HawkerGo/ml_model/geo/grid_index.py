@@ -0,0 +1,98 @@
+""" Contains a uniform grid index for radius queries over latitude/longitude points. """
+
+import math
+
+import numpy as np
+
+from .distance import haversine_distances
+
+METERS_PER_DEGREE_LATITUDE = 111_320.0
+
+class GridIndex:
+    ''' Buckets points into square cells so that radius queries only look at nearby cells.
+
+    Singapore spans less than 50 km, so an equirectangular grid sized at the mean
+    latitude of the points is accurate enough for choosing candidate cells; exact
+    distances are then computed with the haversine formula.
+    '''
+
+    def __init__(self, latitudes, longitudes, cell_size: float = 500.0, ellipsoidal: bool = False):
+        """Builds the index.
+
+        Args:
+            latitudes (array-like): The latitudes of the points, in degrees.
+            longitudes (array-like): The longitudes of the points, in degrees.
+            cell_size (float, optional): The side of each grid cell in meters. Queries are
+                fastest when this is close to the typical query radius. Defaults to 500 meters.
+            ellipsoidal (bool, optional): Whether query distances are corrected for the
+                WGS84 ellipsoid. See haversine_distances. Defaults to False.
+        """
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        self.cell_size = cell_size
+        self.ellipsoidal = ellipsoidal
+
+        mean_latitude = float(self.latitudes.mean()) if len(self.latitudes) else 0.0
+        self._lat_step = cell_size / METERS_PER_DEGREE_LATITUDE
+        self._lon_step = cell_size / (METERS_PER_DEGREE_LATITUDE * max(math.cos(math.radians(mean_latitude)), 0.01))
+
+        rows = np.floor(self.latitudes / self._lat_step).astype(np.int64)
+        cols = np.floor(self.longitudes / self._lon_step).astype(np.int64)
+
+        self._cells: dict[tuple[int, int], np.ndarray] = {}
+        if len(rows):
+            order = np.lexsort((cols, rows))
+            keys = np.stack([rows[order], cols[order]], axis=1)
+            boundaries = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+            for group in np.split(order, boundaries):
+                self._cells[(int(rows[group[0]]), int(cols[group[0]]))] = group
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def _candidates(self, latitude: float, longitude: float, radius: float) -> np.ndarray:
+        """Returns the indices of all points in cells overlapping the query's bounding box."""
+        # Pad the box by 1%, since degree lengths on the sphere and ellipsoid are slightly shorter
+        radius *= 1.01
+        lat_radius = radius / METERS_PER_DEGREE_LATITUDE
+        lon_radius = radius / (METERS_PER_DEGREE_LATITUDE * max(math.cos(math.radians(latitude)), 0.01))
+
+        row_min = math.floor((latitude - lat_radius) / self._lat_step)
+        row_max = math.floor((latitude + lat_radius) / self._lat_step)
+        col_min = math.floor((longitude - lon_radius) / self._lon_step)
+        col_max = math.floor((longitude + lon_radius) / self._lon_step)
+
+        if (row_max - row_min + 1) * (col_max - col_min + 1) > len(self._cells):
+            # The query covers more cells than are occupied, so walk the occupied ones instead
+            groups = [group for (row, col), group in self._cells.items()
+                      if row_min <= row <= row_max and col_min <= col <= col_max]
+        else:
+            groups = [self._cells[(row, col)]
+                      for row in range(row_min, row_max + 1)
+                      for col in range(col_min, col_max + 1)
+                      if (row, col) in self._cells]
+
+        return np.concatenate(groups) if groups else np.empty(0, dtype=np.int64)
+
+    def query_radius(self, latitude: float, longitude: float, radius: float) -> tuple[np.ndarray, np.ndarray]:
+        """Finds all points within a radius of a location.
+
+        Args:
+            latitude (float): The latitude of the location, in degrees.
+            longitude (float): The longitude of the location, in degrees.
+            radius (float): The search radius in meters.
+
+        Returns:
+            numpy.ndarray: The indices of the points found, nearest first.
+            numpy.ndarray: The distance in meters to each point found.
+        """
+        candidates = self._candidates(latitude, longitude, radius)
+        distances = haversine_distances(latitude, longitude,
+                                        self.latitudes[candidates], self.longitudes[candidates],
+                                        ellipsoidal=self.ellipsoidal)
+
+        within = distances <= radius
+        candidates, distances = candidates[within], distances[within]
+
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
@@ -0,0 +1,150 @@
+""" Contains an offline reverse geocoder from coordinates to Singapore postal codes. """
+
+import csv
+import json
+import os
+import threading
+
+from .grid_index import GridIndex
+
+POSTAL_CODE_FIELDS = ["postal_code", "latitude", "longitude"]
+
+# Where the table of postal codes found by the data collector is kept by default, independent of the working directory
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "postal_codes.csv")
+
+class PostalCodeIndex:
+    ''' Looks up the postal code of a location from a table of known postal code locations.
+
+    Singapore postal codes identify single buildings, so a location within a few tens of
+    meters of a known postal code location almost always shares its postal code. The table
+    is kept in a CSV file, and new postal codes can be added to it as they are found, e.g.
+    from an online geocoder.
+    '''
+
+    def __init__(self, path: str = None, max_distance: float = 50.0, cell_size: float = 100.0):
+        """Initializes the index, loading the table at path if it exists.
+
+        Args:
+            path (str, optional): The CSV file the table is loaded from and added postal codes
+                are written to, with columns postal_code, latitude and longitude.
+                Defaults to None, which keeps the table in memory only.
+            max_distance (float, optional): The distance in meters within which a known
+                postal code location is considered to match. Defaults to 50 meters.
+            cell_size (float, optional): The side of each grid cell in meters. Defaults to 100 meters.
+        """
+        self.path = path
+        self.max_distance = max_distance
+        self.cell_size = cell_size
+        self._lock = threading.Lock()
+        self._postal_codes: list[str] = []
+        self._latitudes: list[float] = []
+        self._longitudes: list[float] = []
+        self._known: set[tuple[str, float, float]] = set()
+        self._snapshot = ([], GridIndex([], [])) # (postal codes, grid), replaced as a whole when rebuilt
+        self._stale = False
+
+        self.hits = 0
+        self.misses = 0
+
+        if path and os.path.exists(path):
+            self.load_csv(path)
+
+    def __len__(self):
+        return len(self._postal_codes)
+
+    def _add(self, postal_code, latitude, longitude) -> bool:
+        """Adds an entry to the table, unless it is invalid or known. Must hold the lock."""
+        try:
+            entry = (str(postal_code).strip(), round(float(latitude), 7), round(float(longitude), 7))
+        except (TypeError, ValueError):
+            return False
+        if not entry[0] or entry[0] == 'None' or entry in self._known:
+            return False
+
+        self._known.add(entry)
+        self._postal_codes.append(entry[0])
+        self._latitudes.append(entry[1])
+        self._longitudes.append(entry[2])
+        self._stale = True
+        return True
+
+    def load_csv(self, path: str) -> int:
+        """Adds the postal code locations of a CSV file, such as a reference dataset.
+
+        Column names are matched ignoring case, and POSTAL is accepted for postal_code.
+
+        Returns:
+            int: The number of postal code locations added.
+        """
+        added = 0
+        with open(path, newline='') as file:
+            for row in csv.DictReader(file):
+                row = {key.strip().lower(): value for key, value in row.items() if key}
+                with self._lock:
+                    added += self._add(row.get('postal_code') or row.get('postal'),
+                                       row.get('latitude'),
+                                       row.get('longitude'))
+        return added
+
+    def load_hawker_data(self, path: str) -> int:
+        """Adds the postal codes of previously collected hawker centers, e.g. hawker_centers_data.json.
+
+        Returns:
+            int: The number of postal code locations added.
+        """
+        with open(path) as file:
+            hawker_centers_data = json.load(file)
+
+        added = 0
+        with self._lock:
+            for hawker_data in hawker_centers_data:
+                added += self._add(hawker_data.get('postal_code'),
+                                   hawker_data.get('latitude'),
+                                   hawker_data.get('longitude'))
+        return added
+
+    def add(self, postal_code: str, latitude: float, longitude: float) -> bool:
+        """Adds a postal code location, appending it to the CSV file if the index has one.
+
+        Returns:
+            bool: Whether the location was added, i.e. it was valid and not known yet.
+        """
+        with self._lock:
+            if not self._add(postal_code, latitude, longitude):
+                return False
+
+            if self.path:
+                is_new_file = not os.path.exists(self.path)
+                with open(self.path, 'a', newline='') as file:
+                    writer = csv.writer(file)
+                    if is_new_file:
+                        writer.writerow(POSTAL_CODE_FIELDS)
+                    writer.writerow([self._postal_codes[-1], self._latitudes[-1], self._longitudes[-1]])
+        return True
+
+    def _current(self):
+        """Returns the postal codes and grid of the table, rebuilding the grid if entries were added."""
+        if self._stale:
+            with self._lock:
+                if self._stale:
+                    grid = GridIndex(self._latitudes, self._longitudes, cell_size=self.cell_size)
+                    self._snapshot = (list(self._postal_codes), grid)
+                    self._stale = False
+        return self._snapshot
+
+    def lookup(self, latitude: float, longitude: float) -> str | None:
+        """Returns the postal code of the nearest known location within max_distance, or None."""
+        postal_codes, grid = self._current()
+        positions, _ = grid.query_radius(latitude, longitude, self.max_distance)
+
+        with self._lock:
+            if len(positions) == 0:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return postal_codes[positions[0]]
+
+    def stats(self) -> dict:
+        """Returns the hit/miss counters and size of the table."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._postal_codes)}
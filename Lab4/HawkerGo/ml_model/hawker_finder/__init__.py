@@ -1,2 +1,3 @@
 from .api_client import GooglePlacesAPIClient
+from .nearby_search_cache import NearbySearchCache
 from .hawker_info_finder import HawkerInfoFinder, HawkerInfo
\ No newline at end of file
@@ -3,7 +3,13 @@
 import requests
 import warnings
 
+from http_session import create_session
+
+from .nearby_search_cache import NearbySearchCache
+
 class GooglePlacesAPIClient:
+    BASE_URL = "https://places.googleapis.com/v1/"
+    
     _TEXT_SEARCH_MASKS_DEFAULT = ",".join([
         "places.id",
         "places.formattedAddress",
@@ -19,8 +25,33 @@ class GooglePlacesAPIClient:
         "places.location"
     ])
     
-    def __init__(self, api_key):
+    def __init__(self,
+                 api_key,
+                 timeout: float = 30,
+                 session: requests.Session = None,
+                 pool_size: int = 10,
+                 base_url: str = None,
+                 nearby_cache: NearbySearchCache = None):
+        """Initializes the client with the given API key.
+
+        Args:
+            api_key (str): The Google Places API key.
+            timeout (float, optional): The number of seconds to wait for each request
+                before giving up. Defaults to 30 seconds. None waits indefinitely.
+            session (requests.Session, optional): The session to send requests through.
+                Pass the same session to several clients to share its connection pool.
+                Defaults to a new session from create_session.
+            pool_size (int, optional): The number of connections kept alive by a new session.
+                Should be at least the number of threads using the client. Defaults to 10.
+            base_url (str, optional): Overrides BASE_URL, e.g. to point at a local stub server.
+            nearby_cache (NearbySearchCache, optional): Caches Nearby Search responses across runs.
+                Defaults to None, which sends every search to the API.
+        """
         self.api_key = api_key
+        self.timeout = timeout
+        self.session = session if session is not None else create_session(pool_size)
+        self.base_url = base_url or self.BASE_URL
+        self.nearby_cache = nearby_cache
         
     def requestTextSearch(self,
                           query: str,
@@ -59,7 +90,7 @@ class GooglePlacesAPIClient:
             search_mask += f",nextPageToken"
         
         # Define the URI and headers for the request
-        uri = "https://places.googleapis.com/v1/places:searchText"
+        uri = self.base_url + "places:searchText"
         headers = {
             "Content-Type": "application/json",
             "X-Goog-Api-Key": self.api_key,
@@ -84,7 +115,7 @@ class GooglePlacesAPIClient:
             #   The API only allows max 20 results per page
             body["pageSize"] = min(count - retrieved_count, 20)
             
-            response = requests.post(uri, headers=headers, json=body)
+            response = self.session.post(uri, headers=headers, json=body, timeout=self.timeout)
             
             # Increment the request count, then check if we have made too many calls
             # This should not happen as we have set a limit on the count parameter above
@@ -144,9 +175,31 @@ class GooglePlacesAPIClient:
         Returns:
             list[dict]: The list of places from the API. Returns top 20 results by distance.
                 Only includes the fields specified in the search_mask.
+                If the client has a nearby_cache, searches around the same location are
+                answered from it.
         """
 
-        uri = "https://places.googleapis.com/v1/places:searchNearby"
+        def search():
+            return self._postNearbySearch(latitude, longitude, radius, types, search_mask)
+
+        try:
+            if self.nearby_cache is None:
+                return search()
+            
+            request = self.nearby_cache.request_key(latitude, longitude, radius, types, search_mask)
+            return self.nearby_cache.get(request, search)
+        except Exception as e:
+            print(f"Error in requestNearbySearch: {e}")
+            return []
+
+    def _postNearbySearch(self,
+                          latitude: float,
+                          longitude: float,
+                          radius: float,
+                          types: list[str],
+                          search_mask: str) -> list[dict]:
+        """Sends a Nearby Search request, raising an exception if it fails."""
+        uri = self.base_url + "places:searchNearby"
         headers = {
             "Content-Type": "application/json",
             "X-Goog-Api-Key": self.api_key,
@@ -166,17 +219,12 @@ class GooglePlacesAPIClient:
             "rankPreference": "DISTANCE"
         }
 
-        try:
-            response = requests.post(uri, headers=headers, json=body)
+        response = self.session.post(uri, headers=headers, json=body, timeout=self.timeout)
 
-            if response.status_code != 200:
-                print(f"Request failed with status code {response.status_code}: {response.text}")
-                return []
+        if response.status_code != 200:
+            raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
 
-            return response.json().get("places", [])
-        except Exception as e:
-            print(f"Error in requestNearbySearch: {e}")
-            return []
+        return response.json().get("places", [])
     
     def requestPlaceDetails(self,
                             place_id: str,
@@ -193,14 +241,14 @@ class GooglePlacesAPIClient:
             dict: The place details. Only includes the fields specified in the search_mask.
         """
         
-        uri = f"https://places.googleapis.com/v1/places/{place_id}"
+        uri = self.base_url + f"places/{place_id}"
         headers = {
             "Content-Type": "application/json",
             "X-Goog-Api-Key": self.api_key,
             "X-Goog-FieldMask": search_mask
         }
         
-        response = requests.get(uri, headers=headers)
+        response = self.session.get(uri, headers=headers, timeout=self.timeout)
         
         if response.status_code != 200:
             raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
@@ -12,8 +12,14 @@ class HawkerInfo:
         self.displayName = displayName
 
 class HawkerInfoFinder:
-    def __init__(self, api_key):
-        self.client = GooglePlacesAPIClient(api_key)
+    def __init__(self, api_key, **client_kwargs):
+        """Initializes the finder with the given API key.
+
+        Args:
+            api_key (str): The Google Places API key.
+            **client_kwargs: Passed on to GooglePlacesAPIClient, e.g. timeout or session.
+        """
+        self.client = GooglePlacesAPIClient(api_key, **client_kwargs)
     
     def findHawkerCenters(self,
                           amount: int = 20,
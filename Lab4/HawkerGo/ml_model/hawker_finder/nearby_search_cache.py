@@ -0,0 +1,154 @@
+''' Contains a persistent cache of Google Places Nearby Search responses. '''
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class NearbySearchCache:
+    ''' Stores Nearby Search responses in a SQLite database, so repeated searches are not billed again.
+
+    Searches are keyed by their center rounded to a few decimal places, their radius, place types
+    and field mask. Concurrent identical searches are merged into one API call, and in offline mode
+    only recorded responses are replayed, without calling the API at all.
+    '''
+
+    def __init__(self,
+                 path: str,
+                 ttl: float = 30 * 24 * 60 * 60,
+                 precision: int = 4,
+                 offline: bool = False,
+                 clock=time.time):
+        """Opens the cache at the given path, creating the database if needed.
+
+        Args:
+            path (str): The path of the SQLite database file.
+            ttl (float, optional): The number of seconds a response is reused. Defaults to 30 days.
+            precision (int, optional): The number of decimal places the search center is rounded
+                to in the key. Defaults to 4, about 11 meters.
+            offline (bool, optional): Whether to replay recorded responses only, even expired ones.
+                Searches that were never recorded then return no places. Defaults to False.
+            clock (callable, optional): Returns the current time as a Unix timestamp. Defaults to time.time.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.ttl = ttl
+        self.precision = precision
+        self.offline = offline
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._inflight: dict[str, threading.Event] = {} # Key -> set once its search completes
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS nearby_search ("
+                "key TEXT PRIMARY KEY, request TEXT NOT NULL, places TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+        self.hits = 0       # Searches answered from the database
+        self.misses = 0     # Searches sent to the API
+        self.coalesced = 0  # Searches that waited for an identical search in progress
+        self.replay_misses = 0 # Searches not recorded, in offline mode
+
+    def request_key(self, latitude: float, longitude: float, radius: float, types: list[str], search_mask: str) -> dict:
+        """Returns the normalized parameters of a search, which identify it in the cache."""
+        return {
+            "latitude": round(latitude, self.precision),
+            "longitude": round(longitude, self.precision),
+            "radius": float(radius),
+            "types": sorted(types),
+            "search_mask": ",".join(sorted(search_mask.split(","))),
+        }
+
+    def _lookup(self, key: str, allow_expired: bool) -> str | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT places, fetched_at FROM nearby_search WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or (not allow_expired and self._clock() - row[1] >= self.ttl):
+            return None
+        return row[0]
+
+    def get(self, request: dict, loader) -> list[dict]:
+        """Returns the places found by a search, calling loader only if they are not cached.
+
+        Args:
+            request (dict): The normalized search, from request_key.
+            loader (callable): Called without arguments to run the search. Must return the list
+                of places, and raise an exception if the search failed, so it is not cached.
+
+        Returns:
+            list[dict]: The places found, as a new list each caller may modify.
+        """
+        request_json = json.dumps(request, sort_keys=True)
+        key = hashlib.sha256(request_json.encode()).hexdigest()
+
+        places = self._lookup(key, allow_expired=self.offline)
+        if places is not None:
+            with self._lock:
+                self.hits += 1
+            return json.loads(places)
+
+        if self.offline:
+            with self._lock:
+                self.replay_misses += 1
+            print(f"Nearby search not recorded, returning no places: {request_json}")
+            return []
+
+        while True:
+            with self._lock:
+                event = self._inflight.get(key)
+                is_leader = event is None
+                if is_leader: # No identical search in progress, this thread performs it
+                    event = self._inflight[key] = threading.Event()
+                    self.misses += 1
+                else:
+                    self.coalesced += 1
+
+            if is_leader:
+                break
+
+            event.wait()
+            places = self._lookup(key, allow_expired=False)
+            if places is not None:
+                return json.loads(places)
+            # The search failed, so retry it unless another thread already has
+
+        try:
+            places = json.dumps(loader())
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO nearby_search (key, request, places, fetched_at) VALUES (?, ?, ?, ?)",
+                    (key, request_json, places, self._clock())
+                )
+            return json.loads(places)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM nearby_search").fetchone()[0]
+
+    def stats(self) -> dict:
+        """Returns the hit/miss counters and size of the cache."""
+        size = len(self)
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "replay_misses": self.replay_misses,
+                "size": size,
+            }
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            self._connection.close()
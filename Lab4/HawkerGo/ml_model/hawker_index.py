@@ -0,0 +1,242 @@
+""" Contains an in-memory index of the hawker centers stored in MongoDB. """
+
+import re
+import threading
+import time
+from typing import NamedTuple
+
+from bson.objectid import ObjectId
+
+from geo import GridIndex
+from lta_datamall import TTLCache, BUS_STOP_CODE_PATTERN
+
+# Runs of anything other than letters and digits, collapsed when normalizing names
+NAME_SEPARATOR_PATTERN = re.compile(r'[^0-9a-z]+')
+
+# Only the fields needed to build descriptors are read from MongoDB
+DESCRIPTOR_PROJECTION = {
+    "_id": 1,
+    "id": 1,
+    "displayName": 1,
+    "latitude": 1,
+    "longitude": 1,
+    "postal_code": 1,
+    "carparks.CarParkID": 1,
+    "bus_stops.bus_stop_code": 1,
+    "bus_stops.displayName": 1,
+    "bus_stops.latitude": 1,
+    "bus_stops.longitude": 1,
+}
+
+
+def normalize_name(name: str) -> str:
+    """Normalizes a hawker center name for lookups, e.g. "Maxwell Food Centre " -> "maxwell food centre"."""
+    return NAME_SEPARATOR_PATTERN.sub(' ', (name or '').lower()).strip()
+
+
+class HawkerDescriptor(NamedTuple):
+    '''The precomputed, per-request data of a hawker center.'''
+
+    object_id: str
+    id: str
+    display_name: str
+    latitude: float
+    longitude: float
+    postal_code: str
+    carpark_ids: tuple
+    bus_stop_codes: tuple
+
+    @classmethod
+    def from_document(cls, hawker_data: dict, bus_stop_index=None) -> "HawkerDescriptor":
+        """Builds a descriptor from a hawker center document, parsing its carparks and bus stops.
+
+        Args:
+            hawker_data (dict): The hawker center document.
+            bus_stop_index (BusStopIndex, optional): Used to find the code of bus stops
+                that have neither a bus_stop_code nor a code in their name, by matching
+                their location to the nearest LTA bus stop within 50 meters.
+        """
+        carpark_ids = tuple(
+            cp.get('CarParkID') for cp in hawker_data.get('carparks') or [] if 'CarParkID' in cp
+        )
+
+        bus_stop_codes = []
+        for bs in hawker_data.get('bus_stops') or []:
+            # Try to get bus_stop_code directly if it exists
+            if bs.get('bus_stop_code'):
+                bus_stop_codes.append(bs.get('bus_stop_code'))
+            else:
+                # Extract bus stop code from display name if possible
+                match = BUS_STOP_CODE_PATTERN.search(bs.get('displayName', ''))
+                if match:
+                    bus_stop_codes.append(match.group())
+                elif bus_stop_index is not None and bs.get('latitude') is not None and bs.get('longitude') is not None:
+                    lta_stop, _ = bus_stop_index.nearest(bs['latitude'], bs['longitude'], max_distance=50)
+                    if lta_stop:
+                        bus_stop_codes.append(lta_stop.get('BusStopCode'))
+
+        return cls(
+            object_id=str(hawker_data.get('_id', '')),
+            id=hawker_data.get('id'),
+            display_name=hawker_data.get('displayName', 'Unknown'),
+            latitude=hawker_data.get('latitude'),
+            longitude=hawker_data.get('longitude'),
+            postal_code=hawker_data.get('postal_code'),
+            carpark_ids=carpark_ids,
+            bus_stop_codes=tuple(bus_stop_codes),
+        )
+
+
+    @property
+    def document_id(self):
+        """The `_id` of the hawker center document, as stored in MongoDB."""
+        return ObjectId(self.object_id) if ObjectId.is_valid(self.object_id) else self.object_id
+
+
+class HawkerIndex:
+    ''' Maps each hawker center key (`_id` and `id`) to its HawkerDescriptor.
+
+    The index is built from a single projected scan of the collection, and rebuilt
+    lazily after invalidate() is called or once it is older than max_age.
+    '''
+
+    def __init__(self, collection, max_age: float = 300.0, negative_ttl: float = 300.0, bus_stop_index=None):
+        """Initializes an empty index over the given collection.
+
+        Args:
+            collection (pymongo.collection.Collection): The hawker_centers collection.
+            max_age (float, optional): The number of seconds after which the index is
+                rebuilt, to pick up changes made by other processes such as the data
+                collector. Defaults to 300 seconds.
+            negative_ttl (float, optional): The number of seconds an ID that could not be
+                resolved is remembered as unknown. Defaults to 300 seconds.
+            bus_stop_index (BusStopIndex, optional): Used to fill in missing bus stop codes.
+                See HawkerDescriptor.from_document.
+        """
+        self.collection = collection
+        self.bus_stop_index = bus_stop_index
+        self.max_age = max_age
+        self._unknown = TTLCache(ttl=negative_ttl, maxsize=10000) # IDs known not to exist
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock() # Held while rebuilding, so only one thread scans the collection
+        self._descriptors: list[HawkerDescriptor] = []
+        self._by_key: dict[str, HawkerDescriptor] = {}
+        self._by_name: dict[str, HawkerDescriptor] = {}
+        self._located: list[HawkerDescriptor] = [] # Descriptors with coordinates, in grid order
+        self._grid = GridIndex([], [])
+        self._built_at: float = None
+        self.version = 0 # Incremented on every rebuild
+
+    def build(self):
+        """Rebuilds the index from the collection."""
+        descriptors = [
+            HawkerDescriptor.from_document(hawker_data, self.bus_stop_index)
+            for hawker_data in self.collection.find({}, DESCRIPTOR_PROJECTION)
+        ]
+
+        by_key = {}
+        by_name = {}
+        for descriptor in descriptors:
+            for key in (descriptor.object_id, descriptor.id):
+                if key:
+                    by_key.setdefault(key, descriptor)
+            by_name.setdefault(normalize_name(descriptor.display_name), descriptor)
+
+        located = [descriptor for descriptor in descriptors
+                   if descriptor.latitude is not None and descriptor.longitude is not None]
+        grid = GridIndex([descriptor.latitude for descriptor in located],
+                         [descriptor.longitude for descriptor in located],
+                         cell_size=1000.0,
+                         ellipsoidal=True)
+
+        with self._lock:
+            self._descriptors = descriptors
+            self._by_key = by_key
+            self._by_name = by_name
+            self._located = located
+            self._grid = grid
+            self._built_at = time.monotonic()
+            self.version += 1
+        self._unknown.clear()
+
+        print(f"Indexed {len(descriptors)} hawker centers")
+
+    def invalidate(self):
+        """Marks the index as stale, so it is rebuilt on its next use."""
+        with self._lock:
+            self._built_at = None
+
+    def _is_stale(self):
+        return self._built_at is None or time.monotonic() - self._built_at >= self.max_age
+
+    def _ensure_fresh(self):
+        if self._is_stale():
+            with self._build_lock:
+                if self._is_stale(): # Another thread may have rebuilt it while we waited
+                    self.build()
+
+    def get(self, key: str) -> HawkerDescriptor | None:
+        """Returns the descriptor of the hawker center with the given `_id` or `id`, or None."""
+        self._ensure_fresh()
+        return self._by_key.get(key)
+
+    def resolve(self, hawker_id: str) -> HawkerDescriptor | None:
+        """Resolves any known alias of a hawker center to its descriptor.
+
+        Accepts the `_id` (as a string), the Google Places `id`, or the display name,
+        ignoring case and punctuation. IDs missing from the index cost a single indexed
+        query on `_id`/`id`; IDs that are not found there either are remembered as
+        unknown, so repeated lookups of them do not reach MongoDB at all.
+
+        Returns:
+            HawkerDescriptor | None: The descriptor, or None if no hawker center matches.
+        """
+        descriptor = self.get(hawker_id) or self._by_name.get(normalize_name(hawker_id))
+        if descriptor is not None:
+            return descriptor
+
+        if self._unknown.get(hawker_id) is not None:
+            return None
+
+        # The hawker center may have been added since the index was built
+        query = [{"id": hawker_id}]
+        if ObjectId.is_valid(hawker_id):
+            query.append({"_id": ObjectId(hawker_id)})
+        hawker_data = self.collection.find_one({"$or": query}, DESCRIPTOR_PROJECTION)
+
+        if hawker_data is None:
+            self._unknown.put(hawker_id, True)
+            return None
+
+        descriptor = HawkerDescriptor.from_document(hawker_data, self.bus_stop_index)
+        with self._lock:
+            for key in (descriptor.object_id, descriptor.id, hawker_id):
+                if key:
+                    self._by_key.setdefault(key, descriptor)
+            self._by_name.setdefault(normalize_name(descriptor.display_name), descriptor)
+        return descriptor
+
+    def nearby(self, latitude: float, longitude: float, radius: float) -> list[tuple[HawkerDescriptor, float]]:
+        """Finds the hawker centers within a radius of a location.
+
+        Args:
+            latitude (float): The latitude of the location.
+            longitude (float): The longitude of the location.
+            radius (float): The search radius in meters.
+
+        Returns:
+            list[tuple[HawkerDescriptor, float]]: The hawker centers found and their
+                distance in meters, nearest first.
+        """
+        self._ensure_fresh()
+        located, grid = self._located, self._grid
+        positions, distances = grid.query_radius(latitude, longitude, radius)
+        return [(located[position], float(distance)) for position, distance in zip(positions, distances)]
+
+    def all(self) -> list[HawkerDescriptor]:
+        """Returns the descriptors of all hawker centers, in collection order."""
+        self._ensure_fresh()
+        return self._descriptors
+
+    def __len__(self):
+        return len(self._descriptors)
@@ -0,0 +1,16 @@
+""" Contains the pooled HTTP session shared by the LTA DataMall and Google Places clients. """
+
+import requests
+from requests.adapters import HTTPAdapter
+
+def create_session(pool_size: int = 10) -> requests.Session:
+    """Creates a requests session that keeps up to pool_size connections alive per host.
+
+    A session can be shared by several clients and threads; reusing its connections
+    skips the TCP and TLS handshakes that a module-level requests.get makes every time.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,231 @@
+""" Contains the live LTA features of hawker centers, and a background thread that keeps them up to date. """
+
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+class LiveFeatures(NamedTuple):
+    '''The features of a hawker center derived from live carpark and bus arrival data, normalized as in training.'''
+
+    available_lots: float
+    occupancy_rate: float
+    num_full_carparks: float
+    num_bus_services: float
+    bus_frequency: float
+    buses_arriving_soon: float
+
+def compute_live_features(carpark_data: list[dict], bus_arrival_data: dict, bus_stop_count: int, now: datetime) -> LiveFeatures:
+    """Computes the live features of a hawker center from its carparks' and bus stops' data.
+
+    Args:
+        carpark_data (list[dict]): The carpark availability records of the hawker center's carparks.
+        bus_arrival_data (dict): The bus arrival response of each of its bus stops, by bus stop code.
+        bus_stop_count (int): The number of bus stops of the hawker center, including those without data.
+        now (datetime): The time bus arrivals are counted from.
+
+    Returns:
+        LiveFeatures: The features, with defaults for missing carpark or bus data.
+    """
+    # Calculate carpark features
+    if carpark_data:
+        # Available lots
+        available_lots = [int(cp.get('AvailableLots', 0)) for cp in carpark_data]
+        avg_available_lots = sum(available_lots) / len(available_lots) if available_lots else 50
+
+        # Number of full carparks (less than 10% capacity)
+        # Assuming average carpark capacity of 100 for simplicity
+        num_full_carparks = sum(1 for lots in available_lots if lots < 10)
+
+        # Occupancy rate (assuming average capacity of 100 per carpark)
+        avg_occupancy_rate = 1 - (avg_available_lots / 100)
+    else:
+        avg_available_lots = 50  # Default value
+        avg_occupancy_rate = 0.5  # Default value
+        num_full_carparks = 0
+
+    # Calculate bus features
+    if bus_arrival_data:
+        # Count total buses arriving within next 10 minutes
+        # LTA arrival times carry a UTC offset, so compare them with an aware local time
+        if now.tzinfo is None:
+            now = now.astimezone()
+        buses_arriving_soon = 0
+        for stop, data in bus_arrival_data.items():
+            for service in data.get('Services', []):
+                next_bus = service.get('NextBus', {})
+                if next_bus and next_bus.get('EstimatedArrival'):
+                    arrival_time = datetime.fromisoformat(next_bus['EstimatedArrival'].replace('Z', '+00:00'))
+                    if arrival_time.tzinfo is None:
+                        arrival_time = arrival_time.astimezone()
+                    if (arrival_time - now).total_seconds() < 600:  # Within 10 minutes
+                        buses_arriving_soon += 1
+
+        # Count unique bus services
+        unique_services = set()
+        for stop, data in bus_arrival_data.items():
+            for service in data.get('Services', []):
+                unique_services.add(service.get('ServiceNo'))
+
+        num_bus_services = len(unique_services)
+        bus_frequency = 15 / (buses_arriving_soon / bus_stop_count) if buses_arriving_soon else 15
+    else:
+        num_bus_services = 5  # Default value
+        bus_frequency = 15  # Default value (minutes between buses)
+        buses_arriving_soon = 0
+
+    return LiveFeatures(
+        available_lots=avg_available_lots / 100.0,  # Normalize to 0-1 range
+        occupancy_rate=avg_occupancy_rate,
+        num_full_carparks=num_full_carparks / max(1, len(carpark_data)),  # Normalize by total carparks
+        num_bus_services=num_bus_services / 20.0,  # Normalize assuming max 20 services
+        bus_frequency=bus_frequency / 30.0,  # Normalize assuming max 30 minutes
+        buses_arriving_soon=buses_arriving_soon / 20.0,  # Normalize assuming max 20 buses
+    )
+
+class LiveFeatureRefresher:
+    ''' Precomputes the live features of every hawker center on a fixed cadence.
+
+    A daemon thread fetches the carpark availability feed and the bus arrivals of every
+    indexed bus stop once per interval, computes each hawker center's features, and
+    swaps in the new table as a whole. Predictions then read the table instead of
+    calling LTA DataMall, and fall back to fetching live data themselves for hawker
+    centers missing from it or once it is older than max_age.
+    '''
+
+    def __init__(self, predictor, interval: float = 60.0, max_age: float = None, clock=time.time):
+        """Initializes the refresher without starting it.
+
+        Args:
+            predictor (HawkerCrowdPredictor): Provides the hawker center index and the
+                (cached) LTA DataMall fetches.
+            interval (float, optional): The number of seconds between refreshes. Defaults to 60 seconds.
+            max_age (float, optional): The age in seconds after which the table is no longer
+                used, e.g. when LTA DataMall is down. Defaults to 5 intervals.
+            clock (callable, optional): The wall clock the table is timestamped with. Defaults to time.time.
+        """
+        self.predictor = predictor
+        self.interval = interval
+        self.max_age = 5 * interval if max_age is None else max_age
+        self._clock = clock
+        self._table = ({}, None) # (LiveFeatures by hawker center object id, refreshed at), replaced as a whole
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.listeners = [] # Called without arguments after each successful refresh
+        self.refreshes = 0
+        self.failures = 0
+        self.last_duration = None
+
+    def refresh(self):
+        """Recomputes the live features of every indexed hawker center.
+
+        The carparks and bus stops of every hawker center are fetched together, so the
+        refresh waits on one carpark lookup and one concurrent bus arrival fan-out rather
+        than one of each per hawker center. Data that cannot be fetched or used is replaced
+        by defaults, as in HawkerCrowdPredictor.fetch_live_features, but if no data could be
+        fetched at all the refresh fails and the previous table is kept.
+        """
+        start = time.perf_counter()
+        refreshed_at = self._clock()
+        now = datetime.now()
+        descriptors = self.predictor.hawker_index.all()
+        errors = []
+
+        carpark_ids = list(dict.fromkeys(carpark_id for descriptor in descriptors for carpark_id in descriptor.carpark_ids))
+        carparks = {} # Carpark ID -> its availability records
+        if carpark_ids:
+            try:
+                for record in self.predictor.get_carpark_data(carpark_ids):
+                    carparks.setdefault(record.get('CarParkID'), []).append(record)
+            except Exception as e:
+                print(f"Error getting carpark data: {e}")
+                errors.append(e)
+
+        bus_stop_codes = list(dict.fromkeys(code for descriptor in descriptors for code in descriptor.bus_stop_codes))
+        bus_arrivals = {}
+        if bus_stop_codes:
+            try:
+                # Stops still pending after one interval are left out until the next refresh
+                bus_arrivals = self.predictor.get_bus_arrival_data(bus_stop_codes, timeout=self.interval)
+            except Exception as e:
+                print(f"Error getting bus arrival data: {e}")
+                errors.append(e)
+
+        if errors and len(errors) == bool(carpark_ids) + bool(bus_stop_codes):
+            raise errors[0]
+
+        table = {}
+        for descriptor in descriptors:
+            carpark_data = [record for carpark_id in dict.fromkeys(descriptor.carpark_ids) for record in carparks.get(carpark_id, ())]
+            bus_arrival_data = {code: bus_arrivals[code] for code in descriptor.bus_stop_codes if code in bus_arrivals}
+            try:
+                live_features = compute_live_features(carpark_data, bus_arrival_data, len(descriptor.bus_stop_codes), now)
+            except Exception as e:
+                print(f"Error computing live features of {descriptor.display_name}: {e}")
+                live_features = compute_live_features([], {}, len(descriptor.bus_stop_codes), now)
+            table[descriptor.object_id] = live_features
+
+        self._table = (table, refreshed_at)
+        self.refreshes += 1
+        self.last_duration = time.perf_counter() - start
+
+    def get(self, descriptor) -> tuple[LiveFeatures, float] | None:
+        """Returns the precomputed live features of a hawker center and when they were computed.
+
+        Returns:
+            tuple[LiveFeatures, float] | None: The features and their wall clock timestamp,
+                or None if the hawker center is not in the table or the table is too old.
+        """
+        table, refreshed_at = self._table
+        live_features = table.get(descriptor.object_id)
+        if live_features is None or self._clock() - refreshed_at > self.max_age:
+            return None
+        return live_features, refreshed_at
+
+    @property
+    def refreshed_at(self) -> float | None:
+        """The wall clock time of the last refresh, or None if the table was never computed."""
+        return self._table[1]
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                self.failures += 1
+                print(f"Error refreshing live features: {e}")
+            else:
+                for listener in self.listeners:
+                    try:
+                        listener()
+                    except Exception as e:
+                        print(f"Error after refreshing live features: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Starts refreshing in a daemon thread, beginning with an immediate refresh."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="live-feature-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """Stops the refresher thread, waiting for a refresh in progress to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        """Returns the refresh counters and the age of the table in seconds."""
+        table, refreshed_at = self._table
+        return {
+            "hawker_centers": len(table),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "interval": self.interval,
+            "age": round(self._clock() - refreshed_at, 3) if refreshed_at is not None else None,
+            "last_duration": round(self.last_duration, 3) if self.last_duration is not None else None,
+        }
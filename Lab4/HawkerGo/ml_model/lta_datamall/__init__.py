@@ -1,2 +1,7 @@
 from .api_client import LTADataMallClient
-from .api_endpoints import LTADataMallEndpoints
\ No newline at end of file
+from .async_api_client import AsyncLTADataMallClient
+from .api_endpoints import LTADataMallEndpoints
+from .snapshot_cache import SnapshotCache, FeedSnapshot
+from .disk_cache import FeedDiskCache, STATIC_FEED_TTLS
+from .ttl_cache import TTLCache
+from .bus_stop_index import BusStopIndex, BUS_STOP_CODE_PATTERN
\ No newline at end of file
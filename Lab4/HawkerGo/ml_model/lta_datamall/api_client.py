@@ -1,42 +1,107 @@
 ''' Contains client class for fetching data from LTA DataMall API. '''
 
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
 import requests
 
+from http_session import create_session
+
 from .api_endpoints import LTADataMallEndpoints as Endpoint
+from .disk_cache import FeedDiskCache
+
+class PagePlan(NamedTuple):
+    ''' The pages of a paginated request after its first page, numbered from 1 up to last_page. '''
+
+    params: dict     # The parameters of the first page
+    offset: int      # The *$skip* of the first page
+    page_size: int   # The number of records in a full page
+    last_page: int   # The number of the last page to request, counting the first page as page 0
+
+    def page_params(self, page: int) -> dict:
+        """Returns the parameters requesting the given page."""
+        return {**self.params, '$skip': self.offset + page * self.page_size}
+
+    @staticmethod
+    def is_last(response: dict) -> bool:
+        """Returns whether a page is empty, so no pages after it need to be requested."""
+        return not response.get('value')
 
 class LTADataMallClient:
     ''' Client class for fetching data from LTA DataMall API. '''
     
     BASE_URL = "https://datamall2.mytransport.sg/ltaodataservice/"
+    MAX_REQUESTS = 200 # Requests made at most for one feed, i.e. 100,000 records
 
-    def __init__(self, api_key: str = None):
+    def __init__(self,
+                 api_key: str = None,
+                 timeout: float = 30,
+                 session: requests.Session = None,
+                 pool_size: int = 10,
+                 base_url: str = None,
+                 cache_dir: str = None,
+                 cache_ttls: dict = None):
         """Initializes the LTADataMallClient with the given API key.
 
         Args:
             api_key (_type_): The API key to use for authenticating with the LTA DataMall API. 
+            timeout (float, optional): The number of seconds to wait for each request
+                before giving up. Defaults to 30 seconds. None waits indefinitely.
+            session (requests.Session, optional): The session to send requests through.
+                Pass the same session to several clients to share its connection pool.
+                Defaults to a new session from create_session.
+            pool_size (int, optional): The number of connections kept alive by a new session.
+                Should be at least the number of threads using the client. Defaults to 10.
+            base_url (str, optional): Overrides BASE_URL, e.g. to point at a local stub server.
+            cache_dir (str, optional): The directory to keep downloaded reference feeds in across runs,
+                created when the first feed is stored.
+                Defaults to None, which disables the disk cache.
+            cache_ttls (dict, optional): Maps each endpoint to cache on disk to the number of seconds
+                its downloads are reused. Defaults to STATIC_FEED_TTLS (BusStops, BusServices,
+                BusRoutes and TaxiStands).
         """        
         
         if api_key is None:
             raise ValueError("API key is required to access LTA DataMall API.")
         
         self.api_key: str = api_key
+        self.timeout: float = timeout
+        self.session: requests.Session = session if session is not None else create_session(pool_size)
+        self.base_url: str = base_url or self.BASE_URL
+        self.disk_cache: FeedDiskCache = FeedDiskCache(cache_dir, cache_ttls) if cache_dir else None
         self._fetch_ignore_endpoint = [
             Endpoint.BUS_ARRIVAL,
             Endpoint.TAXI_STANDS,
             Endpoint.TRAIN_SERVICE_ALERTS,
         ] # Endpoints that ignore the $skip parameter
 
-    def fetch(self, endpoint: Endpoint, params: dict = {}, amount: int = None) -> dict:
+    def request(self, endpoint: Endpoint, params: dict = None) -> dict:
+        """Sends a single request to the given endpoint and returns its JSON response.
+
+        Args:
+            endpoint (Endpoint): The endpoint to request.
+            params (dict, optional): The query parameters, e.g. {'$skip': 500} for the second page.
+        """
+        headers = {"AccountKey": self.api_key, "Accept": "application/json"}
+        target_url = self.base_url + endpoint.value
+        response = self.session.get(target_url, headers=headers, params=params, timeout=self.timeout)
+        return response.json()
+
+    def fetch(self, endpoint: Endpoint, params: dict = None, amount: int = None) -> dict:
         """Fetches data from the LTA DataMall API using the given endpoint and parameters.
         The amount parameter specifies the number of records to fetch and will be used for
         repeated requests if the endpoint supports pagination.
         
         Note that to avoid catastrophic API usage, the maximum number of requests is limited to 200,
         equivalent to fetching 100,000 records; after which the function will return all data fetched.
+        
+        The whole response is held in memory; use iter_records to process a large feed page by page.
 
         Args:
             endpoint (str): The endpoint to fetch data from.
-            params (dict, optional): The parameters to pass to the endpoint.
+            params (dict, optional): The parameters to pass to the endpoint. Not modified.
             amount (int, optional): The amount of data to fetch. For some endpoint requests,
                 this value is ignored. Defaults to None.
                 - If value is None, no *$skip* parameter is added.
@@ -50,47 +115,135 @@ class LTADataMallClient:
             dict: The JSON response from the API.
         """        
         
-        # Set the headers and target URL
-        headers = {"AccountKey": self.api_key, "Accept": "application/json"}
-        target_url = self.BASE_URL + endpoint.value
-        
-        # If only one request is needed, fetch the data and return it
-        if amount is None or endpoint in self._fetch_ignore_endpoint:
-            response = requests.get(target_url, headers=headers, params=params)
-            return response.json()
-        
-        # Fetch data in multiple requests until specified amount is reached
-        data: dict = None               # Data fetched so far
-        offset = params.get('$skip', 0) # Offset for the current request
-        count = 0                       # Number of records fetched so far
-        retrieved_count = 0             # Number of records retrieved for the current request
-        request_count = 0               # Number of requests made so far
+        # Only one request is needed if the amount is not given or ignored by the endpoint
+        if endpoint in self._fetch_ignore_endpoint:
+            amount = None
         
-        # Repeat fetch request until the required amount of data is fetched
-        while count < amount or amount == -1:
-            response = requests.get(target_url, headers=headers, params=params)
-            
-            retrieved_data = response.json()
-            retrieved_count = len(retrieved_data['value'])
-            
+        data: dict = None # Data fetched so far
+        for retrieved_data in self._iter_pages(endpoint, params, amount, prefetch=0):
             if data is None: # First request
                 data = retrieved_data # Initialize the data, which includes the metadata as well
             else: # Subsequent requests
-                data['value'] += retrieved_data['value'] # Append the new data to the existing data
-                count += retrieved_count                 # Update the total count of records fetched
-
-            # Update the offset for the next request
-            params['$skip'] = offset + count
-            
-            request_count += 1
-            if request_count > 200: # Limit the number of requests to prevent infinite loops
-                break
-            
-            if retrieved_count == 0: # No more data to fetch, exit the loop early
-                break
+                data['value'].extend(retrieved_data['value']) # Append the new data to the existing data
             
         # Slice off excess data if amount is specified
-        if amount != -1:
-            data['value'] = data['value'][:amount]
+        if amount is not None and amount != -1:
+            del data['value'][amount:]
             
-        return data
\ No newline at end of file
+        return data
+
+    def iter_records(self, endpoint: Endpoint, params: dict = None, amount: int = -1, prefetch: int = 1):
+        """Yields the records of a feed one by one, downloading it page by page as they are consumed.
+
+        Unlike fetch, only the page being consumed and the pages being prefetched are held in memory,
+        and the records of one page can be processed while the next pages are downloaded.
+
+        Args:
+            endpoint (Endpoint): The endpoint to fetch records from. Endpoints that ignore the
+                amount parameter are requested once, yielding the records in their 'value' field.
+            params (dict, optional): The parameters to pass to the endpoint. Not modified.
+            amount (int, optional): The amount of records to yield. Defaults to -1, which yields
+                every record. A *$skip* parameter is taken as an offset, as in fetch.
+            prefetch (int, optional): The number of following pages requested while a page is
+                consumed, each on its own thread. Defaults to 1. 0 downloads the next page only
+                once the current page has been consumed.
+
+        Yields:
+            dict: The records of the feed, in order.
+        """
+        if endpoint in self._fetch_ignore_endpoint:
+            amount = None
+        
+        remaining = amount
+        for retrieved_data in self._iter_pages(endpoint, params, amount, prefetch):
+            records = retrieved_data.get('value', [])
+            if amount is not None and amount != -1:
+                records = records[:remaining]
+                remaining -= len(records)
+            yield from records
+
+    def _iter_pages(self, endpoint: Endpoint, params: dict, amount: int, prefetch: int):
+        """Yields the JSON responses of a request, serving it from the disk cache when possible.
+
+        A cached feed is read from disk a page at a time as the pages are consumed. Otherwise the
+        pages are downloaded and, for cached endpoints, stored once the download completes.
+        """
+        if self.disk_cache is None or not self.disk_cache.is_cached(endpoint):
+            yield from self._iter_responses(endpoint, params, amount, prefetch)
+            return
+        
+        cached_pages = self.disk_cache.load(endpoint, params, amount)
+        if cached_pages is not None:
+            yield from cached_pages
+            return
+        
+        with self.disk_cache.writer(endpoint, params, amount) as writer:
+            for retrieved_data in self._iter_responses(endpoint, params, amount, prefetch):
+                writer.write_page(retrieved_data)
+                yield retrieved_data
+
+    def _plan_pages(self, params: dict, amount: int, first_page: dict) -> PagePlan | None:
+        """Plans the pages to request after the first page of a paginated request.
+
+        The first page gives the page size, from which the offset of every following page is
+        known. At most MAX_REQUESTS pages are requested, and no more than amount records need.
+
+        Returns:
+            PagePlan | None: The following pages, or None if the first page was empty.
+        """
+        page_size = len(first_page.get('value', []))
+        if page_size == 0:
+            return None
+        
+        last_page = self.MAX_REQUESTS - 1
+        if amount != -1:
+            last_page = min(last_page, math.ceil(amount / page_size) - 1)
+        return PagePlan(params, params.get('$skip', 0), page_size, last_page)
+    
+    def _iter_responses(self, endpoint: Endpoint, params: dict, amount: int, prefetch: int):
+        """Yields the JSON response of each page of a request, in order. Makes a single request if amount is None.
+
+        The first page gives the page size, from which the offset of every following page is
+        known, so up to prefetch of them are requested ahead on a thread pool. Stops after the
+        first empty page, once amount records were retrieved, or after MAX_REQUESTS requests.
+        """
+        if amount is None: # Not paginated
+            yield self.request(endpoint, params)
+            return
+        
+        params = dict(params or {})
+        first_page = self.request(endpoint, params)
+        yield first_page
+        
+        plan = self._plan_pages(params, amount, first_page)
+        if plan is None: # No more data to fetch
+            return
+        last_page = plan.last_page
+        
+        def request_page(page):
+            return self.request(endpoint, plan.page_params(page))
+        
+        if prefetch < 1:
+            for page in range(1, last_page + 1):
+                retrieved_data = request_page(page)
+                yield retrieved_data
+                if PagePlan.is_last(retrieved_data): # No more data to fetch, exit the loop early
+                    return
+            return
+        
+        pool = ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix="lta-prefetch")
+        pending = deque() # Futures of the requested pages, in page order
+        next_page = 1
+        try:
+            while pending or next_page <= last_page:
+                # Keep up to prefetch pages in flight while the current one is consumed
+                while len(pending) <= prefetch and next_page <= last_page:
+                    pending.append(pool.submit(request_page, next_page))
+                    next_page += 1
+                
+                retrieved_data = pending.popleft().result()
+                yield retrieved_data
+                if PagePlan.is_last(retrieved_data): # No more data to fetch, exit the loop early
+                    return
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
\ No newline at end of file
@@ -0,0 +1,118 @@
+''' Contains an asyncio client that downloads the pages of LTA DataMall feeds concurrently. '''
+
+import asyncio
+import weakref
+
+import requests
+
+from .api_client import LTADataMallClient, PagePlan
+from .api_endpoints import LTADataMallEndpoints as Endpoint
+
+class AsyncLTADataMallClient:
+    ''' Asyncio client for the LTA DataMall API, with the same fetch semantics as LTADataMallClient.
+
+    A paginated feed is downloaded by reading its first page to learn the page size, then
+    requesting the following pages concurrently and reassembling them in order. Requests are
+    sent through a pooled LTADataMallClient on worker threads, at most max_concurrency at a time
+    across every fetch made with the client.
+    '''
+
+    def __init__(self,
+                 api_key: str = None,
+                 max_concurrency: int = 8,
+                 timeout: float = 30,
+                 session: requests.Session = None,
+                 base_url: str = None):
+        """Initializes the client with the given API key.
+
+        Args:
+            api_key (str): The API key to use for authenticating with the LTA DataMall API.
+            max_concurrency (int, optional): The maximum number of requests in flight at once.
+                Defaults to 8.
+            timeout (float, optional): The number of seconds to wait for each request. Defaults to 30 seconds.
+            session (requests.Session, optional): The session to send requests through.
+                Defaults to a new session keeping max_concurrency connections alive.
+            base_url (str, optional): Overrides LTADataMallClient.BASE_URL, e.g. to point at a local stub server.
+        """
+        if max_concurrency < 1:
+            raise ValueError("Parameter 'max_concurrency' must be at least 1.")
+
+        self.client = LTADataMallClient(api_key,
+                                        timeout=timeout,
+                                        session=session,
+                                        pool_size=max_concurrency,
+                                        base_url=base_url)
+        self.max_concurrency = max_concurrency
+        self._semaphores = weakref.WeakKeyDictionary() # Event loop -> semaphore bounding its requests
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Returns the semaphore of the running event loop, so the client can be reused across asyncio.run calls."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def request(self, endpoint: Endpoint, params: dict = None) -> dict:
+        """Sends a single request to the given endpoint and returns its JSON response."""
+        async with self._semaphore():
+            return await asyncio.to_thread(self.client.request, endpoint, params)
+
+    async def fetch(self, endpoint: Endpoint, params: dict = None, amount: int = None) -> dict:
+        """Fetches data from the LTA DataMall API, requesting the pages of paginated feeds concurrently.
+
+        Takes the same arguments and returns the same data as LTADataMallClient.fetch. When
+        fetching a whole feed (amount=-1), pages are requested until the first empty page; up to
+        max_concurrency requests for the pages after it may already be in flight, and are discarded.
+
+        Args:
+            endpoint (Endpoint): The endpoint to fetch data from.
+            params (dict, optional): The parameters to pass to the endpoint. Not modified.
+            amount (int, optional): The amount of data to fetch. See LTADataMallClient.fetch.
+
+        Returns:
+            dict: The JSON response of the first page, with the records of every page in its 'value'.
+        """
+        params = dict(params or {})
+
+        if amount is None or endpoint in self.client._fetch_ignore_endpoint:
+            return await self.request(endpoint, params)
+
+        data = await self.request(endpoint, params)
+
+        # The same pages as LTADataMallClient.iter_records requests; last_page shrinks when an empty page is found
+        plan = self.client._plan_pages(params, amount, data)
+        if plan is None or plan.last_page < 1:
+            if amount != -1:
+                data['value'] = data['value'][:amount]
+            return data
+
+        last_page = plan.last_page
+        next_page = 1
+        pages: dict[int, list] = {}
+
+        async def download_pages():
+            nonlocal next_page, last_page
+            while next_page <= last_page:
+                page = next_page
+                next_page += 1
+                retrieved_data = await self.request(endpoint, plan.page_params(page))
+                pages[page] = retrieved_data.get('value', [])
+                if PagePlan.is_last(retrieved_data):
+                    last_page = min(last_page, page)
+
+        workers = [asyncio.create_task(download_pages()) for _ in range(min(self.max_concurrency, last_page))]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for worker in workers:
+                worker.cancel()
+            raise
+
+        for page in range(1, last_page + 1):
+            data['value'] += pages[page]
+
+        if amount != -1:
+            data['value'] = data['value'][:amount]
+
+        return data
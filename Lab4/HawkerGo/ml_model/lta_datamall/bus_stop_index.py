@@ -0,0 +1,70 @@
+''' Contains an index of the LTA DataMall bus stops, by code and by location. '''
+
+import re
+
+from geo import GridIndex
+
+from .api_endpoints import LTADataMallEndpoints as Endpoint
+
+# Bus stop codes are 5-digit numbers that might appear in a bus stop's display name
+BUS_STOP_CODE_PATTERN = re.compile(r'\b\d{5}\b')
+
+class BusStopIndex:
+    ''' Looks up LTA bus stops by BusStopCode in constant time, and by location through a spatial grid.
+
+    Build it once from the BusStops feed and share it between the data collector and the predictor.
+    '''
+
+    def __init__(self, records, cell_size: float = 100.0):
+        """Builds the index from the records of the BusStops feed.
+
+        Args:
+            records (Iterable[dict]): The records of the BusStops feed, read in a single pass,
+                so a stream such as LTADataMallClient.iter_records can be passed directly.
+                Records with missing or malformed coordinates can still be found by code,
+                but not by location.
+            cell_size (float, optional): The side of each grid cell in meters. Defaults to 100 meters,
+                suited to matching stops within a few tens of meters.
+        """
+        self.records: list[dict] = []
+        self._by_code: dict[str, dict] = {}
+        self._located: list[dict] = []
+        latitudes, longitudes = [], []
+        for record in records:
+            self.records.append(record)
+            self._by_code.setdefault(record.get('BusStopCode'), record)
+            try:
+                latitude = float(record.get('Latitude'))
+                longitude = float(record.get('Longitude'))
+            except (ValueError, TypeError):
+                continue
+            self._located.append(record)
+            latitudes.append(latitude)
+            longitudes.append(longitude)
+
+        self._grid = GridIndex(latitudes, longitudes, cell_size=cell_size)
+
+    @classmethod
+    def from_client(cls, lta_client, **kwargs) -> "BusStopIndex":
+        """Downloads every bus stop with the given LTADataMallClient and builds the index as the pages arrive."""
+        return cls(lta_client.iter_records(Endpoint.BUS_STOPS), **kwargs)
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, code: str) -> dict | None:
+        """Returns the bus stop with the given BusStopCode, or None if there is none."""
+        return self._by_code.get(code)
+
+    def within(self, latitude: float, longitude: float, radius: float) -> list[tuple[dict, float]]:
+        """Returns the bus stops within a radius of a location and their distances in meters, nearest first."""
+        positions, distances = self._grid.query_radius(latitude, longitude, radius)
+        return [(self._located[i], float(distance)) for i, distance in zip(positions, distances)]
+
+    def nearest(self, latitude: float, longitude: float, max_distance: float = 50.0) -> tuple[dict | None, float | None]:
+        """Returns the bus stop nearest to a location and its distance in meters,
+        or (None, None) if no bus stop is within max_distance."""
+        positions, distances = self._grid.query_radius(latitude, longitude, max_distance)
+        if len(positions) == 0:
+            return None, None
+        return self._located[positions[0]], float(distances[0])
@@ -0,0 +1,240 @@
+''' Contains a persistent on-disk cache for the static LTA DataMall reference feeds. '''
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .api_endpoints import LTADataMallEndpoints as Endpoint
+
+DAY = 24 * 60 * 60
+
+# Feeds that LTA only updates when the network changes, and how long a download is reused
+STATIC_FEED_TTLS = {
+    Endpoint.BUS_STOPS: 7 * DAY,
+    Endpoint.BUS_SERVICES: 7 * DAY,
+    Endpoint.BUS_ROUTES: 7 * DAY,
+    Endpoint.TAXI_STANDS: 1 * DAY,
+}
+
+PAGE_SIZE = 500 # Records per page of LTA DataMall, and per page read from a cached feed
+
+class FeedDiskCache:
+    ''' Stores downloaded feeds as gzip-compressed JSON lines files, one per request.
+
+    Each file is named after a hash of the endpoint, parameters and amount of its request,
+    and holds a header line (the request, download time and response metadata) followed
+    by one line per record. Files are written to a temporary name and renamed once the
+    download completes, so readers never see a partial feed.
+
+    Cached feeds are streamed through gzip a page at a time rather than memory-mapped: a
+    compressed file cannot be used in place, so mapping it would still decompress the whole
+    feed into memory, while streaming holds one page. The directory is only created when a
+    feed is first stored, and a feed that cannot be stored is simply downloaded next time.
+    '''
+
+    def __init__(self, cache_dir: str, ttls: dict = None, clock=time.time):
+        """Initializes the cache in the given directory, which is created on the first store.
+
+        Args:
+            cache_dir (str): The directory the feed files are stored in.
+            ttls (dict, optional): Maps each cached endpoint to the number of seconds a download
+                is reused. Endpoints missing from it are never cached. Defaults to STATIC_FEED_TTLS.
+            clock (callable, optional): Returns the current time as a Unix timestamp. Defaults to time.time.
+        """
+        self.cache_dir = cache_dir
+        self.ttls = STATIC_FEED_TTLS if ttls is None else ttls
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self.hits = 0    # Feeds loaded from disk
+        self.misses = 0  # Feeds missing or expired, downloaded again
+        self.stores = 0  # Feeds written to disk
+        self.write_errors = 0 # Feeds that could not be written, e.g. to a read-only directory
+
+    def is_cached(self, endpoint: Endpoint) -> bool:
+        """Returns whether responses of the given endpoint are cached."""
+        return endpoint in self.ttls
+
+    def key(self, endpoint: Endpoint, params: dict = None, amount: int = None) -> str:
+        """Returns the cache key of a request, a hash of its endpoint, parameters and amount."""
+        request = json.dumps([endpoint.value, params or {}, amount], sort_keys=True, default=str)
+        return hashlib.sha256(request.encode()).hexdigest()[:32]
+
+    def path(self, key: str) -> str:
+        """Returns the path of the file storing the feed with the given key."""
+        return os.path.join(self.cache_dir, f"{key}.jsonl.gz")
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def load(self, endpoint: Endpoint, params: dict = None, amount: int = None, page_size: int = PAGE_SIZE):
+        """Opens the cached response of a request, or returns None if it is missing or expired.
+
+        Only the header is read here; the records are read line by line as the pages are
+        consumed, so at most one page of a cached feed is held in memory.
+
+        Args:
+            page_size (int, optional): The number of records in each page. Defaults to PAGE_SIZE,
+                the page size of LTA DataMall.
+
+        Returns:
+            Iterator[dict] | None: The pages of the response as fetch's requests return them,
+                each with up to page_size records in its 'value'.
+        """
+        path = self.path(self.key(endpoint, params, amount))
+        try:
+            file = gzip.open(path, 'rb')
+        except OSError: # Missing, or the directory cannot be read
+            self._count('misses')
+            return None
+
+        try:
+            header = json.loads(file.readline())
+            expired = self._clock() - header['fetched_at'] >= self.ttls.get(endpoint, 0)
+        except (OSError, ValueError, KeyError, EOFError) as e: # Corrupt or truncated file
+            file.close()
+            self._discard(path, e)
+            self._count('misses')
+            return None
+
+        if expired:
+            file.close()
+            self._count('misses')
+            return None
+
+        self._count('hits')
+        return self._iter_pages(file, path, header['metadata'], page_size)
+
+    def _iter_pages(self, file, path: str, metadata: dict, page_size: int):
+        """Yields the records of an open feed file in pages, closing it once done."""
+        with file:
+            try:
+                lines = []
+                yielded = False
+                for line in file:
+                    if line.strip():
+                        lines.append(line)
+                    if len(lines) == page_size:
+                        # Parse a page of record lines in one call instead of one json.loads per line
+                        yield {**metadata, 'value': json.loads(b'[' + b','.join(lines) + b']')}
+                        lines = []
+                        yielded = True
+                if lines or not yielded:
+                    yield {**metadata, 'value': json.loads(b'[' + b','.join(lines) + b']')}
+            except (OSError, ValueError, EOFError) as e: # Corrupt after the header; records were already yielded
+                self._discard(path, e)
+                raise
+
+    def _discard(self, path: str, error: Exception):
+        """Removes an unreadable feed file, so it is downloaded again."""
+        print(f"Discarding unreadable cached feed {path}: {error}")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def writer(self, endpoint: Endpoint, params: dict = None, amount: int = None) -> "FeedWriter":
+        """Returns a context manager that stores the pages of a request as they are downloaded.
+
+        The feed is only stored if the with block completes without an exception.
+        """
+        return FeedWriter(self, endpoint, params, amount)
+
+    def clear(self):
+        """Removes every cached feed."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.jsonl.gz'):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def stats(self) -> dict:
+        """Returns the hit/miss/store counters of the cache."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "stores": self.stores, "write_errors": self.write_errors}
+
+class FeedWriter:
+    ''' Writes the pages of one feed to a temporary file, moved into the cache on success.
+
+    A failure to write, e.g. in a read-only directory, only disables the writer: the pages
+    are still passed on, and the feed is downloaded again next time.
+    '''
+
+    def __init__(self, cache: FeedDiskCache, endpoint: Endpoint, params: dict, amount: int):
+        self.cache = cache
+        self.request = {"endpoint": endpoint.value, "params": params or {}, "amount": amount}
+        self.path = cache.path(cache.key(endpoint, params, amount))
+        self._file = None
+        self._temp_path = None
+
+    def __enter__(self):
+        self._has_header = False
+        try:
+            os.makedirs(self.cache.cache_dir, exist_ok=True)
+            fd, self._temp_path = tempfile.mkstemp(dir=self.cache.cache_dir, suffix='.tmp')
+            self._file = gzip.open(os.fdopen(fd, 'wb'), 'wb', compresslevel=6)
+        except OSError as e:
+            self._fail(e)
+        return self
+
+    def _fail(self, error: Exception):
+        """Stops writing the feed and removes its temporary file."""
+        print(f"Not caching feed {self.request['endpoint']} in {self.cache.cache_dir}: {error}")
+        self.cache._count('write_errors')
+        self._close()
+        if self._temp_path is not None:
+            try:
+                os.remove(self._temp_path)
+            except OSError:
+                pass
+            self._temp_path = None
+
+    def _close(self):
+        if self._file is not None:
+            fileobj = self._file.fileobj
+            try:
+                self._file.close()
+            finally:
+                fileobj.close()
+                self._file = None
+
+    def write_page(self, response: dict):
+        """Appends the records of a page; the metadata of the first page becomes the feed's metadata."""
+        if self._file is None:
+            return
+
+        try:
+            if not self._has_header:
+                header = {
+                    **self.request,
+                    "fetched_at": self.cache._clock(),
+                    "metadata": {k: v for k, v in response.items() if k != 'value'},
+                }
+                self._file.write(json.dumps(header).encode() + b'\n')
+                self._has_header = True
+
+            records = response.get('value') or []
+            if records:
+                self._file.write(b'\n'.join(json.dumps(record, separators=(',', ':')).encode() for record in records) + b'\n')
+        except OSError as e:
+            self._fail(e)
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self._temp_path is None: # Writing failed
+            return False
+
+        try:
+            self._close()
+            if exc_type is None and self._has_header:
+                os.replace(self._temp_path, self.path)
+                self.cache._count('stores')
+            else:
+                os.remove(self._temp_path)
+        except OSError as e:
+            self._fail(e)
+        return False
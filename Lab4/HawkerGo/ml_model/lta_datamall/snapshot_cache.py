@@ -0,0 +1,143 @@
+''' Contains a process-wide cache for whole-feed snapshots of the LTA DataMall API. '''
+
+import threading
+import time
+
+
+class FeedSnapshot:
+    ''' A single download of an LTA DataMall feed, indexed by one of its record fields. '''
+
+    def __init__(self, records: list[dict], key_field: str = None, fetched_at: float = 0.0):
+        """Builds the snapshot and its lookup index.
+
+        Args:
+            records (list[dict]): The records of the feed, i.e. the 'value' list of the response.
+            key_field (str, optional): The record field to index by, e.g. 'CarParkID'.
+                Records sharing the same key (such as different lot types of one carpark)
+                are grouped together. If None, no index is built.
+            fetched_at (float): The clock time at which the feed was downloaded.
+        """
+        self.records = records
+        self.fetched_at = fetched_at
+        self.index: dict[str, list[dict]] = {}
+        if key_field is not None:
+            for record in records:
+                self.index.setdefault(record.get(key_field), []).append(record)
+
+    def lookup(self, keys) -> list[dict]:
+        """Returns all records matching the given keys, in the order of the keys.
+        Duplicate and unknown keys are ignored."""
+        return [record
+                for key in dict.fromkeys(keys)
+                for record in self.index.get(key, ())]
+
+
+class SnapshotCache:
+    ''' Caches feed snapshots for a fixed time-to-live, keyed by endpoint.
+
+    Concurrent misses on the same key are coalesced so that only one thread
+    downloads the feed, while the others wait for and share its result.
+    '''
+
+    def __init__(self, ttl: float = 60.0, clock=time.monotonic):
+        """Initializes an empty cache.
+
+        Args:
+            ttl (float, optional): The number of seconds a snapshot is served before it is
+                downloaded again. Defaults to 60 seconds, matching the refresh rate of
+                LTA DataMall's real-time feeds.
+            clock (callable, optional): The clock used for expiry. Defaults to time.monotonic.
+        """
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._snapshots: dict = {}  # Key -> FeedSnapshot
+        self._inflight: dict = {}   # Key -> threading.Event set once the leading fetch is done
+        self._errors: dict = {}     # Key -> exception raised by the last leading fetch
+
+        self.hits = 0       # Requests served from a fresh snapshot
+        self.misses = 0     # Requests that found no fresh snapshot
+        self.fetches = 0    # Number of feed downloads actually made
+        self.coalesced = 0  # Misses that waited on another thread's download
+
+    def get(self, key, loader, key_field: str = None, ttl: float = None) -> FeedSnapshot:
+        """Returns the snapshot for the given key, downloading it with loader if it is missing or stale.
+
+        Args:
+            key (Hashable): The cache key, usually an LTADataMallEndpoints member.
+            loader (callable): Called without arguments to download the feed.
+                Must return the list of records.
+            key_field (str, optional): The record field to index the snapshot by.
+            ttl (float, optional): Overrides the cache's time-to-live for this key.
+
+        Returns:
+            FeedSnapshot: The cached or freshly downloaded snapshot.
+        """
+        ttl = self.ttl if ttl is None else ttl
+
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None and self._clock() - snapshot.fetched_at < ttl:
+                self.hits += 1
+                return snapshot
+
+            self.misses += 1
+            event = self._inflight.get(key)
+            is_leader = event is None
+            if is_leader: # No download in progress, this thread performs it
+                event = self._inflight[key] = threading.Event()
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            event.wait()
+            with self._lock:
+                error = self._errors.get(key)
+                snapshot = self._snapshots.get(key)
+            if error is not None:
+                raise error
+            return snapshot
+
+        try:
+            records = loader()
+            snapshot = FeedSnapshot(records, key_field, fetched_at=self._clock())
+            with self._lock:
+                self.fetches += 1
+                self._snapshots[key] = snapshot
+                self._errors.pop(key, None)
+            return snapshot
+        except Exception as e:
+            with self._lock:
+                self._errors[key] = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def invalidate(self, key=None):
+        """Drops the snapshot for the given key, or all snapshots if no key is given."""
+        with self._lock:
+            if key is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(key, None)
+
+    def stats(self) -> dict:
+        """Returns the hit/miss counters and the age of every cached snapshot in seconds."""
+        with self._lock:
+            now = self._clock()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "fetches": self.fetches,
+                "coalesced": self.coalesced,
+                "ttl": self.ttl,
+                "snapshots": {
+                    getattr(key, "name", str(key)): {
+                        "records": len(snapshot.records),
+                        "age": round(now - snapshot.fetched_at, 3),
+                    }
+                    for key, snapshot in self._snapshots.items()
+                },
+            }
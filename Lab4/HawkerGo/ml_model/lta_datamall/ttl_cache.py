@@ -0,0 +1,122 @@
+''' Contains a size-bounded least-recently-used cache whose entries expire after a time-to-live. '''
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    ''' A thread-safe LRU cache for per-key API responses, such as bus arrivals of one bus stop. '''
+
+    def __init__(self, ttl: float = 30.0, maxsize: int = 4096, clock=time.monotonic):
+        """Initializes an empty cache.
+
+        Args:
+            ttl (float, optional): The number of seconds an entry is served after it is stored.
+                Defaults to 30 seconds.
+            maxsize (int, optional): The maximum number of entries. When full, the least
+                recently used entry is evicted. Defaults to 4096.
+            clock (callable, optional): The clock used for expiry. Defaults to time.monotonic.
+        """
+        if maxsize < 1:
+            raise ValueError("Parameter 'maxsize' must be at least 1.")
+
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict() # Key -> (stored_at, value), oldest use first
+
+        self.hits = 0       # Lookups served from a fresh entry
+        self.misses = 0     # Lookups that found no fresh entry
+        self.expired = 0    # Entries dropped because their TTL had passed
+        self.evictions = 0  # Entries dropped to stay within maxsize
+
+    def _lookup(self, key):
+        """Returns the fresh entry for key and marks it as recently used. Must hold the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if self._clock() - entry[0] >= self.ttl:
+            del self._entries[key]
+            self.expired += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, value):
+        """Stores value under key, evicting the least recently used entries if full. Must hold the lock."""
+        self._entries[key] = (self._clock(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        """Returns the value stored under key, or default if it is missing or expired."""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        """Stores value under key, replacing any existing entry."""
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_create(self, key, factory):
+        """Returns the value stored under key, storing factory() first if it is missing or expired.
+
+        The lookup and the store happen atomically, so concurrent callers asking for the same
+        key share a single factory call. The factory runs while the cache's lock is held, so it
+        should be cheap, e.g. creating an empty future to be completed after this returns, and
+        must not use the cache, directly or through callbacks it triggers.
+
+        Returns:
+            tuple: The value, and whether it was already cached.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[1], True
+
+            self.misses += 1
+            value = factory()
+            self._store(key, value)
+            return value, False
+
+    def discard(self, key, value=None):
+        """Removes the entry for key. If value is given, only removes it if it is still the stored value."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (value is None or entry[1] is value):
+                del self._entries[key]
+
+    def clear(self):
+        """Removes all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Returns the hit/miss/eviction counters and current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
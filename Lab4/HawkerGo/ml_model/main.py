@@ -14,6 +14,10 @@ Commands:
     collect-data    Collect hawker center data and store in MongoDB
     train-model     Train the ML model using real data from APIs
     start-api       Start the API service
+    serve           Serve the API with several worker processes sharing one model
+                    (options: --workers N, --threads N, --port PORT;
+                    each worker polls LTA DataMall for live features itself)
+    init-db         Create the MongoDB indexes, removing duplicate hawker centers first
     init-all        Initialize everything (collect data, train model, start API)
 """
 
@@ -78,10 +82,41 @@ def start_api():
         print(f"❌ Error running API service: {e}")
         sys.exit(1)
 
+def serve():
+    """Serve the API with several worker processes, passing on the command's options."""
+    import argparse
+    from serve import serve as serve_api
+    parser = argparse.ArgumentParser(prog="main.py serve")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_WORKERS", 2)))
+    parser.add_argument("--threads", type=int, default=int(os.getenv("WEB_THREADS", 4)))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 5000)))
+    args = parser.parse_args(sys.argv[2:])
+    try:
+        serve_api(workers=args.workers, threads=args.threads, port=args.port)
+    except KeyboardInterrupt:
+        print("\nAPI service stopped.")
+
+def init_db():
+    """Create the MongoDB indexes and migrate existing hawker centers to them."""
+    print("Creating MongoDB indexes...")
+    try:
+        from data_collector import init_mongodb_connection
+        from db_indexes import ensure_indexes, remove_duplicate_ids
+        db = init_mongodb_connection()
+        removed = remove_duplicate_ids(db["hawker_centers"])
+        if removed:
+            print(f"Removed {removed} duplicate hawker centers")
+        created = ensure_indexes(db)
+        print(f"✅ Indexes ready: {', '.join(created)}")
+    except Exception as e:
+        print(f"❌ Error creating indexes: {e}")
+        sys.exit(1)
+
 def init_all():
     """Initialize everything."""
     try:
         collect_data()
+        init_db()
         train_model()
         start_api()
     except Exception as e:
@@ -109,6 +144,10 @@ def main():
         train_model()
     elif command == "start-api":
         start_api()
+    elif command == "serve":
+        serve()
+    elif command == "init-db":
+        init_db()
     elif command == "init-all":
         init_all()
     else:
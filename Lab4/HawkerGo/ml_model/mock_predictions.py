@@ -0,0 +1,86 @@
+""" Contains the consistent mock crowd predictions used when no model is available. """
+
+import hashlib
+import random
+from bisect import bisect
+from datetime import datetime
+from itertools import accumulate
+
+import numpy as np
+
+from lta_datamall import TTLCache
+
+LEVELS = ('Low', 'Medium', 'High')
+
+# Probabilities of each level in each time window
+WINDOW_WEIGHTS = {
+    "default": (0.4, 0.4, 0.2),        # More low and medium, less high
+    "weekend_meals": (0.1, 0.3, 0.6),  # Weekend lunch/dinner - more likely to be high
+    "weekday_lunch": (0.2, 0.5, 0.3),  # Weekday lunch - medium to high
+    "dinner": (0.2, 0.6, 0.2),         # Dinner time - more medium
+}
+
+# Cumulative weights, summed in the same order as random.choices does, so draws map to the same levels
+WINDOW_CUM_WEIGHTS = {window: list(accumulate(weights)) for window, weights in WINDOW_WEIGHTS.items()}
+
+def time_window(now: datetime) -> str:
+    """Returns the time window of the given time, which sets the level probabilities."""
+    hour = now.hour
+    is_weekend = now.weekday() >= 5
+
+    if is_weekend and (11 <= hour <= 14 or 17 <= hour <= 20):
+        return "weekend_meals"
+    elif not is_weekend and (11 <= hour <= 14):
+        return "weekday_lunch"
+    elif 17 <= hour <= 20:
+        return "dinner"
+    return "default"
+
+class MockPredictionEngine:
+    ''' Makes consistent mock crowd predictions from a hash of each hawker center ID.
+
+    Each ID's level is a weighted choice with the probabilities of the current time window,
+    drawn from a generator seeded with the MD5 hash of the ID, and its confidence is derived
+    from the same hash. This matches seeding the global random module with the hash and
+    calling random.choices, but without touching the global generator, which other threads
+    may be using. As each ID only ever needs the first draw of its generator, the draw and
+    confidence are computed once per ID and cached.
+    '''
+
+    def __init__(self, maxsize: int = 100000):
+        """Initializes the engine.
+
+        Args:
+            maxsize (int, optional): The maximum number of IDs whose draws are cached. Defaults to 100000.
+        """
+        self._draws = TTLCache(ttl=float('inf'), maxsize=maxsize) # ID -> (first random() draw, confidence)
+
+    def draw(self, hawker_id: str) -> tuple[float, float]:
+        """Returns the first random draw and the confidence of an ID."""
+        draw = self._draws.get(hawker_id)
+        if draw is None:
+            hash_int = int(hashlib.md5(hawker_id.encode()).hexdigest(), 16)
+            draw = (random.Random(hash_int).random(), 0.5 + (hash_int % 50) / 100.0) # Confidence from 0.5 to 1.0
+            self._draws.put(hawker_id, draw)
+        return draw
+
+    def predict(self, hawker_id: str, now: datetime = None) -> tuple[str, float]:
+        """Returns the mock (crowd level, confidence) of a hawker center at the given time, by default now."""
+        cum_weights = WINDOW_CUM_WEIGHTS[time_window(now or datetime.now())]
+        value, confidence = self.draw(hawker_id)
+        return LEVELS[bisect(cum_weights, value * cum_weights[-1], 0, len(LEVELS) - 1)], confidence
+
+    def predict_batch(self, hawker_ids: list[str], now: datetime = None) -> list[tuple[str, float]]:
+        """Returns the mock (crowd level, confidence) of many hawker centers at once, in input order."""
+        if not hawker_ids:
+            return []
+
+        cum_weights = WINDOW_CUM_WEIGHTS[time_window(now or datetime.now())]
+        draws = np.array([self.draw(hawker_id) for hawker_id in hawker_ids])
+        # The same search as bisect with hi=len(LEVELS) - 1, for every ID at once
+        levels = np.searchsorted(cum_weights[:-1], draws[:, 0] * cum_weights[-1], side='right')
+        return [(LEVELS[level], float(confidence)) for level, confidence in zip(levels, draws[:, 1])]
+
+    def stats(self) -> dict:
+        """Returns the counters of the draw cache."""
+        return self._draws.stats()
@@ -1,6 +1,8 @@
 import os
 import json
 import pickle
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -11,8 +13,11 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
 from dotenv import load_dotenv
 
-from lta_datamall import LTADataMallClient, LTADataMallEndpoints
+from lta_datamall import LTADataMallClient, LTADataMallEndpoints, SnapshotCache, TTLCache, BusStopIndex
 from hawker_finder import HawkerInfoFinder
+from hawker_index import HawkerIndex, HawkerDescriptor
+from live_features import LiveFeatureRefresher, compute_live_features
+from mock_predictions import MockPredictionEngine
 
 class HawkerCrowdPredictor:
     """Predicts crowd levels at hawker centers using LTA DataMall API data.
@@ -21,6 +26,30 @@ class HawkerCrowdPredictor:
     as proxy indicators for crowd levels at hawker centers.
     """
     
+    # Snapshots of whole LTA feeds, shared by every predictor in the process.
+    # LTA refreshes carpark availability about once a minute, so downloading
+    # the feed more often than that only returns the same data again.
+    feed_cache = SnapshotCache(ttl=float(os.getenv("LTA_SNAPSHOT_TTL", 60)))
+    
+    # Per-stop LTA requests from every predictor share one bounded pool,
+    # which caps how many calls are made to LTA DataMall at the same time.
+    # The client keeps as many connections alive, one per pool thread.
+    lta_max_concurrency = int(os.getenv("LTA_MAX_CONCURRENCY", 8))
+    lta_request_pool = ThreadPoolExecutor(
+        max_workers=lta_max_concurrency,
+        thread_name_prefix="lta-request"
+    )
+    lta_request_timeout = float(os.getenv("LTA_REQUEST_TIMEOUT", 5))
+    
+    # Bus arrival responses per bus stop, shared by all hawker centers near that stop.
+    bus_arrival_cache = TTLCache(
+        ttl=float(os.getenv("BUS_ARRIVAL_TTL", 30)),
+        maxsize=int(os.getenv("BUS_ARRIVAL_CACHE_SIZE", 5000))
+    )
+    
+    # Consistent mock predictions, used when the model is missing or fails.
+    mock_engine = MockPredictionEngine()
+    
     def __init__(self, lta_api_key=None, mongo_uri=None, model_path=None):
         """Initialize the predictor with API credentials and optional pre-trained model.
         
@@ -31,12 +60,25 @@ class HawkerCrowdPredictor:
         """
         # Set up LTA DataMall client
         self.lta_api_key = lta_api_key
-        self.lta_client = LTADataMallClient(lta_api_key) if lta_api_key else None
+        self.lta_client = LTADataMallClient(lta_api_key,
+                                            timeout=self.lta_request_timeout,
+                                            pool_size=self.lta_max_concurrency,
+                                            cache_dir=os.getenv("LTA_CACHE_DIR", ".lta_cache")) if lta_api_key else None
         
-        # Set up MongoDB connection
-        self.mongo_client = MongoClient(mongo_uri) if mongo_uri else None
+        # Set up MongoDB connection; it is only opened on first use, so the predictor
+        # can be created before a server forks its workers
+        self.mongo_client = MongoClient(mongo_uri, connect=False) if mongo_uri else None
         self.db = self.mongo_client["hawkergo"] if self.mongo_client is not None else None
         
+        # Precomputed carpark IDs and bus stop codes of every hawker center
+        self.hawker_index = HawkerIndex(
+            self.db["hawker_centers"],
+            max_age=float(os.getenv("HAWKER_INDEX_MAX_AGE", 300))
+        ) if self.db is not None else None
+        
+        # Live features of every hawker center, precomputed in the background once started
+        self.live_features = None
+        
         # Initialize model and scaler
         self.model = None
         self.scaler = None
@@ -53,38 +95,32 @@ class HawkerCrowdPredictor:
             self.scaler = saved_data['scaler']
             print(f"Model loaded from {model_path}")
     
+    def load_bus_stop_index(self):
+        """Download the LTA bus stop list, used to find bus stop codes missing from hawker center data."""
+        if self.lta_client is None or self.hawker_index is None:
+            return
+        
+        self.hawker_index.bus_stop_index = BusStopIndex.from_client(self.lta_client)
+        self.hawker_index.invalidate()
+        print(f"Loaded {len(self.hawker_index.bus_stop_index)} LTA bus stops")
+    
     def get_hawker_center_by_id(self, hawker_center_id):
-        """Get hawker center data from MongoDB."""
+        """Get hawker center data from MongoDB.
+        
+        The ID is resolved through the hawker index, which accepts the ObjectId string,
+        the Google Places ID or the display name, so a known hawker center costs one
+        query by _id and an unknown one costs at most one indexed query.
+        """
         if self.db is None:
             raise ValueError("MongoDB connection not initialized")
 
         collection = self.db["hawker_centers"]
 
-        # Attempt to find by ObjectId first
-        try:
-            from bson.objectid import ObjectId
-            # Check if the input is a valid ObjectId
-            object_id_hawker = collection.find_one({"_id": ObjectId(hawker_center_id)})
-            if object_id_hawker:
-                return object_id_hawker
-        except:
-            pass
-
-        # If not an ObjectId, search by Google Places ID
-        hawker = collection.find_one({"id": hawker_center_id})
-        if hawker:
-            return hawker
-
-        # Fallback: Partial match strategies
-        fallback_hawkers = list(collection.find({
-            "$or": [
-                {"id": {"$regex": hawker_center_id}},
-                {"displayName": {"$regex": hawker_center_id, "$options": "i"}}
-            ]
-        }).limit(1))
-
-        if fallback_hawkers:
-            return fallback_hawkers[0]
+        descriptor = self.hawker_index.resolve(hawker_center_id)
+        if descriptor is not None:
+            hawker = collection.find_one({"_id": descriptor.document_id})
+            if hawker:
+                return hawker
 
         # Generate mock data if no hawker found
         import random
@@ -111,41 +147,102 @@ class HawkerCrowdPredictor:
         return list(collection.find({"postal_code": postal_code}))
     
     def get_carpark_data(self, carpark_ids):
-        """Fetch current carpark availability for given carpark IDs."""
+        """Fetch current carpark availability for given carpark IDs.
+        
+        The whole availability feed is downloaded at most once per snapshot TTL
+        and shared across all predictions; lookups are served from its CarParkID index.
+        """
         if self.lta_client is None:
             raise ValueError("LTA DataMall client not initialized")
         
-        # Fetch all carpark data
-        carpark_data = self.lta_client.fetch(
-            LTADataMallEndpoints.CARPARK_AVAILABILITY
+        snapshot = self.feed_cache.get(
+            LTADataMallEndpoints.CARPARK_AVAILABILITY,
+            lambda: list(self.lta_client.iter_records(
+                LTADataMallEndpoints.CARPARK_AVAILABILITY,
+                prefetch=self.lta_max_concurrency # Download the pages of the feed in parallel
+            )),
+            key_field='CarParkID'
         )
         
         # Filter to selected carparks
-        filtered_data = []
-        for carpark in carpark_data.get('value', []):
-            if carpark.get('CarParkID') in carpark_ids:
-                filtered_data.append(carpark)
-        
-        return filtered_data
+        return snapshot.lookup(carpark_ids)
+    
+    def cache_stats(self):
+        """Get hit/miss statistics of the shared LTA feed caches and the live feature table."""
+        return {
+            "feeds": self.feed_cache.stats(),
+            "bus_arrivals": self.bus_arrival_cache.stats(),
+            "live_features": self.live_features.stats() if self.live_features is not None else None
+        }
     
-    def get_bus_arrival_data(self, bus_stop_codes):
-        """Fetch current bus arrival info for given bus stops."""
+    def get_bus_arrival_data(self, bus_stop_codes, timeout=None):
+        """Fetch current bus arrival info for given bus stops.
+        
+        All stops are requested concurrently through the shared request pool, so the
+        call takes about as long as the slowest stop. Stops that fail or do not answer
+        within the timeout are left out of the result.
+        
+        Responses are cached per stop for the bus arrival TTL, so each stop is fetched
+        at most once per window no matter how many hawker centers or concurrent
+        requests reference it; requests still in flight are shared as well.
+        
+        Args:
+            bus_stop_codes (list): The bus stop codes to fetch arrivals for
+            timeout (float, optional): Seconds to wait for all stops. Defaults to twice
+                the request timeout, allowing for requests queued behind the concurrency cap.
+        """
         if self.lta_client is None:
             raise ValueError("LTA DataMall client not initialized")
         
+        futures = {}
+        for code in dict.fromkeys(bus_stop_codes):
+            # Only an empty future is stored under the cache's lock; the fetch is submitted after
+            # releasing it, as a failed fetch removes its future from the cache again
+            future, cached = self.bus_arrival_cache.get_or_create(code, Future)
+            if not cached:
+                self._submit_bus_arrival(code, future)
+            futures[future] = code
+        
+        # Allow for requests queued behind the concurrency cap before giving up
+        done, not_done = wait(futures, timeout=2 * self.lta_request_timeout if timeout is None else timeout)
+        
         bus_data = {}
-        for code in bus_stop_codes:
+        for future, code in futures.items():
+            if future in not_done:
+                future.cancel()
+                print(f"Timed out getting bus arrival data for stop {code}")
+                continue
             try:
-                arrival_data = self.lta_client.fetch(
-                    LTADataMallEndpoints.BUS_ARRIVAL,
-                    params={"BusStopCode": code}
-                )
-                bus_data[code] = arrival_data
+                bus_data[code] = future.result()
             except Exception as e:
                 print(f"Error getting bus arrival data for stop {code}: {e}")
         
         return bus_data
     
+    def _submit_bus_arrival(self, code, future):
+        """Start fetching bus arrivals for one stop into future; failed fetches are dropped from the cache.
+        
+        Must not be called while holding the bus arrival cache's lock.
+        """
+        def discard_if_failed(future):
+            if future.cancelled() or future.exception() is not None:
+                self.bus_arrival_cache.discard(code, future)
+        
+        def fetch():
+            if not future.set_running_or_notify_cancel(): # Cancelled while queued
+                return
+            try:
+                future.set_result(self.lta_client.fetch(LTADataMallEndpoints.BUS_ARRIVAL, params={"BusStopCode": code}))
+            except Exception as e:
+                future.set_exception(e)
+        
+        future.add_done_callback(discard_if_failed)
+        try:
+            self.lta_request_pool.submit(fetch)
+        except Exception as e: # e.g. the pool was shut down
+            if future.set_running_or_notify_cancel():
+                future.set_exception(e)
+    
     def extract_features(self, hawker_center_id):
         """Extract features for prediction from API data.
 
@@ -155,126 +252,152 @@ class HawkerCrowdPredictor:
         Returns:
             numpy.ndarray: Feature vector for prediction
         """
-        # Get hawker center data from MongoDB
+        features = self.extract_raw_features(hawker_center_id, datetime.now())
+
+        # Scale features if scaler exists
+        if self.scaler:
+            # Convert features to numpy array and ensure float type
+            features_array = np.array(features, dtype=float).reshape(1, -1)
+            features = self.scaler.transform(features_array)[0]
+
+        return np.array(features).reshape(1, -1)
+
+    def get_hawker_descriptor(self, hawker_center_id):
+        """Get the precomputed descriptor of a hawker center.
+
+        Indexed hawker centers are a dictionary lookup; any other ID falls back to
+        fetching and parsing its document.
+        """
+        if self.hawker_index is not None:
+            descriptor = self.hawker_index.resolve(hawker_center_id)
+            if descriptor is not None:
+                return descriptor
+
         hawker_data = self.get_hawker_center_by_id(hawker_center_id)
         if not hawker_data:
             raise ValueError(f"Hawker center with ID {hawker_center_id} not found")
+        return HawkerDescriptor.from_document(hawker_data)
 
-        # Get carpark IDs and bus stop codes - handle potential missing data
-        carpark_ids = []
-        if 'carparks' in hawker_data and hawker_data.get('carparks'):
-            carpark_ids = [cp.get('CarParkID') for cp in hawker_data.get('carparks', []) 
-                          if 'CarParkID' in cp]
-        
-        bus_stop_codes = []
-        if 'bus_stops' in hawker_data and hawker_data.get('bus_stops'):
-            for bs in hawker_data.get('bus_stops', []):
-                # Try to get bus_stop_code directly if it exists
-                if bs.get('bus_stop_code'):
-                    bus_stop_codes.append(bs.get('bus_stop_code'))
-                else:
-                    # Extract bus stop code from display name if possible
-                    name = bs.get('displayName', '')
-                    # This is a simple approach and might need refinement
-                    # Assuming bus stop codes are 5-digit numbers that might appear in the name
-                    import re
-                    match = re.search(r'\b\d{5}\b', name)
-                    if match:
-                        bus_stop_codes.append(match.group())
-
-        # Get current time
-        now = datetime.now()
+    @staticmethod
+    def time_features(now):
+        """Compute the time features of a feature row, which are shared by every hawker center.
+
+        Args:
+            now (datetime): The time to compute the features for
+
+        Returns:
+            tuple[list, list]: The time-of-day features that start the row, and the
+                day-of-week one-hot encoding that ends it
+        """
         hour = now.hour
         minute = now.minute
         weekday = now.weekday()  # 0-6, Monday is 0
         is_weekend = 1 if weekday >= 5 else 0
         is_peak_hours = 1 if (7 <= hour <= 9) or (12 <= hour <= 13) or (18 <= hour <= 20) else 0
 
+        time_of_day = [
+            hour,
+            minute / 60.0,  # Normalize to 0-1
+            is_weekend,
+            is_peak_hours,
+        ]
+        # Add day of week as one-hot encoding, Monday to Sunday
+        day_of_week = [1 if weekday == day else 0 for day in range(7)]
+        return time_of_day, day_of_week
+
+    def extract_raw_features(self, hawker_center_id, now, descriptor=None):
+        """Extract the unscaled feature row for a hawker center at the given time.
+
+        Args:
+            hawker_center_id (str): ID of the hawker center to predict crowd for
+            now (datetime): The time to compute time-of-day features for
+            descriptor (HawkerDescriptor, optional): The hawker center's descriptor, if already looked up
+
+        Returns:
+            list: The 17 feature values, in training column order
+        """
+        if descriptor is None:
+            descriptor = self.get_hawker_descriptor(hawker_center_id)
+
+        # Get the live carpark and bus features, precomputed if the refresher is running
+        live = self.live_features.get(descriptor) if self.live_features is not None else None
+        live_features = live[0] if live is not None else self.fetch_live_features(descriptor, now)
+
+        # Compile feature vector
+        time_of_day, day_of_week = self.time_features(now)
+        features = [
+            *time_of_day,
+            *live_features,  # Available lots, occupancy, full carparks, bus services, frequency, buses arriving soon
+            *day_of_week,
+        ]
+
+        return features
+    
+    def fetch_live_features(self, descriptor, now):
+        """Fetch the current carpark and bus arrival data of a hawker center and compute its live features.
+
+        Args:
+            descriptor (HawkerDescriptor): The hawker center's descriptor
+            now (datetime): The time bus arrivals are counted from
+
+        Returns:
+            LiveFeatures: The live features, with defaults for data that could not be fetched
+        """
         # Get real-time carpark data
         try:
-            carpark_data = self.get_carpark_data(carpark_ids) if carpark_ids else []
+            carpark_data = self.get_carpark_data(descriptor.carpark_ids) if descriptor.carpark_ids else []
         except Exception as e:
             print(f"Error getting carpark data: {e}")
             carpark_data = []
 
-        # Calculate carpark features
-        if carpark_data:
-            # Available lots
-            available_lots = [int(cp.get('AvailableLots', 0)) for cp in carpark_data]
-            avg_available_lots = sum(available_lots) / len(available_lots) if available_lots else 50
-
-            # Number of full carparks (less than 10% capacity)
-            # Assuming average carpark capacity of 100 for simplicity
-            num_full_carparks = sum(1 for lots in available_lots if lots < 10)
-
-            # Occupancy rate (assuming average capacity of 100 per carpark)
-            avg_occupancy_rate = 1 - (avg_available_lots / 100)
-        else:
-            avg_available_lots = 50  # Default value
-            avg_occupancy_rate = 0.5  # Default value
-            num_full_carparks = 0
-
         # Get real-time bus data
         try:
-            bus_arrival_data = self.get_bus_arrival_data(bus_stop_codes) if bus_stop_codes else {}
+            bus_arrival_data = self.get_bus_arrival_data(descriptor.bus_stop_codes) if descriptor.bus_stop_codes else {}
         except Exception as e:
             print(f"Error getting bus arrival data: {e}")
             bus_arrival_data = {}
 
-        # Calculate bus features
-        if bus_arrival_data:
-            # Count total buses arriving within next 10 minutes
-            buses_arriving_soon = 0
-            for stop, data in bus_arrival_data.items():
-                for service in data.get('Services', []):
-                    next_bus = service.get('NextBus', {})
-                    if next_bus and next_bus.get('EstimatedArrival'):
-                        arrival_time = datetime.fromisoformat(next_bus['EstimatedArrival'].replace('Z', '+00:00'))
-                        if (arrival_time - now).total_seconds() < 600:  # Within 10 minutes
-                            buses_arriving_soon += 1
-
-            # Count unique bus services
-            unique_services = set()
-            for stop, data in bus_arrival_data.items():
-                for service in data.get('Services', []):
-                    unique_services.add(service.get('ServiceNo'))
-
-            num_bus_services = len(unique_services)
-            bus_frequency = 15 / (buses_arriving_soon / len(bus_stop_codes)) if buses_arriving_soon else 15
-        else:
-            num_bus_services = 5  # Default value
-            bus_frequency = 15  # Default value (minutes between buses)
-            buses_arriving_soon = 0
+        return compute_live_features(carpark_data, bus_arrival_data, len(descriptor.bus_stop_codes), now)
 
-        # Compile feature vector
-        features = [
-            hour,
-            minute / 60.0,  # Normalize to 0-1
-            is_weekend,
-            is_peak_hours,
-            avg_available_lots / 100.0,  # Normalize to 0-1 range
-            avg_occupancy_rate,
-            num_full_carparks / max(1, len(carpark_data)),  # Normalize by total carparks
-            num_bus_services / 20.0,  # Normalize assuming max 20 services
-            bus_frequency / 30.0,  # Normalize assuming max 30 minutes
-            buses_arriving_soon / 20.0,  # Normalize assuming max 20 buses
-            # Add day of week as one-hot encoding
-            1 if weekday == 0 else 0,  # Monday
-            1 if weekday == 1 else 0,  # Tuesday
-            1 if weekday == 2 else 0,  # Wednesday
-            1 if weekday == 3 else 0,  # Thursday
-            1 if weekday == 4 else 0,  # Friday
-            1 if weekday == 5 else 0,  # Saturday
-            1 if weekday == 6 else 0,  # Sunday
-        ]
+    def start_live_feature_refresher(self, interval=None, listeners=()):
+        """Start precomputing the live features of every hawker center in a background thread.
 
-        # Scale features if scaler exists
-        if self.scaler:
-            # Convert features to numpy array and ensure float type
-            features_array = np.array(features, dtype=float).reshape(1, -1)
-            features = self.scaler.transform(features_array)[0]
+        Predictions then read the precomputed features instead of calling LTA DataMall.
 
-        return np.array(features).reshape(1, -1)
+        Args:
+            interval (float, optional): Seconds between refreshes. Defaults to the
+                LIVE_FEATURE_INTERVAL environment variable, or 60 seconds.
+            listeners (iterable, optional): Called after each successful refresh. They are
+                registered before the refresher starts, so they also run after the first refresh.
+
+        Returns:
+            LiveFeatureRefresher: The running refresher
+        """
+        if self.lta_client is None or self.hawker_index is None:
+            raise ValueError("LTA DataMall client and MongoDB connection are required for live features")
+        
+        if self.live_features is None:
+            if interval is None:
+                interval = float(os.getenv("LIVE_FEATURE_INTERVAL", 60))
+            self.live_features = LiveFeatureRefresher(self, interval=interval)
+        for listener in listeners:
+            if listener not in self.live_features.listeners:
+                self.live_features.listeners.append(listener)
+        self.live_features.start()
+        return self.live_features
+
+    def live_features_as_of(self):
+        """Get the time the live features used by predictions were computed.
+
+        Returns:
+            float: The Unix time of the last background refresh, or the current time if
+                predictions fetch live data themselves because no fresh table is available
+        """
+        if self.live_features is not None:
+            refreshed_at = self.live_features.refreshed_at
+            if refreshed_at is not None and time.time() - refreshed_at <= self.live_features.max_age:
+                return refreshed_at
+        return time.time()
     
     def train_model(self, training_data):
         """Train the prediction model with labeled data.
@@ -311,70 +434,102 @@ class HawkerCrowdPredictor:
     
     def get_consistent_mock_prediction(self, hawker_center_id):
         """Generate a consistent mock prediction based on hawker center ID."""
-        import hashlib
-        import random
-
-        # Use hash of hawker_center_id to create consistent random seed
-        hash_obj = hashlib.md5(hawker_center_id.encode())
-        hash_int = int(hash_obj.hexdigest(), 16)
-        random.seed(hash_int)
-
-        # Levels and their probabilities
-        levels = ['Low', 'Medium', 'High']
-        level_weights = [0.4, 0.4, 0.2]  # More low and medium, less high
-
-        # Get current time for context-aware prediction
-        now = datetime.now()
-        hour = now.hour
-        weekday = now.weekday()
-        is_weekend = weekday >= 5
+        return self.mock_engine.predict(hawker_center_id)
 
-        # Adjust prediction based on time of day
-        if is_weekend and (11 <= hour <= 14 or 17 <= hour <= 20):
-            # Weekend lunch/dinner - more likely to be high
-            level_weights = [0.1, 0.3, 0.6]
-        elif not is_weekend and (11 <= hour <= 14):
-            # Weekday lunch - medium to high
-            level_weights = [0.2, 0.5, 0.3]
-        elif 17 <= hour <= 20:
-            # Dinner time - more medium
-            level_weights = [0.2, 0.6, 0.2]
+    def predict_crowd(self, hawker_center_id):
+        """Predict crowd level for a hawker center."""
+        return self.predict_crowd_batch([hawker_center_id])[0]
 
-        # Choose level based on weighted random selection
-        level = random.choices(levels, weights=level_weights)[0]
-        
-        # Generate consistent confidence based on hawker ID
-        confidence = 0.5 + (hash_int % 50) / 100.0  # 0.5 to 1.0
+    def predict_crowd_batch(self, hawker_center_ids, with_sources=False):
+        """Predict crowd levels for many hawker centers in one model evaluation.
 
-        return level, confidence
+        The feature rows of all hawker centers are stacked into a single matrix,
+        scaled once, and scored with a single predict_proba call; both the level
+        and the confidence are derived from the class probabilities.
 
-    def predict_crowd(self, hawker_center_id):
-        """Predict crowd level for a hawker center."""
-        import time
+        Args:
+            hawker_center_ids (list[str]): IDs of the hawker centers to predict crowd for
+            with_sources (bool, optional): Whether to also return where each prediction came from
 
+        Returns:
+            list[tuple[str, float]]: (crowd level, confidence) for each ID, in input order.
+                IDs whose features could not be extracted get a consistent mock prediction.
+                With with_sources, (crowd level, confidence, source) instead, where source is
+                None for model predictions, "mock_prediction" if no model is loaded, and
+                "error_fallback" for IDs that got a mock prediction because theirs failed.
+        """
         if not self.model:
-            # Return consistent mock prediction if model not loaded
-            return self.get_consistent_mock_prediction(hawker_center_id)
+            # Return consistent mock predictions if model not loaded
+            predictions = self.mock_engine.predict_batch(hawker_center_ids)
+            if with_sources:
+                return [(level, confidence, "mock_prediction") for level, confidence in predictions]
+            return predictions
 
-        try:
-            # Extract features for prediction
-            features = self.extract_features(hawker_center_id)
+        now = datetime.now()
+        results = [None] * len(hawker_center_ids)
 
-            # Make prediction
-            prediction = self.model.predict(features)[0]
-            probabilities = self.model.predict_proba(features)[0]
-            confidence = max(probabilities)
+        # Look up every hawker center first, so shared bus stops can be fetched once up front
+        descriptors = {}
+        for hawker_id in dict.fromkeys(hawker_center_ids):
+            try:
+                descriptors[hawker_id] = self.get_hawker_descriptor(hawker_id)
+            except Exception as e:
+                descriptors[hawker_id] = e
+
+        if self.lta_client is not None:
+            # Hawker centers with precomputed live features need no bus arrivals
+            batch_stop_codes = [
+                code
+                for descriptor in descriptors.values() if isinstance(descriptor, HawkerDescriptor)
+                and (self.live_features is None or self.live_features.get(descriptor) is None)
+                for code in descriptor.bus_stop_codes
+            ]
+            try:
+                self.get_bus_arrival_data(batch_stop_codes)
+            except Exception as e:
+                print(f"Error prefetching bus arrival data: {e}")
 
-            # Map prediction to crowd level
-            crowd_levels = {0: 'Low', 1: 'Medium', 2: 'High'}
-            predicted_level = crowd_levels[prediction]
+        # Extract the feature rows of every hawker center we can
+        rows = []
+        row_positions = []
+        for position, hawker_id in enumerate(hawker_center_ids):
+            try:
+                descriptor = descriptors[hawker_id]
+                if isinstance(descriptor, Exception):
+                    raise descriptor
+                rows.append(self.extract_raw_features(hawker_id, now, descriptor=descriptor))
+                row_positions.append(position)
+            except Exception as e:
+                print(f"Error predicting crowd for hawker center {hawker_id}. Using mock prediction: {e}")
 
-            return predicted_level, confidence
+        if rows:
+            try:
+                features = np.array(rows, dtype=float)
+                if self.scaler:
+                    features = self.scaler.transform(features)
+
+                # Single forest evaluation for the whole batch
+                probabilities = self.model.predict_proba(features)
+                best = probabilities.argmax(axis=1)
+
+                # Map prediction to crowd level
+                crowd_levels = {0: 'Low', 1: 'Medium', 2: 'High'}
+                for position, class_index, row_probabilities in zip(row_positions, best, probabilities):
+                    predicted_level = crowd_levels[self.model.classes_[class_index]]
+                    results[position] = (predicted_level, float(row_probabilities[class_index]))
+            except Exception as e:
+                print(f"Error predicting crowd for {len(rows)} hawker centers. Using mock predictions: {e}")
 
-        except Exception as e:
-            # If anything fails, use consistent mock prediction
-            print(f"Error predicting crowd for hawker center {hawker_center_id}. Using mock prediction: {e}")
-            return self.get_consistent_mock_prediction(hawker_center_id)
+        # If anything fails, use consistent mock prediction
+        if with_sources:
+            return [
+                (*result, None) if result is not None else (*self.get_consistent_mock_prediction(hawker_id), "error_fallback")
+                for hawker_id, result in zip(hawker_center_ids, results)
+            ]
+        return [
+            result if result is not None else self.get_consistent_mock_prediction(hawker_id)
+            for hawker_id, result in zip(hawker_center_ids, results)
+        ]
     
     def save_model(self, file_path):
         """Save the trained model to a file.
@@ -390,11 +545,14 @@ class HawkerCrowdPredictor:
             return False
         
         try:
-            with open(file_path, 'wb') as f:
+            # Write to a temporary file first, so servers watching the model file never load a partial one
+            temp_path = f"{file_path}.tmp"
+            with open(temp_path, 'wb') as f:
                 pickle.dump({
                     'model': self.model,
                     'scaler': self.scaler
                 }, f)
+            os.replace(temp_path, file_path)
             return True
         except Exception as e:
             print(f"Error saving model: {e}")
@@ -0,0 +1,184 @@
+""" Contains a materialized table of the current crowd predictions of every hawker center. """
+
+import hashlib
+import json
+import threading
+from datetime import datetime
+
+import numpy as np
+
+CROWD_LEVELS = ('Low', 'Medium', 'High')
+
+class PredictionSnapshot:
+    ''' The crowd predictions of every hawker center for one minute and one set of live features.
+
+    Predictions are stored as compact arrays by position in the hawker center index, and
+    the serialized /predict/all response is built once per snapshot and reused.
+    '''
+
+    def __init__(self, descriptors, levels: np.ndarray, confidences: np.ndarray, features_as_of: float, key: tuple):
+        """Initializes the snapshot.
+
+        Args:
+            descriptors (list[HawkerDescriptor]): The predicted hawker centers, by position.
+            levels (np.ndarray): The index in CROWD_LEVELS of each hawker center's level.
+            confidences (np.ndarray): The confidence of each prediction.
+            features_as_of (float): The Unix time the live features were computed.
+            key (tuple): What the predictions depend on, to tell when the snapshot is out of date.
+        """
+        self.descriptors = descriptors
+        self.levels = levels
+        self.confidences = confidences
+        self.features_as_of = features_as_of
+        self.key = key
+        self.etag = self._content_hash()
+        self.positions = {}
+        for position, descriptor in enumerate(descriptors):
+            for hawker_id in (descriptor.object_id, descriptor.id):
+                if hawker_id:
+                    self.positions.setdefault(hawker_id, position)
+        self._body = None
+
+    def _content_hash(self) -> str:
+        """Hashes everything the /predict/all response is built from, so the ETag only
+        changes when the response does, not each minute the snapshot is recomputed."""
+        content = hashlib.sha1()
+        content.update(json.dumps([[d.object_id, d.display_name] for d in self.descriptors]).encode())
+        content.update(np.ascontiguousarray(self.levels, dtype=np.int8).tobytes())
+        content.update(np.ascontiguousarray(self.confidences, dtype=np.float64).tobytes())
+        content.update(repr(self.features_as_of).encode())
+        return content.hexdigest()[:20]
+
+    def __len__(self):
+        return len(self.descriptors)
+
+    def lookup(self, hawker_id: str) -> tuple[str, float] | None:
+        """Returns the (crowd level, confidence) of a hawker center by `_id` or `id`, or None if it is not in the table."""
+        position = self.positions.get(hawker_id)
+        if position is None:
+            return None
+        return CROWD_LEVELS[self.levels[position]], float(self.confidences[position])
+
+    def name(self, hawker_id: str) -> str | None:
+        """Returns the display name of a hawker center in the table, or None."""
+        position = self.positions.get(hawker_id)
+        return self.descriptors[position].display_name if position is not None else None
+
+    def all_body(self) -> bytes:
+        """Returns the serialized /predict/all response, building it on first use."""
+        if self._body is None:
+            self._body = json.dumps([
+                {
+                    "hawker_id": descriptor.object_id,
+                    "hawker_name": descriptor.display_name,
+                    "crowd_level": CROWD_LEVELS[level],
+                    "confidence": float(confidence),
+                    "features_as_of": self.features_as_of,
+                }
+                for descriptor, level, confidence in zip(self.descriptors, self.levels, self.confidences)
+            ]).encode()
+        return self._body
+
+class PredictionTable:
+    ''' Keeps a PredictionSnapshot of every hawker center up to date.
+
+    The snapshot is recomputed in one vectorized pass, with a single scaler transform and
+    predict_proba call, when the minute changes, the live feature table is refreshed, the
+    hawker center index is rebuilt, or the model is replaced. Recomputation happens on the
+    first read after such a change; reads in between are array lookups. Hawker centers
+    without precomputed live features are left out, so callers fall back to the predictor.
+    '''
+
+    def __init__(self, predictor, clock=datetime.now):
+        """Initializes an empty table.
+
+        Args:
+            predictor (HawkerCrowdPredictor): Provides the model, hawker center index and live features.
+            clock (callable, optional): Returns the current local time. Defaults to datetime.now.
+        """
+        self.predictor = predictor
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+        self.recomputes = 0
+
+    def _key(self, now):
+        predictor = self.predictor
+        return (
+            now.strftime('%Y-%m-%dT%H:%M'), # The time features only change per minute
+            predictor.live_features.refreshed_at,
+            predictor.hawker_index.version,
+            id(predictor.model),
+        )
+
+    def current(self) -> PredictionSnapshot | None:
+        """Returns the snapshot for the current minute, recomputing it if anything it depends on changed.
+
+        Returns:
+            PredictionSnapshot | None: The snapshot, or None if there is no model or no
+                fresh live feature table to predict from.
+        """
+        predictor = self.predictor
+        if predictor.model is None or predictor.live_features is None or predictor.hawker_index is None:
+            return None
+        if predictor.live_features.refreshed_at is None:
+            return None
+
+        now = self._clock()
+        key = self._key(now)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.key == key:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.key != key: # Another thread may have recomputed it while we waited
+                snapshot = self._compute(now, key)
+                self._snapshot = snapshot
+        return snapshot
+
+    def _compute(self, now, key) -> PredictionSnapshot | None:
+        predictor = self.predictor
+        descriptors = []
+        live_rows = []
+        features_as_of = None
+        for descriptor in predictor.hawker_index.all():
+            live = predictor.live_features.get(descriptor)
+            if live is not None:
+                descriptors.append(descriptor)
+                live_rows.append(live[0])
+                features_as_of = live[1]
+
+        if not descriptors:
+            return None
+
+        # Every row shares the same time features, so only the live block differs
+        time_of_day, day_of_week = predictor.time_features(now)
+        features = np.empty((len(descriptors), len(time_of_day) + len(live_rows[0]) + len(day_of_week)))
+        features[:, :len(time_of_day)] = time_of_day
+        features[:, len(time_of_day):-len(day_of_week)] = live_rows
+        features[:, -len(day_of_week):] = day_of_week
+
+        if predictor.scaler:
+            features = predictor.scaler.transform(features)
+        probabilities = predictor.model.predict_proba(features)
+        best = probabilities.argmax(axis=1)
+
+        self.recomputes += 1
+        return PredictionSnapshot(
+            descriptors,
+            levels=np.asarray(predictor.model.classes_)[best].astype(np.int8),
+            confidences=probabilities[np.arange(len(best)), best],
+            features_as_of=features_as_of,
+            key=key,
+        )
+
+    def stats(self) -> dict:
+        """Returns the number of recomputations and the size and ETag of the current snapshot."""
+        snapshot = self._snapshot
+        return {
+            "recomputes": self.recomputes,
+            "hawker_centers": len(snapshot) if snapshot is not None else 0,
+            "etag": snapshot.etag if snapshot is not None else None,
+        }
@@ -0,0 +1,166 @@
+""" Serves the API with several worker processes that share one loaded model.
+
+The API, and with it the model, is imported once in the master process before the
+workers are forked, so the workers share the model's memory copy-on-write instead of
+each loading their own copy. Each worker answers requests from a pool of threads.
+The master creates the MongoDB indexes once at startup, and watches the model file:
+when it is retrained, the master loads the new model and replaces the workers one by
+one, so the server keeps answering during the reload.
+
+Each worker runs its own live feature refresher, so LTA DataMall is polled once per
+LIVE_FEATURE_INTERVAL by every worker: carpark and bus arrival traffic grows with the
+number of workers. Prefer few workers with more threads, or raise LIVE_FEATURE_INTERVAL.
+
+Uses gunicorn, which does not run on Windows; there it falls back to Flask's threaded server.
+
+Usage:
+    python serve.py [--workers N] [--threads N] [--port PORT]
+"""
+
+import argparse
+import os
+import signal
+import threading
+
+class ModelWatcher:
+    ''' Reloads the model when its file changes, then calls on_reload.
+
+    A change is only acted on once the file has stopped changing for one poll interval,
+    so a model that is still being written is not loaded.
+    '''
+
+    def __init__(self, model_path: str, reload, on_reload, interval: float = 5.0):
+        """Initializes the watcher.
+
+        Args:
+            model_path (str): The model file to watch.
+            reload (callable): Loads the model again, returning True if it was loaded.
+            on_reload (callable): Called after the model was reloaded.
+            interval (float, optional): The seconds between checks of the file. Defaults to 5 seconds.
+        """
+        self.model_path = model_path
+        self.reload = reload
+        self.on_reload = on_reload
+        self.interval = interval
+        self._loaded = self._mtime()  # Modification time of the loaded model file
+        self._pending = None          # Modification time seen at the last check, if different
+        self.reloads = 0
+        self._stop = threading.Event()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.model_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def check(self) -> bool:
+        """Checks the model file once, reloading it if it changed and has been stable since the last check.
+
+        Returns:
+            bool: True if the model was reloaded.
+        """
+        mtime = self._mtime()
+        if mtime is None or mtime == self._loaded:
+            self._pending = None
+            return False
+        if mtime != self._pending:
+            self._pending = mtime # Wait one more interval in case it is still being written
+            return False
+
+        self._loaded = mtime
+        self._pending = None
+        if not self.reload():
+            return False
+        self.reloads += 1
+        self.on_reload()
+        return True
+
+    def start(self):
+        """Checks the model file every interval in a daemon thread."""
+        def run():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.check()
+                except Exception as e:
+                    print(f"Error checking model file: {e}")
+
+        threading.Thread(target=run, name="model-watcher", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+def load_api():
+    """Imports the API without starting its background tasks, which must run in each worker."""
+    os.environ["HAWKERGO_DEFER_STARTUP"] = "1"
+    import api
+    return api
+
+def serve(workers: int = 2, threads: int = 4, port: int = 5000, watch_interval: float = 5.0):
+    """Serves the API on all interfaces until interrupted.
+
+    Args:
+        workers (int, optional): The number of worker processes. Defaults to 2.
+        threads (int, optional): The number of request threads per worker. Defaults to 4.
+        port (int, optional): The port to listen on. Defaults to 5000.
+        watch_interval (float, optional): The seconds between checks of the model file. Defaults to 5 seconds.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("Warning: gunicorn is not available, serving with Flask's threaded server in a single process")
+        api = load_api()
+        api.start_background_tasks()
+        api.app.run(host='0.0.0.0', port=port, threaded=True, debug=False)
+        return
+
+    def post_fork(server, worker):
+        # In the background, so a slow MongoDB or LTA DataMall does not hold up the worker's boot;
+        # the indexes were already created by the master
+        threading.Thread(target=api.start_background_tasks, kwargs={"indexes": False},
+                         name="startup", daemon=True).start()
+
+    def when_ready(server):
+        # Only at startup, before the first workers are forked, not on each reload
+        api.create_indexes()
+
+        def restart_workers():
+            print("Model file changed, restarting workers")
+            os.kill(os.getpid(), signal.SIGHUP) # Gracefully replaces the workers, which fork from the new model
+
+        ModelWatcher(api.model_path, api.reload_model, restart_workers, interval=watch_interval).start()
+
+    class HawkerGoApplication(BaseApplication):
+        def load_config(self):
+            settings = {
+                "bind": f"0.0.0.0:{port}",
+                "workers": workers,
+                "threads": threads,
+                "worker_class": "gthread",
+                "preload_app": True, # Load the model before forking, so workers share it
+                "timeout": 120,
+                "post_fork": post_fork,
+                "when_ready": when_ready,
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return api.app
+
+    api = load_api()
+    print(f"Starting ML API server on port {port} with {workers} workers of {threads} threads")
+    HawkerGoApplication().run()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the HawkerGo ML API with several worker processes.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_WORKERS", 2)),
+                        help="number of worker processes (default: WEB_WORKERS or 2)")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("WEB_THREADS", 4)),
+                        help="number of request threads per worker (default: WEB_THREADS or 4)")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 5000)),
+                        help="port to listen on (default: PORT or 5000)")
+    args = parser.parse_args()
+    serve(workers=args.workers, threads=args.threads, port=args.port)
+
+if __name__ == "__main__":
+    main()
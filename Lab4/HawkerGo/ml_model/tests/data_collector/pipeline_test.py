@@ -0,0 +1,86 @@
+import threading
+import time
+import unittest
+
+from collector_pipeline import Pipeline, RateLimiter, Stage
+
+class ConcurrencyProbe:
+    ''' Wraps a stage function, recording how many calls overlap and when each one starts. '''
+
+    def __init__(self, function, delay=0.0):
+        self.function = function
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.starts = []
+        self._lock = threading.Lock()
+
+    def __call__(self, item):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.starts.append(time.monotonic())
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return self.function(item)
+
+class TestPipeline(unittest.TestCase):
+    def test_results_keep_input_order(self):
+        pipeline = Pipeline([
+            Stage("double", lambda x: x * 2, workers=4),
+            Stage("jitter", ConcurrencyProbe(lambda x: x + 1, delay=0.001), workers=3),
+        ])
+
+        self.assertEqual(pipeline.run(range(50)), [x * 2 + 1 for x in range(50)])
+        self.assertEqual(pipeline.stats["double"]["completed"], 50)
+
+    def test_each_stage_respects_its_worker_limit(self):
+        slow = ConcurrencyProbe(lambda x: x, delay=0.02)
+        fast = ConcurrencyProbe(lambda x: x, delay=0.02)
+        pipeline = Pipeline([Stage("slow", slow, workers=1), Stage("fast", fast, workers=4)])
+
+        pipeline.run(range(12))
+
+        self.assertEqual(slow.max_active, 1)
+        self.assertLessEqual(fast.max_active, 4)
+
+    def test_rate_limited_stage_is_spaced_out(self):
+        geocode = ConcurrencyProbe(lambda x: x)
+        pipeline = Pipeline([Stage("geocode", geocode, workers=3, rate_limit=20)])
+
+        pipeline.run(range(5))
+
+        # 5 calls at 20 per second span at least 4 intervals of 50 ms, less some scheduling jitter
+        starts = sorted(geocode.starts)
+        self.assertGreaterEqual(starts[-1] - starts[0], 0.18)
+
+    def test_results_stream_before_first_stage_finishes(self):
+        persisted_at = []
+        pipeline = Pipeline([
+            Stage("geocode", ConcurrencyProbe(lambda x: x, delay=0.02), workers=1),
+            Stage("persist", lambda x: persisted_at.append(time.monotonic()) or x, workers=1),
+        ])
+
+        start = time.monotonic()
+        pipeline.run(range(10))
+
+        # The first item is stored long before the last one is geocoded (10 x 20 ms)
+        self.assertLess(persisted_at[0] - start, 0.1)
+
+    def test_failed_items_are_dropped(self):
+        def transit(x):
+            if x == 3:
+                raise ConnectionError("quota exceeded")
+            return x
+
+        pipeline = Pipeline([Stage("transit", transit, workers=2), Stage("persist", lambda x: x)])
+
+        self.assertEqual(pipeline.run(range(5)), [0, 1, 2, 4])
+        self.assertEqual(pipeline.stats["transit"]["failed"], 1)
+        self.assertEqual(pipeline.stats["persist"]["completed"], 4)
+
+class TestRateLimiter(unittest.TestCase):
+    def test_rejects_non_positive_rate(self):
+        with self.assertRaises(ValueError):
+            RateLimiter(0)
@@ -0,0 +1,35 @@
+import unittest
+
+from data_collector import get_postal_code
+from geo import PostalCodeIndex
+
+class FakeLocation:
+    def __init__(self, postcode):
+        self.raw = {"address": {"postcode": postcode}}
+
+class FakeGeolocator:
+    def __init__(self, postcode="069184"):
+        self.postcode = postcode
+        self.calls = 0
+
+    def reverse(self, coordinates, exactly_one=True):
+        self.calls += 1
+        return FakeLocation(self.postcode)
+
+class TestPostalCodeLookup(unittest.TestCase):
+    def test_geocoder_is_only_called_for_unknown_locations(self):
+        geolocator = FakeGeolocator()
+        index = PostalCodeIndex()
+
+        self.assertEqual(get_postal_code(1.2803361, 103.8444904, geolocator, postal_code_index=index), "069184")
+        self.assertEqual(get_postal_code(1.2803361, 103.8444904, geolocator, postal_code_index=index), "069184")
+
+        self.assertEqual(geolocator.calls, 1)
+        self.assertEqual(len(index), 1)
+
+    def test_missing_postcode_is_not_stored(self):
+        geolocator = FakeGeolocator(postcode=None)
+        index = PostalCodeIndex()
+
+        self.assertIsNone(get_postal_code(1.2803361, 103.8444904, geolocator, postal_code_index=index))
+        self.assertEqual(len(index), 0)
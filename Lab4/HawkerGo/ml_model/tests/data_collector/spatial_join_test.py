@@ -0,0 +1,74 @@
+import unittest
+
+import numpy as np
+
+from data_collector import associate_carparks, collect_nearby_carparks
+from geo import haversine_distances
+from hawker_finder import HawkerInfo
+
+def make_carparks(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "CarParkID": str(i),
+            "Development": f"Blk {i}",
+            "LotType": "C",
+            "Agency": "HDB",
+            "Location": f"{1.27 + rng.random() * 0.05} {103.82 + rng.random() * 0.05}",
+        }
+        for i in range(count)
+    ]
+
+class FakeLTAClient:
+    def __init__(self, records):
+        self.records = records
+        self.fetches = 0
+
+    def iter_records(self, endpoint, params=None, amount=-1, prefetch=1):
+        self.fetches += 1
+        yield from self.records
+
+class TestSpatialJoin(unittest.TestCase):
+    def setUp(self):
+        self.carparks = make_carparks(2000) + [
+            {"CarParkID": "no-location"},
+            {"CarParkID": "bad-location", "Location": "1.28"},
+        ]
+        rng = np.random.default_rng(1)
+        self.hawkers = [
+            HawkerInfo(f"hawker-{i}", 103.82 + rng.random() * 0.05, 1.27 + rng.random() * 0.05, f"Hawker {i}")
+            for i in range(60)
+        ]
+
+    def test_matches_brute_force_sorted_by_distance(self):
+        carparks_by_hawker = associate_carparks(self.hawkers, self.carparks, radius=500)
+
+        self.assertEqual(len(carparks_by_hawker), len(self.hawkers))
+        latitudes = [float(cp["Location"].split()[0]) for cp in self.carparks[:2000]]
+        longitudes = [float(cp["Location"].split()[1]) for cp in self.carparks[:2000]]
+        for hawker, carparks in zip(self.hawkers, carparks_by_hawker):
+            distances = haversine_distances(hawker.latitude, hawker.longitude, latitudes, longitudes, ellipsoidal=True)
+            expected = {str(i) for i in np.flatnonzero(distances <= 500)}
+
+            self.assertSetEqual({cp["CarParkID"] for cp in carparks}, expected)
+            self.assertEqual([cp["distance"] for cp in carparks], sorted(cp["distance"] for cp in carparks))
+
+    def test_streams_records_in_batches(self):
+        consumed = []
+        def stream():
+            for carpark in self.carparks:
+                consumed.append(carpark)
+                yield carpark
+
+        carparks_by_hawker = associate_carparks(self.hawkers, stream(), radius=500, batch_size=128)
+
+        self.assertEqual(len(consumed), len(self.carparks))
+        self.assertEqual(carparks_by_hawker, associate_carparks(self.hawkers, self.carparks, radius=500))
+
+    def test_single_hawker_wrapper_downloads_feed(self):
+        client = FakeLTAClient(self.carparks)
+
+        carparks = collect_nearby_carparks(client, self.hawkers[0])
+
+        self.assertEqual(client.fetches, 1)
+        self.assertEqual(carparks, associate_carparks(self.hawkers[:1], self.carparks)[0])
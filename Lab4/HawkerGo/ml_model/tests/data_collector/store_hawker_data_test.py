@@ -0,0 +1,109 @@
+import threading
+import unittest
+from typing import NamedTuple
+from unittest import mock
+
+from pymongo.errors import BulkWriteError
+
+import data_collector
+from data_collector import HawkerDataWriter, store_hawker_data
+
+def make_hawker_data(count, name="Hawker"):
+    return [
+        {"id": f"hawker-{i}", "displayName": f"{name} {i}", "latitude": 1.3, "longitude": 103.8,
+         "bus_stops": [], "carparks": []}
+        for i in range(count)
+    ]
+
+class RecordedUpdate(NamedTuple):
+    '''Stands in for pymongo's UpdateOne, keeping the arguments it was created with.'''
+
+    filter: dict
+    update: dict
+    upsert: bool = False
+
+class FakeCollection:
+    ''' Records bulk writes, applying upserts by id and failing the writes of ids in fail_ids. '''
+
+    def __init__(self, fail_ids=()):
+        self.documents = {}
+        self.batches = []
+        self.fail_ids = set(fail_ids)
+        self._lock = threading.Lock()
+
+    def bulk_write(self, operations, ordered=True):
+        assert not ordered
+        with self._lock:
+            self.batches.append(len(operations))
+            result = {"nUpserted": 0, "nMatched": 0, "nModified": 0, "writeErrors": []}
+            for index, operation in enumerate(operations):
+                document = operation.update["$set"]
+                assert operation.upsert and operation.filter == {"id": document["id"]}
+                if document["id"] in self.fail_ids:
+                    result["writeErrors"].append({"index": index, "errmsg": "E11000 duplicate key"})
+                elif document["id"] in self.documents:
+                    result["nMatched"] += 1
+                    if self.documents[document["id"]] != document:
+                        result["nModified"] += 1
+                    self.documents[document["id"]] = document
+                else:
+                    result["nUpserted"] += 1
+                    self.documents[document["id"]] = document
+
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return type("BulkWriteResult", (), {"bulk_api_result": result})()
+
+class FakeDatabase(dict):
+    def __init__(self, collection):
+        super().__init__(hawker_centers=collection)
+
+class TestStoreHawkerData(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(data_collector, "UpdateOne", RecordedUpdate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rerun_updates_instead_of_duplicating(self):
+        collection = FakeCollection()
+        db = FakeDatabase(collection)
+
+        first = store_hawker_data(db, make_hawker_data(120), batch_size=50)
+        second = store_hawker_data(db, make_hawker_data(120), batch_size=50)
+        renamed = store_hawker_data(db, make_hawker_data(10, name="Renamed"), batch_size=50)
+
+        self.assertEqual(len(collection.documents), 120)
+        self.assertEqual(collection.batches, [50, 50, 20, 50, 50, 20, 10])
+        self.assertEqual(first, {"inserted": 120, "updated": 0, "unchanged": 0, "failed": 0})
+        self.assertEqual(second, {"inserted": 0, "updated": 0, "unchanged": 120, "failed": 0})
+        self.assertEqual(renamed["updated"], 10)
+
+    def test_partial_failures_do_not_stop_other_writes(self):
+        collection = FakeCollection(fail_ids={"hawker-3", "hawker-70"})
+
+        totals = store_hawker_data(FakeDatabase(collection), make_hawker_data(100), batch_size=50)
+
+        self.assertEqual(totals["failed"], 2)
+        self.assertEqual(totals["inserted"], 98)
+        self.assertEqual(len(collection.batches), 2)
+
+    def test_hawker_centers_without_id_are_skipped(self):
+        collection = FakeCollection()
+        hawker_centers_data = make_hawker_data(2) + [{"displayName": "No ID"}]
+
+        totals = store_hawker_data(FakeDatabase(collection), hawker_centers_data)
+
+        self.assertEqual(totals["failed"], 1)
+        self.assertEqual(len(collection.documents), 2)
+
+    def test_writer_stores_full_batches_as_they_arrive(self):
+        collection = FakeCollection()
+        writer = HawkerDataWriter(FakeDatabase(collection), batch_size=4)
+
+        for hawker_data in make_hawker_data(10):
+            writer.add(hawker_data)
+        self.assertEqual(collection.batches, [4, 4])
+
+        writer.flush()
+        self.assertEqual(collection.batches, [4, 4, 2])
+        self.assertEqual(writer.totals["inserted"], 10)
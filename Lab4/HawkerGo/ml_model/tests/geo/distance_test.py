@@ -0,0 +1,34 @@
+import unittest
+
+import numpy as np
+from geopy.distance import geodesic
+
+from geo import haversine_distances, pairwise_distances
+
+class TestDistance(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        # Random points spread over Singapore
+        self.latitudes = 1.25 + rng.random(100) * 0.2
+        self.longitudes = 103.6 + rng.random(100) * 0.4
+
+    def test_ellipsoidal_matches_geodesic(self):
+        distances = haversine_distances(1.2803361, 103.844767, self.latitudes, self.longitudes, ellipsoidal=True)
+
+        for latitude, longitude, distance in zip(self.latitudes, self.longitudes, distances):
+            expected = geodesic((1.2803361, 103.844767), (latitude, longitude)).meters
+            self.assertAlmostEqual(distance, expected, delta=max(expected * 1e-4, 0.01))
+
+    def test_pairwise_matches_one_to_many(self):
+        matrix = pairwise_distances(self.latitudes[:10], self.longitudes[:10], self.latitudes, self.longitudes)
+
+        self.assertEqual(matrix.shape, (10, 100))
+        for i in range(10):
+            np.testing.assert_allclose(
+                matrix[i], haversine_distances(self.latitudes[i], self.longitudes[i], self.latitudes, self.longitudes))
+        np.testing.assert_allclose(np.diag(matrix[:, :10]), 0, atol=1e-6)
+
+    def test_zero_distance_with_ellipsoidal_correction(self):
+        distances = haversine_distances(1.3, 103.8, [1.3], [103.8], ellipsoidal=True)
+
+        self.assertEqual(distances[0], 0)
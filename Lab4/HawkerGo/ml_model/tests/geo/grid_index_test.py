@@ -0,0 +1,36 @@
+import unittest
+
+import numpy as np
+from geopy.distance import geodesic
+
+from geo import GridIndex, haversine_distances
+
+class TestGridIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Random points spread over Singapore
+        self.latitudes = 1.25 + rng.random(3000) * 0.2
+        self.longitudes = 103.6 + rng.random(3000) * 0.4
+        self.index = GridIndex(self.latitudes, self.longitudes, cell_size=500)
+
+    def test_haversine_close_to_geodesic(self):
+        distances = haversine_distances(1.2803361, 103.844767, self.latitudes[:50], self.longitudes[:50])
+
+        for latitude, longitude, distance in zip(self.latitudes[:50], self.longitudes[:50], distances):
+            expected = geodesic((1.2803361, 103.844767), (latitude, longitude)).meters
+            self.assertAlmostEqual(distance, expected, delta=expected * 0.01)
+
+    def test_radius_query_matches_brute_force(self):
+        for radius in [50, 500, 2000, 100_000]:
+            positions, distances = self.index.query_radius(1.35, 103.8, radius)
+
+            all_distances = haversine_distances(1.35, 103.8, self.latitudes, self.longitudes)
+            self.assertSetEqual(set(positions), set(np.flatnonzero(all_distances <= radius)))
+            self.assertTrue(np.all(np.diff(distances) >= 0))
+            np.testing.assert_allclose(distances, all_distances[positions])
+
+    def test_empty_index(self):
+        positions, distances = GridIndex([], []).query_radius(1.35, 103.8, 1000)
+
+        self.assertEqual(len(positions), 0)
+        self.assertEqual(len(distances), 0)
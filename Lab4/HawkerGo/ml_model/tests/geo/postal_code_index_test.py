@@ -0,0 +1,61 @@
+import json
+import os
+import tempfile
+import unittest
+
+from geo import PostalCodeIndex
+
+MAXWELL = ("069184", 1.2803361, 103.8444904)
+
+class TestPostalCodeIndex(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def test_seeded_from_hawker_data(self):
+        path = self.write("hawker_centers_data.json", json.dumps([
+            {"postal_code": MAXWELL[0], "latitude": MAXWELL[1], "longitude": MAXWELL[2]},
+            {"postal_code": None, "latitude": 1.3, "longitude": 103.8},
+        ]))
+        index = PostalCodeIndex()
+
+        self.assertEqual(index.load_hawker_data(path), 1)
+        self.assertEqual(index.lookup(MAXWELL[1], MAXWELL[2]), "069184")
+        self.assertEqual(index.lookup(MAXWELL[1] + 0.0002, MAXWELL[2]), "069184") # About 22 m north
+        self.assertIsNone(index.lookup(MAXWELL[1] + 0.002, MAXWELL[2]))          # About 220 m north
+        self.assertEqual(index.stats(), {"hits": 2, "misses": 1, "size": 1})
+
+    def test_reference_csv_columns_and_leading_zeros(self):
+        path = self.write("reference.csv", "POSTAL,LATITUDE,LONGITUDE\n018989,1.2789,103.8536\n")
+        index = PostalCodeIndex()
+
+        self.assertEqual(index.load_csv(path), 1)
+        self.assertEqual(index.lookup(1.2789, 103.8536), "018989")
+
+    def test_nearest_location_wins(self):
+        index = PostalCodeIndex()
+        index.add("069184", 1.28030, 103.8445)
+        index.add("069185", 1.28045, 103.8445)
+
+        self.assertEqual(index.lookup(1.28033, 103.8445), "069184")
+        self.assertEqual(index.lookup(1.28043, 103.8445), "069185")
+
+    def test_added_postal_codes_are_written_back(self):
+        path = os.path.join(self.directory.name, "postal_codes.csv")
+        index = PostalCodeIndex(path)
+
+        self.assertTrue(index.add(*MAXWELL))
+        self.assertFalse(index.add(*MAXWELL)) # Already known
+        self.assertTrue(index.add("640637", 1.3412184, 103.7247))
+
+        reloaded = PostalCodeIndex(path)
+        self.assertEqual(len(reloaded), 2)
+        self.assertEqual(reloaded.lookup(MAXWELL[1], MAXWELL[2]), "069184")
+        with open(path) as file:
+            self.assertEqual(file.readline().strip(), "postal_code,latitude,longitude")
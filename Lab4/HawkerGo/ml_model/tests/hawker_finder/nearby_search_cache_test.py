@@ -0,0 +1,125 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from hawker_finder import GooglePlacesAPIClient, HawkerInfo, HawkerInfoFinder, NearbySearchCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+class CountingPlacesClient(GooglePlacesAPIClient):
+    ''' Answers Nearby Search requests locally, counting the calls that Google would bill. '''
+
+    def __init__(self, nearby_cache, delay=0.0, fail=False):
+        super().__init__("test", nearby_cache=nearby_cache)
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+
+    def _postNearbySearch(self, latitude, longitude, radius, types, search_mask):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise Exception("Request failed with status code 503")
+        return [{
+            "id": "stop-1",
+            "displayName": {"text": "Opp Maxwell Food Ctr 05011"},
+            "location": {"latitude": latitude + 0.001, "longitude": longitude},
+        }]
+
+class TestNearbySearchCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "nearby_search.sqlite3")
+        self.clock = FakeClock()
+
+    def cache(self, **kwargs):
+        cache = NearbySearchCache(self.path, ttl=3600, clock=self.clock, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_repeated_runs_reuse_responses(self):
+        hawker = HawkerInfo("hawker-1", 103.8445, 1.2803, "Maxwell Food Centre")
+
+        first = CountingPlacesClient(self.cache())
+        finder = HawkerInfoFinder("test")
+        finder.client = first
+        expected = finder.findNearbyBusStops(hawker)
+        self.assertEqual(finder.findNearbyBusStops(hawker), expected)
+
+        second = CountingPlacesClient(self.cache())
+        finder.client = second
+        self.assertEqual(finder.findNearbyBusStops(hawker), expected)
+
+        self.assertEqual(first.calls, 1)
+        self.assertEqual(second.calls, 0)
+        self.assertEqual(expected[0]["displayName"], "Opp Maxwell Food Ctr 05011")
+
+    def test_key_rounds_center_and_includes_search(self):
+        client = CountingPlacesClient(self.cache())
+
+        client.requestNearbySearch(1.28031, 103.84451, 500, ["bus_stop", "bus_station"])
+        client.requestNearbySearch(1.28029, 103.84449, 500, ["bus_station", "bus_stop"]) # Same place, 3 m away
+        self.assertEqual(client.calls, 1)
+
+        client.requestNearbySearch(1.28031, 103.84451, 300, ["bus_stop", "bus_station"])
+        client.requestNearbySearch(1.28031, 103.84451, 500, ["taxi_stand"])
+        client.requestNearbySearch(1.28031, 103.84451, 500, ["taxi_stand"], search_mask="places.id")
+        self.assertEqual(client.calls, 4)
+
+    def test_expired_responses_are_searched_again(self):
+        client = CountingPlacesClient(self.cache())
+        client.requestNearbySearch(1.2803, 103.8445, 500, ["taxi_stand"])
+
+        self.clock.now += 3600
+        client.requestNearbySearch(1.2803, 103.8445, 500, ["taxi_stand"])
+
+        self.assertEqual(client.calls, 2)
+
+    def test_concurrent_identical_searches_are_merged(self):
+        cache = self.cache()
+        client = CountingPlacesClient(cache, delay=0.2)
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                client.requestNearbySearch(1.2803, 103.8445, 500, ["bus_stop"])))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(cache.stats()["coalesced"], 7)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(places == results[0] for places in results))
+        self.assertFalse(any(places is results[0] for places in results[1:])) # Each caller gets its own copy
+
+    def test_failed_searches_are_not_cached(self):
+        cache = self.cache()
+        failing = CountingPlacesClient(cache, fail=True)
+        self.assertEqual(failing.requestNearbySearch(1.2803, 103.8445, 500, ["bus_stop"]), [])
+
+        client = CountingPlacesClient(cache)
+        self.assertEqual(len(client.requestNearbySearch(1.2803, 103.8445, 500, ["bus_stop"])), 1)
+        self.assertEqual(client.calls, 1)
+
+    def test_offline_mode_replays_recorded_searches(self):
+        CountingPlacesClient(self.cache()).requestNearbySearch(1.2803, 103.8445, 500, ["bus_stop"])
+        self.clock.now += 10 * 3600 # Expired, but still replayed offline
+
+        offline = CountingPlacesClient(self.cache(offline=True))
+
+        self.assertEqual(len(offline.requestNearbySearch(1.2803, 103.8445, 500, ["bus_stop"])), 1)
+        self.assertEqual(offline.requestNearbySearch(1.3521, 103.8198, 500, ["bus_stop"]), [])
+        self.assertEqual(offline.calls, 0)
+        self.assertEqual(offline.nearby_cache.stats()["replay_misses"], 1)
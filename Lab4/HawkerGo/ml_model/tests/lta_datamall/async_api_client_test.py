@@ -0,0 +1,139 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from lta_datamall import AsyncLTADataMallClient, LTADataMallClient, LTADataMallEndpoints
+
+PAGE_SIZE = 10
+RECORD_COUNT = 95
+
+class FakeDataMallHandler(BaseHTTPRequestHandler):
+    ''' Serves a paginated BusStops feed of RECORD_COUNT records, and a single BusArrival response. '''
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        skip = int(parse_qs(url.query).get('$skip', ['0'])[0])
+
+        with server.lock:
+            server.requests.append(skip)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.delay)
+
+        if url.path.endswith(LTADataMallEndpoints.BUS_ARRIVAL.value):
+            payload = {"odata.metadata": "BusArrival", "BusStopCode": "83139", "Services": []}
+        else:
+            records = [{"BusStopCode": f"{i:05d}"} for i in range(skip, min(skip + PAGE_SIZE, RECORD_COUNT))]
+            payload = {"odata.metadata": "BusStops", "value": records}
+
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        with server.lock:
+            server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+class TestAsyncLTADataMallClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeDataMallHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.delay = 0.0
+        self.client = AsyncLTADataMallClient("test", max_concurrency=4, base_url=self.base_url)
+
+    def codes(self, response):
+        return [int(record["BusStopCode"]) for record in response["value"]]
+
+    def test_fetch_all_reassembles_pages_in_order(self):
+        self.server.delay = 0.02
+        response = asyncio.run(self.client.fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1))
+
+        self.assertEqual(response["odata.metadata"], "BusStops")
+        self.assertEqual(self.codes(response), list(range(RECORD_COUNT)))
+
+        # The pages after the first were requested concurrently, within the limit
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLessEqual(self.server.max_in_flight, 4)
+
+    def test_matches_synchronous_client(self):
+        sync_client = LTADataMallClient("test", base_url=self.base_url)
+        expected = sync_client.fetch(LTADataMallEndpoints.BUS_STOPS, params={}, amount=-1)
+        response = asyncio.run(self.client.fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1))
+
+        self.assertEqual(response, expected)
+
+    def test_stops_at_first_empty_page(self):
+        asyncio.run(self.client.fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1))
+
+        # 10 pages with records, then at most one empty page per concurrent request
+        pages_with_records = -(-RECORD_COUNT // PAGE_SIZE)
+        self.assertLessEqual(len(self.server.requests), pages_with_records + 4)
+        self.assertNotIn(pages_with_records * PAGE_SIZE + 4 * PAGE_SIZE, self.server.requests)
+
+    def test_fetch_amount_with_offset(self):
+        params = {"$skip": 5}
+        response = asyncio.run(self.client.fetch(LTADataMallEndpoints.BUS_STOPS, params=params, amount=25))
+
+        self.assertEqual(self.codes(response), list(range(5, 30)))
+        self.assertEqual(sorted(self.server.requests), [5, 15, 25])
+        self.assertEqual(params, {"$skip": 5}) # The caller's parameters are left untouched
+
+    def test_non_paginated_endpoint_makes_single_request(self):
+        response = asyncio.run(self.client.fetch(LTADataMallEndpoints.BUS_ARRIVAL,
+                                                 params={"BusStopCode": "83139"},
+                                                 amount=-1))
+
+        self.assertEqual(response["BusStopCode"], "83139")
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_concurrent_fetches_share_the_limit(self):
+        self.server.delay = 0.02
+        async def fetch_twice():
+            return await asyncio.gather(
+                self.client.fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1),
+                self.client.fetch(LTADataMallEndpoints.BUS_ROUTES, amount=-1),
+            )
+
+        first, second = asyncio.run(fetch_twice())
+
+        self.assertEqual(len(first["value"]), RECORD_COUNT)
+        self.assertEqual(len(second["value"]), RECORD_COUNT)
+        self.assertLessEqual(self.server.max_in_flight, 4)
+
+    def test_requests_the_same_pages_as_iter_records(self):
+        sync_client = LTADataMallClient("test", base_url=self.base_url)
+        expected = list(sync_client.iter_records(LTADataMallEndpoints.BUS_STOPS, params={"$skip": 5}, amount=42, prefetch=0))
+        sync_requests = sorted(self.server.requests)
+        self.server.requests = []
+
+        response = asyncio.run(self.client.fetch(LTADataMallEndpoints.BUS_STOPS, params={"$skip": 5}, amount=42))
+
+        self.assertEqual(response["value"], expected)
+        self.assertEqual(sorted(self.server.requests), sync_requests)
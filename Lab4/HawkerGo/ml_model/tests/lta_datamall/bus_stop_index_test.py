@@ -0,0 +1,43 @@
+import unittest
+
+from lta_datamall import BusStopIndex, BUS_STOP_CODE_PATTERN
+from hawker_index import HawkerDescriptor
+
+BUS_STOPS = [
+    {"BusStopCode": "05269", "RoadName": "Sth Bridge Rd", "Description": "MAXWELL STN EXIT 2",
+     "Latitude": 1.281002, "Longitude": 103.8446264},
+    {"BusStopCode": "05271", "RoadName": "Tg Pagar Rd", "Description": "Opp Fairfield Meth Ch",
+     "Latitude": 1.2796786, "Longitude": 103.8438298},
+    {"BusStopCode": "99999", "RoadName": "Unknown", "Description": "No location", "Latitude": None},
+]
+
+class TestBusStopIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = BusStopIndex(BUS_STOPS)
+
+    def test_lookup_by_code(self):
+        self.assertEqual(self.index.get("05271")["RoadName"], "Tg Pagar Rd")
+        self.assertEqual(self.index.get("99999")["Description"], "No location")
+        self.assertIsNone(self.index.get("00000"))
+
+    def test_nearest_within_radius(self):
+        stop, distance = self.index.nearest(1.28103, 103.84462, max_distance=50)
+        self.assertEqual(stop["BusStopCode"], "05269")
+        self.assertLess(distance, 5)
+
+        self.assertEqual(self.index.nearest(1.29, 103.85, max_distance=50), (None, None))
+
+    def test_within_is_sorted_by_distance(self):
+        stops = self.index.within(1.2796786, 103.8438298, radius=500)
+
+        self.assertEqual([stop["BusStopCode"] for stop, _ in stops], ["05271", "05269"])
+
+    def test_bus_stop_code_pattern(self):
+        self.assertEqual(BUS_STOP_CODE_PATTERN.search("Opp Blk 10 (05271)").group(), "05271")
+        self.assertIsNone(BUS_STOP_CODE_PATTERN.search("Blk 123456"))
+
+    def test_fills_missing_codes_of_hawker_bus_stops(self):
+        hawker_data = {"bus_stops": [{"displayName": "Maxwell Stn Exit 2", "latitude": 1.28101, "longitude": 103.84463}]}
+
+        self.assertEqual(HawkerDescriptor.from_document(hawker_data).bus_stop_codes, ())
+        self.assertEqual(HawkerDescriptor.from_document(hawker_data, self.index).bus_stop_codes, ("05269",))
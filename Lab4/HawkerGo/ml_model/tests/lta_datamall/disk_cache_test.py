@@ -0,0 +1,150 @@
+import contextlib
+import io
+import itertools
+import os
+import tempfile
+import unittest
+
+from lta_datamall import FeedDiskCache, LTADataMallClient, LTADataMallEndpoints
+
+PAGE_SIZE = 10
+RECORD_COUNT = 35
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+class CountingClient(LTADataMallClient):
+    ''' Serves paginated feeds from memory, counting the requests that would reach LTA DataMall. '''
+
+    def __init__(self, cache_dir, clock):
+        super().__init__("test", cache_dir=cache_dir)
+        self.disk_cache = FeedDiskCache(cache_dir, clock=clock)
+        self.requests = 0
+
+    def request(self, endpoint, params=None):
+        self.requests += 1
+        skip = (params or {}).get('$skip', 0)
+        records = [{"BusStopCode": f"{i:05d}", "Description": "Opp Blk 1"}
+                   for i in range(skip, min(skip + PAGE_SIZE, RECORD_COUNT))]
+        return {"odata.metadata": endpoint.value, "value": records}
+
+class TestFeedDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.clock = FakeClock()
+
+    def client(self):
+        return CountingClient(self.directory.name, self.clock)
+
+    def cached_files(self):
+        return sorted(os.listdir(self.directory.name))
+
+    def test_second_run_makes_no_requests(self):
+        first = self.client()
+        expected = first.fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1)
+        self.assertEqual(first.requests, 5)
+
+        second = self.client()
+        self.assertEqual(second.fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1), expected)
+        self.assertEqual(list(second.iter_records(LTADataMallEndpoints.BUS_STOPS)), expected["value"])
+        self.assertEqual(second.requests, 0)
+        self.assertEqual(second.disk_cache.stats()["hits"], 2)
+
+    def test_expired_feed_is_downloaded_again(self):
+        self.client().fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1)
+
+        self.clock.now += 7 * 24 * 60 * 60
+        client = self.client()
+        client.fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1)
+
+        self.assertEqual(client.requests, 5)
+        self.assertEqual(len(self.cached_files()), 1)
+
+    def test_requests_are_keyed_by_params_and_amount(self):
+        client = self.client()
+        client.fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1)
+        partial = client.fetch(LTADataMallEndpoints.BUS_STOPS, params={"$skip": 10}, amount=5)
+
+        self.assertEqual([r["BusStopCode"] for r in partial["value"]], ["00010", "00011", "00012", "00013", "00014"])
+        self.assertEqual(len(self.cached_files()), 2)
+
+    def test_realtime_feeds_are_not_cached(self):
+        client = self.client()
+        client.fetch(LTADataMallEndpoints.CARPARK_AVAILABILITY, amount=-1)
+        client.fetch(LTADataMallEndpoints.CARPARK_AVAILABILITY, amount=-1)
+
+        self.assertEqual(client.requests, 10)
+        self.assertEqual(self.cached_files(), [])
+
+    def test_interrupted_download_is_not_stored(self):
+        client = self.client()
+        records = client.iter_records(LTADataMallEndpoints.BUS_STOPS, prefetch=0)
+        list(itertools.islice(records, PAGE_SIZE + 1))
+        records.close()
+
+        self.assertEqual(self.cached_files(), [])
+
+    def test_corrupt_file_is_discarded(self):
+        client = self.client()
+        client.fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1)
+        with open(os.path.join(self.directory.name, self.cached_files()[0]), 'wb') as file:
+            file.write(b'not gzip')
+
+        client = self.client()
+        response = client.fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1)
+
+        self.assertEqual(len(response["value"]), RECORD_COUNT)
+        self.assertEqual(client.requests, 5)
+
+    def test_cached_feed_is_read_in_pages(self):
+        self.client().fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1)
+
+        cache = FeedDiskCache(self.directory.name, clock=self.clock)
+        pages = cache.load(LTADataMallEndpoints.BUS_STOPS, amount=-1, page_size=PAGE_SIZE)
+        first = next(pages)
+
+        self.assertEqual(len(first["value"]), PAGE_SIZE)
+        self.assertEqual(first["odata.metadata"], LTADataMallEndpoints.BUS_STOPS.value)
+        self.assertEqual([len(page["value"]) for page in pages], [10, 10, 5])
+
+    def test_cached_empty_feed_yields_one_page(self):
+        client = self.client()
+        client.fetch(LTADataMallEndpoints.BUS_STOPS, params={"$skip": 100}, amount=-1)
+
+        client = self.client()
+        response = client.fetch(LTADataMallEndpoints.BUS_STOPS, params={"$skip": 100}, amount=-1)
+
+        self.assertEqual(response["value"], [])
+        self.assertEqual(client.requests, 0)
+
+    def test_directory_is_created_on_first_store(self):
+        cache_dir = os.path.join(self.directory.name, "nested", "cache")
+        client = CountingClient(cache_dir, self.clock)
+        self.assertFalse(os.path.exists(cache_dir))
+
+        client.fetch(LTADataMallEndpoints.CARPARK_AVAILABILITY, amount=-1)
+        self.assertFalse(os.path.exists(cache_dir))
+
+        client.fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test_unwritable_directory_is_a_cache_miss(self):
+        blocker = os.path.join(self.directory.name, "not-a-directory")
+        with open(blocker, 'w') as file:
+            file.write("")
+        cache_dir = os.path.join(blocker, "cache")
+
+        client = CountingClient(cache_dir, self.clock)
+        with contextlib.redirect_stdout(io.StringIO()):
+            first = client.fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1)
+            second = client.fetch(LTADataMallEndpoints.BUS_STOPS, amount=-1)
+
+        self.assertEqual(len(first["value"]), RECORD_COUNT)
+        self.assertEqual(second, first)
+        self.assertEqual(client.requests, 10)
+        self.assertEqual(client.disk_cache.stats()["write_errors"], 2)
@@ -0,0 +1,77 @@
+import itertools
+import threading
+import unittest
+
+from lta_datamall import LTADataMallClient, LTADataMallEndpoints
+
+PAGE_SIZE = 10
+RECORD_COUNT = 95
+
+class FakePagedClient(LTADataMallClient):
+    ''' Serves a paginated feed of RECORD_COUNT records from memory, recording each request. '''
+
+    def __init__(self):
+        super().__init__("test")
+        self.requests = []
+        self._requests_lock = threading.Lock()
+
+    def request(self, endpoint, params=None):
+        params = params or {}
+        with self._requests_lock:
+            self.requests.append(dict(params))
+
+        if endpoint == LTADataMallEndpoints.BUS_ARRIVAL:
+            return {"BusStopCode": params.get("BusStopCode"), "Services": []}
+
+        skip = params.get('$skip', 0)
+        records = [{"CarParkID": str(i)} for i in range(skip, min(skip + PAGE_SIZE, RECORD_COUNT))]
+        return {"odata.metadata": endpoint.value, "value": records}
+
+def ids(records):
+    return [int(record["CarParkID"]) for record in records]
+
+class TestRecordStream(unittest.TestCase):
+    def setUp(self):
+        self.client = FakePagedClient()
+
+    def test_yields_every_record_in_order(self):
+        for prefetch in (0, 1, 4):
+            with self.subTest(prefetch=prefetch):
+                client = FakePagedClient()
+                records = client.iter_records(LTADataMallEndpoints.CARPARK_AVAILABILITY, prefetch=prefetch)
+
+                self.assertEqual(ids(records), list(range(RECORD_COUNT)))
+                # 10 pages with records and the empty page after them, plus any prefetched after it
+                self.assertGreaterEqual(len(client.requests), 11)
+                self.assertLessEqual(len(client.requests), 11 + prefetch)
+
+    def test_pages_are_downloaded_as_consumed(self):
+        records = self.client.iter_records(LTADataMallEndpoints.CARPARK_AVAILABILITY, prefetch=2)
+
+        first_page = list(itertools.islice(records, PAGE_SIZE))
+
+        self.assertEqual(ids(first_page), list(range(PAGE_SIZE)))
+        self.assertLessEqual(len(self.client.requests), 1 + 3) # The first page and the pages prefetched after it
+        records.close()
+
+    def test_amount_and_offset(self):
+        params = {"$skip": 5}
+        records = list(self.client.iter_records(LTADataMallEndpoints.CARPARK_AVAILABILITY, params=params, amount=25))
+
+        self.assertEqual(ids(records), list(range(5, 30)))
+        self.assertEqual(sorted(request["$skip"] for request in self.client.requests), [5, 15, 25])
+        self.assertEqual(params, {"$skip": 5})
+
+    def test_fetch_matches_stream_without_modifying_params(self):
+        params = {}
+        response = self.client.fetch(LTADataMallEndpoints.CARPARK_AVAILABILITY, params=params, amount=-1)
+
+        self.assertEqual(response["odata.metadata"], LTADataMallEndpoints.CARPARK_AVAILABILITY.value)
+        self.assertEqual(response["value"], list(self.client.iter_records(LTADataMallEndpoints.CARPARK_AVAILABILITY)))
+        self.assertEqual(params, {})
+
+    def test_non_paginated_endpoint_makes_single_request(self):
+        records = list(self.client.iter_records(LTADataMallEndpoints.BUS_ARRIVAL, params={"BusStopCode": "83139"}))
+
+        self.assertEqual(records, [])
+        self.assertEqual(len(self.client.requests), 1)
@@ -0,0 +1,80 @@
+import threading
+import time
+import unittest
+
+from lta_datamall import SnapshotCache, LTADataMallEndpoints
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestSnapshotCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = SnapshotCache(ttl=60, clock=self.clock)
+        self.records = [
+            {"CarParkID": "1", "LotType": "C", "AvailableLots": 10},
+            {"CarParkID": "1", "LotType": "Y", "AvailableLots": 3},
+            {"CarParkID": "2", "LotType": "C", "AvailableLots": 50},
+        ]
+
+    def test_feed_downloaded_once_per_window(self):
+        calls = []
+        def loader():
+            calls.append(1)
+            return self.records
+
+        for _ in range(5):
+            self.cache.get(LTADataMallEndpoints.CARPARK_AVAILABILITY, loader, key_field="CarParkID")
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.hits, 4)
+        self.assertEqual(self.cache.misses, 1)
+
+        # Once the TTL has passed, the feed is downloaded again
+        self.clock.now = 61
+        self.cache.get(LTADataMallEndpoints.CARPARK_AVAILABILITY, loader, key_field="CarParkID")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.cache.stats()["fetches"], 2)
+
+    def test_index_groups_records_by_key(self):
+        snapshot = self.cache.get("carparks", lambda: self.records, key_field="CarParkID")
+
+        self.assertEqual(len(snapshot.index["1"]), 2)
+        self.assertEqual([r["AvailableLots"] for r in snapshot.lookup(["2", "1", "2", "404"])], [50, 10, 3])
+
+    def test_concurrent_misses_are_coalesced(self):
+        cache = SnapshotCache(ttl=60)
+        calls = []
+        def slow_loader():
+            calls.append(1)
+            time.sleep(0.2)
+            return self.records
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get("carparks", slow_loader)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(snapshot is results[0] for snapshot in results))
+        self.assertEqual(cache.coalesced, 7)
+
+    def test_failed_download_is_not_cached(self):
+        def failing_loader():
+            raise ConnectionError("LTA DataMall unreachable")
+
+        with self.assertRaises(ConnectionError):
+            self.cache.get("carparks", failing_loader)
+
+        snapshot = self.cache.get("carparks", lambda: self.records)
+        self.assertEqual(len(snapshot.records), 3)
@@ -0,0 +1,60 @@
+import unittest
+
+from lta_datamall import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestTTLCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(ttl=30, maxsize=3, clock=self.clock)
+
+    def test_entries_expire_after_ttl(self):
+        self.cache.put("83139", {"Services": []})
+        self.clock.now = 29
+        self.assertIsNotNone(self.cache.get("83139"))
+
+        self.clock.now = 30
+        self.assertIsNone(self.cache.get("83139"))
+        self.assertEqual(self.cache.stats()["expired"], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        for code in ["1", "2", "3"]:
+            self.cache.put(code, code)
+        self.cache.get("1") # "2" is now the least recently used
+
+        self.cache.put("4", "4")
+
+        self.assertIsNone(self.cache.get("2"))
+        self.assertEqual(self.cache.get("1"), "1")
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_get_or_create_calls_factory_once(self):
+        calls = []
+        def factory():
+            calls.append(1)
+            return object()
+
+        first, first_cached = self.cache.get_or_create("83139", factory)
+        second, second_cached = self.cache.get_or_create("83139", factory)
+
+        self.assertIs(first, second)
+        self.assertEqual((first_cached, second_cached), (False, True))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.stats()["hit_rate"], 0.5)
+
+    def test_discard_only_removes_matching_value(self):
+        old, new = object(), object()
+        self.cache.put("83139", new)
+
+        self.cache.discard("83139", old)
+        self.assertIs(self.cache.get("83139"), new)
+
+        self.cache.discard("83139", new)
+        self.assertIsNone(self.cache.get("83139"))
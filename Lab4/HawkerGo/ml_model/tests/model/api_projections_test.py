@@ -0,0 +1,28 @@
+import unittest
+
+from api_projections import ENDPOINT_FIELDS, SUMMARY_FIELDS, build_projection, parse_fields
+
+class TestParseFields(unittest.TestCase):
+    def test_missing_or_empty_value_uses_default(self):
+        self.assertEqual(parse_fields(None, SUMMARY_FIELDS), SUMMARY_FIELDS)
+        self.assertEqual(parse_fields("", SUMMARY_FIELDS), SUMMARY_FIELDS)
+        self.assertEqual(parse_fields(" , ", SUMMARY_FIELDS), SUMMARY_FIELDS)
+
+    def test_fields_keep_order_without_duplicates(self):
+        self.assertEqual(parse_fields("displayName, id,displayName,bus_stops.displayName", SUMMARY_FIELDS),
+                         ("displayName", "id", "bus_stops.displayName"))
+
+    def test_unknown_fields_are_rejected(self):
+        with self.assertRaises(ValueError) as context:
+            parse_fields("id,_id,password", SUMMARY_FIELDS)
+        self.assertIn("_id, password", str(context.exception))
+
+class TestBuildProjection(unittest.TestCase):
+    def test_id_is_excluded_unless_requested(self):
+        self.assertEqual(build_projection(("id", "displayName")), {"id": 1, "displayName": 1, "_id": 0})
+        self.assertEqual(build_projection(ENDPOINT_FIELDS["predict_all"], include_id=True),
+                         {"id": 1, "displayName": 1, "_id": 1})
+
+    def test_subfields_of_projected_fields_are_dropped(self):
+        self.assertEqual(build_projection(("bus_stops.displayName", "bus_stops", "carparks.CarParkID")),
+                         {"bus_stops": 1, "carparks.CarParkID": 1, "_id": 0})
@@ -0,0 +1,117 @@
+import contextlib
+import io
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from lta_datamall import TTLCache
+from model import HawkerCrowdPredictor
+
+class SlowLTAClient:
+    '''Stands in for LTADataMallClient, answering each bus stop after a delay.'''
+
+    def __init__(self, delay=0.2, failing=(), hanging=()):
+        self.delay = delay
+        self.failing = failing
+        self.hanging = hanging
+        self.requested = []
+
+    def fetch(self, endpoint, params={}, amount=None):
+        code = params["BusStopCode"]
+        self.requested.append(code)
+        if code in self.hanging:
+            time.sleep(self.delay * 10)
+        time.sleep(self.delay)
+        if code in self.failing:
+            raise ConnectionError("LTA DataMall unreachable")
+        return {"BusStopCode": code, "Services": []}
+
+class OfflineLTAClient:
+    '''Stands in for LTADataMallClient without a network connection, failing every request at once.'''
+
+    def __init__(self):
+        self.requests = 0
+
+    def fetch(self, endpoint, params={}, amount=None):
+        self.requests += 1
+        raise ConnectionError("Network is unreachable")
+
+class UniformModel:
+    classes_ = np.array([0, 1, 2])
+
+    def predict_proba(self, features):
+        return np.full((len(features), 3), 1 / 3)
+
+class TestBusArrivalFanOut(unittest.TestCase):
+    def setUp(self):
+        self.predictor = HawkerCrowdPredictor()
+        self.predictor.bus_arrival_cache = TTLCache(ttl=30)
+        self.codes = [f"{i:05d}" for i in range(8)]
+
+    def test_latency_tracks_slowest_stop(self):
+        self.predictor.lta_client = SlowLTAClient(delay=0.2)
+
+        start = time.perf_counter()
+        bus_data = self.predictor.get_bus_arrival_data(self.codes)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(list(bus_data), self.codes)
+        self.assertLess(elapsed, 0.2 * len(self.codes) / 2)
+
+    def test_partial_results_when_stops_fail(self):
+        self.predictor.lta_client = SlowLTAClient(delay=0.05, failing={"00001"}, hanging={"00002"})
+        self.predictor.lta_request_timeout = 0.1
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            bus_data = self.predictor.get_bus_arrival_data(self.codes)
+
+        self.assertNotIn("00001", bus_data)
+        self.assertNotIn("00002", bus_data)
+        self.assertEqual(len(bus_data), len(self.codes) - 2)
+
+    def test_shared_stops_fetched_once_per_window(self):
+        client = self.predictor.lta_client = SlowLTAClient(delay=0.01)
+        hawkers = {
+            "hawker-a": {"bus_stops": [{"bus_stop_code": code} for code in self.codes[:5]]},
+            "hawker-b": {"bus_stops": [{"bus_stop_code": code} for code in self.codes[3:]]},
+        }
+        self.predictor.get_hawker_center_by_id = hawkers.get
+        self.predictor.model = UniformModel()
+
+        self.predictor.predict_crowd_batch(list(hawkers))
+        self.assertEqual(sorted(client.requested), self.codes)
+
+        self.predictor.get_bus_arrival_data(self.codes)
+        self.assertEqual(sorted(client.requested), self.codes)
+        self.assertEqual(self.predictor.cache_stats()["bus_arrivals"]["size"], len(self.codes))
+
+    def test_failed_stops_are_not_cached(self):
+        client = self.predictor.lta_client = SlowLTAClient(delay=0.01, failing={"00001"})
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.predictor.get_bus_arrival_data(self.codes)
+            self.predictor.get_bus_arrival_data(self.codes)
+
+        self.assertEqual(client.requested.count("00001"), 2)
+        self.assertEqual(client.requested.count("00000"), 1)
+
+    def test_immediate_failures_do_not_deadlock(self):
+        client = self.predictor.lta_client = OfflineLTAClient()
+        results = []
+
+        def fetch_repeatedly():
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(50):
+                    results.append(self.predictor.get_bus_arrival_data(self.codes))
+
+        thread = threading.Thread(target=fetch_repeatedly, daemon=True)
+        thread.start()
+        thread.join(10)
+
+        self.assertFalse(thread.is_alive(), "get_bus_arrival_data deadlocked")
+        self.assertEqual(results, [{}] * 50)
+        # Failed fetches are not cached, so every call retries every stop
+        self.assertEqual(client.requests, 50 * len(self.codes))
+        self.assertEqual(len(self.predictor.bus_arrival_cache), 0)
@@ -0,0 +1,87 @@
+import unittest
+
+from pymongo.errors import OperationFailure
+
+from bson import ObjectId
+
+from db_indexes import (HAWKER_CENTER_INDEXES, INDEX_CHECKS, QUERY_SHAPES, ensure_indexes, find_stages,
+                        location_of, migrate_locations, summarize_plan)
+
+COLLSCAN_PLAN = {"stage": "COLLSCAN", "filter": {"displayName": {"$regex": "max"}}}
+INDEXED_PLAN = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "postal_code"}}
+OR_PLAN = {"stage": "SUBPLAN", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "OR", "inputStages": [
+    {"stage": "IXSCAN", "indexName": "id_unique"},
+    {"stage": "COLLSCAN"},
+]}}}
+SBE_PLAN = {"queryPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "_id_"}}}
+
+class FakeCollection:
+    ''' Records created indexes and updates, failing the creation of indexes named in fail_names. '''
+
+    def __init__(self, documents=(), fail_names=()):
+        self.documents = list(documents)
+        self.fail_names = set(fail_names)
+        self.indexes = []
+        self.updates = []
+
+    def find(self, filter, projection=None):
+        return [document for document in self.documents if "location" not in document]
+
+    def bulk_write(self, operations, ordered=True):
+        self.updates.extend(operations)
+        return type("BulkWriteResult", (), {"modified_count": len(operations)})()
+
+    def create_indexes(self, indexes):
+        for index in indexes:
+            if index.document["name"] in self.fail_names:
+                raise OperationFailure("E11000 duplicate key error", code=11000)
+            self.indexes.append(index.document["name"])
+
+class TestQueryPlans(unittest.TestCase):
+    def test_collscan_is_found_at_any_depth(self):
+        self.assertTrue(find_stages(COLLSCAN_PLAN, "COLLSCAN"))
+        self.assertTrue(find_stages(OR_PLAN, "COLLSCAN"))
+        self.assertFalse(find_stages(INDEXED_PLAN, "COLLSCAN"))
+        self.assertFalse(find_stages(SBE_PLAN, "COLLSCAN"))
+
+    def test_plan_summary_names_stages_and_indexes(self):
+        self.assertEqual(summarize_plan(INDEXED_PLAN), "FETCH > IXSCAN(postal_code)")
+        self.assertEqual(summarize_plan(SBE_PLAN), "FETCH > IXSCAN(_id_)")
+        self.assertEqual(summarize_plan(COLLSCAN_PLAN), "COLLSCAN")
+
+    def test_index_checks_are_not_api_query_shapes(self):
+        values = {"_id": ObjectId(), "id": "place", "postal_code": "069184", "postal_prefix": "06",
+                  "name": "Maxwell", "longitude": 103.8445, "latitude": 1.2803}
+
+        api_filters = [str(build_filter(values)) for _, build_filter, _ in QUERY_SHAPES]
+        check_filters = [str(build_filter(values)) for _, build_filter, _ in INDEX_CHECKS]
+
+        self.assertFalse(any("$text" in f or "$nearSphere" in f for f in api_filters))
+        self.assertTrue(any("$text" in f for f in check_filters))
+        self.assertTrue(any("$nearSphere" in f for f in check_filters))
+
+class TestEnsureIndexes(unittest.TestCase):
+    def test_location_is_a_geojson_point(self):
+        self.assertEqual(location_of({"latitude": 1.3, "longitude": 103.8}),
+                         {"type": "Point", "coordinates": [103.8, 1.3]})
+        self.assertIsNone(location_of({"latitude": None, "longitude": 103.8}))
+        self.assertIsNone(location_of({}))
+
+    def test_migration_only_updates_documents_with_coordinates(self):
+        collection = FakeCollection([
+            {"_id": 1, "latitude": 1.3, "longitude": 103.8},
+            {"_id": 2},
+            {"_id": 3, "latitude": 1.3, "longitude": 103.8, "location": {}},
+        ])
+
+        self.assertEqual(migrate_locations(collection), 1)
+        self.assertEqual(migrate_locations(FakeCollection()), 0)
+
+    def test_failed_index_does_not_stop_the_others(self):
+        collection = FakeCollection(fail_names={"id_unique"})
+
+        created = ensure_indexes({"hawker_centers": collection})
+
+        self.assertNotIn("id_unique", created)
+        self.assertEqual(len(created), len(HAWKER_CENTER_INDEXES) - 1)
+        self.assertIn("location_2dsphere", collection.indexes)
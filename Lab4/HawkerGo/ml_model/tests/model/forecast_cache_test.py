@@ -0,0 +1,130 @@
+import contextlib
+import io
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from forecast_cache import ForecastCache
+from hawker_index import HawkerDescriptor
+from live_features import LiveFeatureRefresher, LiveFeatures
+from model import HawkerCrowdPredictor
+
+FEATURE_COLUMNS = [
+    'hour', 'minute', 'is_weekend', 'is_peak_hours', 'available_lots', 'occupancy_rate',
+    'num_full_carparks', 'num_bus_services', 'bus_frequency', 'buses_arriving_soon',
+    'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'
+]
+
+def make_training_data(rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame(rng.random((rows, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    data['hour'] = rng.integers(0, 24, rows)
+    data['hawker_center_id'] = 'hawker'
+    data['timestamp'] = datetime(2025, 1, 1)
+    # Crowds peak at lunch, so forecasts vary over the day
+    data['crowd_level'] = np.where(data['hour'].between(11, 13), 'High',
+                                   np.where(data['hour'].between(17, 19), 'Medium', 'Low'))
+    return data
+
+class FakeIndex:
+    def __init__(self, descriptors):
+        self.descriptors = descriptors
+        self.version = 1
+
+    def all(self):
+        return self.descriptors
+
+    def resolve(self, hawker_id):
+        return next((d for d in self.descriptors if hawker_id in (d.object_id, d.id)), None)
+
+class StaticRefresher(LiveFeatureRefresher):
+    '''Serves the same live feature row for every hawker center instead of fetching LTA data.'''
+
+    def refresh(self):
+        table = {d.object_id: LiveFeatures(0.5, 0.5, 0.0, 0.25, 0.5, 0.1) for d in self.predictor.hawker_index.all()}
+        self._table = (table, self._clock())
+        self.refreshes += 1
+
+class CountingModel:
+    '''Wraps a fitted classifier and counts the rows it scores.'''
+
+    def __init__(self, model):
+        self.model = model
+        self.classes_ = model.classes_
+        self.rows = []
+
+    def predict_proba(self, features):
+        self.rows.append(len(features))
+        return self.model.predict_proba(features)
+
+class TestForecastCache(unittest.TestCase):
+    def setUp(self):
+        self.descriptors = [
+            HawkerDescriptor(object_id=f"oid-{i}", id=f"place-{i}", display_name=f"Hawker {i}", latitude=1.3,
+                             longitude=103.8, postal_code="069184", carpark_ids=(), bus_stop_codes=())
+            for i in range(5)
+        ]
+        self.predictor = HawkerCrowdPredictor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.predictor.train_model(make_training_data())
+        self.predictor.model = CountingModel(self.predictor.model)
+        self.predictor.hawker_index = FakeIndex(self.descriptors)
+        self.predictor.live_features = StaticRefresher(self.predictor, interval=60)
+        self.predictor.live_features.refresh()
+        self.cache = ForecastCache(self.predictor, maxsize=1000)
+        self.start = datetime(2025, 4, 7, 10, 7, 30)
+
+    def test_forecast_times_align_to_step(self):
+        times = ForecastCache.times(self.start, hours=1, step=15)
+
+        self.assertEqual([when.strftime('%H:%M') for when in times], ["10:07", "10:15", "10:30", "10:45", "11:00"])
+
+    def test_precompute_scores_everything_in_one_batch(self):
+        forecasts = self.cache.forecast([d.id for d in self.descriptors], start=self.start, hours=3)
+
+        self.assertEqual(self.predictor.model.rows, [5 * 13])
+        self.assertEqual(len(forecasts["place-0"]), 13)
+
+        # Later requests for the same hawker centers and times, by any alias, are cache hits
+        self.cache.forecast(["oid-0", "place-4"], start=self.start.replace(second=0), hours=2)
+        self.assertEqual(self.predictor.model.rows, [5 * 13])
+
+    def test_forecast_matches_predictor(self):
+        forecast = self.cache.forecast(["place-1"], start=self.start, hours=2)["place-1"]
+
+        levels = {0: 'Low', 1: 'Medium', 2: 'High'}
+        for entry in forecast:
+            row = np.array([self.predictor.extract_raw_features("place-1", entry.time)], dtype=float)
+            probabilities = self.predictor.model.predict_proba(self.predictor.scaler.transform(row))[0]
+            self.assertEqual(entry.crowd_level, levels[self.predictor.model.classes_[probabilities.argmax()]])
+            self.assertAlmostEqual(entry.confidence, probabilities.max())
+
+    def test_live_feature_refresh_invalidates(self):
+        self.cache.forecast(["place-0"], start=self.start)
+        self.predictor.live_features._clock = lambda: 2e9
+        self.predictor.live_features.refresh()
+
+        self.cache.forecast(["place-0"], start=self.start)
+
+        self.assertEqual(self.predictor.model.rows, [1, 1])
+
+    def test_best_time_avoids_lunch_peak(self):
+        best = self.cache.best_time("place-2", start=self.start, hours=4)
+
+        self.assertFalse(11 <= best.time.hour <= 13)
+        self.assertEqual(best.crowd_level, "Low")
+
+    def test_cache_is_bounded(self):
+        cache = ForecastCache(self.predictor, maxsize=10)
+
+        cache.forecast([d.id for d in self.descriptors], start=self.start, hours=3)
+
+        self.assertEqual(len(cache.cache), 10)
+        self.assertEqual(cache.stats()["evictions"], 5 * 13 - 10)
+
+    def test_unknown_hawker_center_raises(self):
+        self.predictor.db = None
+        with self.assertRaises(ValueError):
+            self.cache.forecast(["unknown"], start=self.start)
@@ -0,0 +1,102 @@
+import contextlib
+import io
+import unittest
+
+from bson.objectid import ObjectId
+
+from hawker_index import HawkerIndex, HawkerDescriptor
+
+class FakeCollection:
+    '''Stands in for the hawker_centers collection, counting full scans.'''
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.scans = 0
+        self.point_queries = []
+
+    def find(self, query=None, projection=None):
+        self.scans += 1
+        return iter(self.documents)
+
+    def find_one(self, query, projection=None):
+        self.point_queries.append(query)
+        for document in self.documents:
+            for condition in query["$or"]:
+                key, value = next(iter(condition.items()))
+                if document.get(key) == value:
+                    return document
+        return None
+
+MAXWELL = {
+    "_id": ObjectId("67eb5b1339be5295141f78e8"),
+    "id": "ChIJseQsTQ0Z2jERqpBTWF0Zf84",
+    "displayName": "Maxwell Food Centre",
+    "latitude": 1.2803361,
+    "longitude": 103.844767,
+    "postal_code": "069184",
+    "carparks": [{"CarParkID": "A1"}, {"Development": "No ID"}],
+    "bus_stops": [
+        {"displayName": "Maxwell Stn Exit 2", "bus_stop_code": "05269"},
+        {"displayName": "Opp Blk 10 (05271)"},
+        {"displayName": "Unnamed stop"},
+    ],
+}
+
+class TestHawkerIndex(unittest.TestCase):
+    def setUp(self):
+        self.collection = FakeCollection([MAXWELL])
+        self.index = HawkerIndex(self.collection)
+
+    def test_descriptor_parses_document_once(self):
+        descriptor = HawkerDescriptor.from_document(MAXWELL)
+
+        self.assertEqual(descriptor.carpark_ids, ("A1",))
+        self.assertEqual(descriptor.bus_stop_codes, ("05269", "05271"))
+        self.assertEqual(descriptor.object_id, "67eb5b1339be5295141f78e8")
+
+    def test_lookup_by_object_id_and_place_id(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            by_object_id = self.index.get("67eb5b1339be5295141f78e8")
+            by_place_id = self.index.get("ChIJseQsTQ0Z2jERqpBTWF0Zf84")
+
+        self.assertIs(by_object_id, by_place_id)
+        self.assertIsNone(self.index.get("unknown"))
+        self.assertEqual(self.collection.scans, 1)
+
+    def test_invalidate_rebuilds_on_next_use(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.index.get("ChIJseQsTQ0Z2jERqpBTWF0Zf84")
+            self.collection.documents = []
+            self.index.invalidate()
+
+            self.assertIsNone(self.index.get("ChIJseQsTQ0Z2jERqpBTWF0Zf84"))
+
+        self.assertEqual(self.collection.scans, 2)
+        self.assertEqual(self.index.version, 2)
+
+    def test_resolve_accepts_normalized_name(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            descriptor = self.index.resolve("  maxwell FOOD-centre")
+
+        self.assertEqual(descriptor.id, "ChIJseQsTQ0Z2jERqpBTWF0Zf84")
+        self.assertEqual(self.collection.point_queries, [])
+
+    def test_unknown_ids_are_negatively_cached(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(3):
+                self.assertIsNone(self.index.resolve("67eb5b1339be5295141f0000"))
+
+        self.assertEqual(len(self.collection.point_queries), 1)
+        self.assertNotIn("$regex", str(self.collection.point_queries))
+
+    def test_resolve_picks_up_documents_added_after_build(self):
+        added = dict(MAXWELL, _id=ObjectId("67eb5b1339be5295141f0001"), id="ChIJnew", displayName="New Centre")
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.index.build()
+            self.collection.documents.append(added)
+
+            descriptor = self.index.resolve("67eb5b1339be5295141f0001")
+
+        self.assertEqual(descriptor.id, "ChIJnew")
+        self.assertIs(self.index.get("ChIJnew"), descriptor)
+        self.assertEqual(descriptor.document_id, ObjectId("67eb5b1339be5295141f0001"))
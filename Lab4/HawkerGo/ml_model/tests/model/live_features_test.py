@@ -0,0 +1,190 @@
+import contextlib
+import io
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from hawker_index import HawkerDescriptor
+from live_features import LiveFeatureRefresher, LiveFeatures, compute_live_features
+from model import HawkerCrowdPredictor
+
+NOW = datetime(2025, 4, 1, 12, 0, tzinfo=timezone.utc)
+
+def arrival(minutes):
+    return {"EstimatedArrival": (NOW + timedelta(minutes=minutes)).isoformat()}
+
+def make_descriptor(name, carpark_ids=("A1",), bus_stop_codes=("01012",)):
+    return HawkerDescriptor(object_id=f"oid-{name}", id=name, display_name=name, latitude=1.3, longitude=103.8,
+                            postal_code="069184", carpark_ids=carpark_ids, bus_stop_codes=bus_stop_codes)
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class FakeIndex:
+    def __init__(self, descriptors):
+        self.descriptors = descriptors
+
+    def all(self):
+        return self.descriptors
+
+class FakeLivePredictor:
+    '''Serves fixed carpark and bus arrival data, counting the fetches.'''
+
+    def __init__(self, descriptors):
+        self.hawker_index = FakeIndex(descriptors)
+        self.carpark_fetches = 0
+        self.bus_arrival_fetches = 0
+        self.bus_stop_codes = [] # The codes of each bus arrival fetch
+        self.available_lots = {} # Carpark ID -> its available lots, 5 if not given
+
+    def get_carpark_data(self, carpark_ids):
+        self.carpark_fetches += 1
+        return [{"CarParkID": carpark_id, "AvailableLots": self.available_lots.get(carpark_id, 5)}
+                for carpark_id in carpark_ids]
+
+    def get_bus_arrival_data(self, bus_stop_codes, timeout=None):
+        self.bus_arrival_fetches += 1
+        self.bus_stop_codes.append(list(bus_stop_codes))
+        return {code: {"Services": [{"ServiceNo": "7", "NextBus": arrival(3)}]} for code in bus_stop_codes}
+
+class TestComputeLiveFeatures(unittest.TestCase):
+    def test_carpark_and_bus_features(self):
+        carpark_data = [{"AvailableLots": "5"}, {"AvailableLots": "95"}]
+        bus_arrival_data = {
+            "01012": {"Services": [{"ServiceNo": "7", "NextBus": arrival(3)},
+                                   {"ServiceNo": "14", "NextBus": arrival(25)}]},
+            "01013": {"Services": [{"ServiceNo": "7", "NextBus": arrival(8)}]},
+        }
+
+        features = compute_live_features(carpark_data, bus_arrival_data, 4, NOW)
+
+        self.assertAlmostEqual(features.available_lots, 0.5)
+        self.assertAlmostEqual(features.occupancy_rate, 0.5)
+        self.assertAlmostEqual(features.num_full_carparks, 0.5)
+        self.assertAlmostEqual(features.num_bus_services, 2 / 20)
+        self.assertAlmostEqual(features.bus_frequency, 15 / (2 / 4) / 30)
+        self.assertAlmostEqual(features.buses_arriving_soon, 2 / 20)
+
+    def test_defaults_without_data(self):
+        self.assertEqual(compute_live_features([], {}, 0, NOW),
+                         LiveFeatures(0.5, 0.5, 0.0, 5 / 20, 15 / 30, 0.0))
+
+    def test_naive_time_is_compared_with_aware_arrivals(self):
+        local_now = datetime.now()
+        soon = {"EstimatedArrival": (local_now.astimezone() + timedelta(minutes=2)).isoformat()}
+
+        features = compute_live_features([], {"01012": {"Services": [{"ServiceNo": "7", "NextBus": soon}]}}, 1, local_now)
+
+        self.assertAlmostEqual(features.buses_arriving_soon, 1 / 20)
+
+class TestLiveFeatureRefresher(unittest.TestCase):
+    def setUp(self):
+        self.descriptors = [make_descriptor("maxwell"), make_descriptor("no-transit", (), ())]
+        self.predictor = FakeLivePredictor(self.descriptors)
+        self.clock = FakeClock()
+        self.refresher = LiveFeatureRefresher(self.predictor, interval=60, clock=self.clock)
+
+    def test_refresh_fills_table_with_timestamp(self):
+        self.assertIsNone(self.refresher.get(self.descriptors[0]))
+
+        self.refresher.refresh()
+
+        features, refreshed_at = self.refresher.get(self.descriptors[0])
+        self.assertEqual(refreshed_at, 1000.0)
+        self.assertAlmostEqual(features.available_lots, 0.05)
+        self.assertEqual(self.refresher.get(self.descriptors[1])[0], compute_live_features([], {}, 0, NOW))
+        # Hawker centers without carparks or bus stops make no fetches
+        self.assertEqual((self.predictor.carpark_fetches, self.predictor.bus_arrival_fetches), (1, 1))
+
+    def test_stale_table_is_not_used(self):
+        self.refresher.refresh()
+
+        self.clock.now += 5 * 60 + 1
+
+        self.assertIsNone(self.refresher.get(self.descriptors[0]))
+        self.assertEqual(self.refresher.stats()["age"], 301.0)
+
+    def test_failed_refresh_keeps_previous_table(self):
+        self.refresher.refresh()
+        self.predictor.get_carpark_data = lambda ids: (_ for _ in ()).throw(ConnectionError("LTA down"))
+        self.predictor.get_bus_arrival_data = lambda codes, timeout=None: (_ for _ in ()).throw(ConnectionError("LTA down"))
+        self.clock.now += 60
+
+        with contextlib.redirect_stdout(io.StringIO()), self.assertRaises(ConnectionError):
+            self.refresher.refresh()
+
+        self.assertEqual(self.refresher.get(self.descriptors[0])[1], 1000.0)
+
+    def test_failed_bus_arrivals_fall_back_to_defaults(self):
+        self.predictor.get_bus_arrival_data = lambda codes, timeout=None: (_ for _ in ()).throw(ConnectionError("LTA down"))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.refresher.refresh()
+
+        features = self.refresher.get(self.descriptors[0])[0]
+        self.assertAlmostEqual(features.available_lots, 0.05)
+        self.assertEqual(features[3:], compute_live_features([], {}, 1, NOW)[3:])
+
+    def test_bus_stops_of_every_hawker_center_are_fetched_together(self):
+        self.predictor.hawker_index = FakeIndex([make_descriptor("maxwell", ("A1",), ("01012", "01013")),
+                                                 make_descriptor("amoy", ("A1", "A2"), ("01013", "01014")),
+                                                 make_descriptor("no-transit", (), ())])
+
+        self.refresher.refresh()
+
+        self.assertEqual(self.predictor.bus_stop_codes, [["01012", "01013", "01014"]])
+        self.assertEqual(self.predictor.carpark_fetches, 1)
+        amoy = self.refresher.get(make_descriptor("amoy"))[0]
+        self.assertAlmostEqual(amoy.num_bus_services, 1 / 20)
+
+    def test_bad_data_of_one_hawker_center_does_not_discard_the_table(self):
+        self.predictor.hawker_index = FakeIndex([make_descriptor("maxwell"), make_descriptor("amoy", ("A2",))])
+        self.predictor.available_lots["A2"] = "unknown"
+
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.refresher.refresh()
+
+        self.assertIn("amoy", output.getvalue())
+        self.assertAlmostEqual(self.refresher.get(make_descriptor("maxwell"))[0].available_lots, 0.05)
+        self.assertEqual(self.refresher.get(make_descriptor("amoy"))[0], compute_live_features([], {}, 1, NOW))
+
+class TestPredictorReadsTable(unittest.TestCase):
+    def test_precomputed_features_skip_lta(self):
+        descriptor = make_descriptor("maxwell")
+        predictor = HawkerCrowdPredictor()
+        predictor.live_features = LiveFeatureRefresher(FakeLivePredictor([descriptor]), interval=60)
+        predictor.live_features.refresh()
+
+        # No LTA client is configured, so any live fetch would fail and fall back to defaults
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            row = predictor.extract_raw_features(descriptor.id, datetime(2025, 4, 1, 12, 30), descriptor=descriptor)
+
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(row[4:10], list(predictor.live_features.get(descriptor)[0]))
+        self.assertEqual(row[:4], [12, 0.5, 0, 1])
+
+    def test_missing_table_falls_back_to_live_fetch(self):
+        predictor = HawkerCrowdPredictor()
+
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            row = predictor.extract_raw_features("maxwell", NOW, descriptor=make_descriptor("maxwell"))
+
+        self.assertIn("Error getting carpark data", output.getvalue())
+        self.assertEqual(row[4:10], list(compute_live_features([], {}, 1, NOW)))
+
+
+    def test_listeners_run_after_the_first_refresh(self):
+        predictor = HawkerCrowdPredictor()
+        predictor.lta_client = predictor.hawker_index = object() # Only checked to be configured
+        predictor.live_features = LiveFeatureRefresher(FakeLivePredictor([make_descriptor("maxwell")]), interval=3600)
+        refreshed = threading.Event()
+
+        predictor.start_live_feature_refresher(listeners=[refreshed.set])
+        self.addCleanup(predictor.live_features.stop)
+
+        self.assertTrue(refreshed.wait(5))
+        self.assertEqual(predictor.live_features.refreshes, 1)
@@ -0,0 +1,94 @@
+import hashlib
+import random
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+from mock_predictions import MockPredictionEngine, time_window
+
+def legacy_mock_prediction(hawker_center_id, now):
+    '''The mock prediction as previously computed, reseeding the global random module.'''
+    hash_obj = hashlib.md5(hawker_center_id.encode())
+    hash_int = int(hash_obj.hexdigest(), 16)
+    random.seed(hash_int)
+
+    levels = ['Low', 'Medium', 'High']
+    level_weights = [0.4, 0.4, 0.2]
+
+    hour = now.hour
+    weekday = now.weekday()
+    is_weekend = weekday >= 5
+
+    if is_weekend and (11 <= hour <= 14 or 17 <= hour <= 20):
+        level_weights = [0.1, 0.3, 0.6]
+    elif not is_weekend and (11 <= hour <= 14):
+        level_weights = [0.2, 0.5, 0.3]
+    elif 17 <= hour <= 20:
+        level_weights = [0.2, 0.6, 0.2]
+
+    level = random.choices(levels, weights=level_weights)[0]
+    confidence = 0.5 + (hash_int % 50) / 100.0
+    return level, confidence
+
+# Every hour of a weekday and a weekend day
+HOURS = [datetime(2025, 4, 4, 0, 30) + timedelta(hours=hour) for hour in range(48)]
+
+class TestMockPredictionEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = MockPredictionEngine()
+        self.hawker_ids = [f"hawker-{i}" for i in range(300)] + ["67eb5b1339be5295141f78e8", "ChIJseQsTQ0Z2jERqpBTWF0Zf84", ""]
+        self.random_state = random.getstate()
+
+    def tearDown(self):
+        random.setstate(self.random_state)
+
+    def test_matches_legacy_for_every_hour(self):
+        for now in HOURS:
+            for hawker_id in self.hawker_ids:
+                self.assertEqual(self.engine.predict(hawker_id, now), legacy_mock_prediction(hawker_id, now),
+                                 (hawker_id, now))
+
+    def test_batch_matches_single_predictions(self):
+        for now in HOURS:
+            self.assertEqual(self.engine.predict_batch(self.hawker_ids, now),
+                             [self.engine.predict(hawker_id, now) for hawker_id in self.hawker_ids])
+        self.assertEqual(self.engine.predict_batch([]), [])
+
+    def test_global_random_is_untouched(self):
+        random.seed(42)
+        expected = [random.random() for _ in range(3)]
+
+        random.seed(42)
+        self.engine.predict("hawker-1")
+        self.engine.predict_batch(self.hawker_ids)
+
+        self.assertEqual([random.random() for _ in range(3)], expected)
+
+    def test_draws_are_cached_per_id(self):
+        self.engine.predict_batch(self.hawker_ids)
+        self.engine.predict_batch(self.hawker_ids)
+
+        stats = self.engine.stats()
+        self.assertEqual(stats["misses"], len(self.hawker_ids))
+        self.assertEqual(stats["hits"], len(self.hawker_ids))
+
+    def test_consistent_across_threads(self):
+        expected = self.engine.predict_batch(self.hawker_ids, HOURS[12])
+        results = []
+
+        def predict():
+            results.append(MockPredictionEngine().predict_batch(self.hawker_ids, HOURS[12]))
+
+        threads = [threading.Thread(target=predict) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [expected] * 4)
+
+    def test_time_windows(self):
+        self.assertEqual(time_window(datetime(2025, 4, 4, 12)), "weekday_lunch")
+        self.assertEqual(time_window(datetime(2025, 4, 4, 18)), "dinner")
+        self.assertEqual(time_window(datetime(2025, 4, 5, 18)), "weekend_meals")
+        self.assertEqual(time_window(datetime(2025, 4, 5, 9)), "default")
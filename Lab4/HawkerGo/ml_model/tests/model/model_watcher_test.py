@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from serve import ModelWatcher
+
+class TestModelWatcher(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.directory.name, "model.pkl")
+        self.write(1)
+        self.loaded = True
+        self.reloads = 0
+        self.restarts = 0
+        self.watcher = ModelWatcher(self.model_path, self.reload, self.restart)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def reload(self):
+        self.reloads += 1
+        return self.loaded
+
+    def restart(self):
+        self.restarts += 1
+
+    def write(self, mtime):
+        with open(self.model_path, "wb") as f:
+            f.write(b"model")
+        os.utime(self.model_path, ns=(mtime * 10**9, mtime * 10**9))
+
+    def test_unchanged_file_is_not_reloaded(self):
+        self.assertFalse(self.watcher.check())
+        self.assertFalse(self.watcher.check())
+        self.assertEqual(self.reloads, 0)
+
+    def test_reloads_once_file_is_stable(self):
+        self.write(2)
+        self.assertFalse(self.watcher.check()) # Possibly still being written
+
+        self.write(3)
+        self.assertFalse(self.watcher.check())
+
+        self.assertTrue(self.watcher.check())
+        self.assertEqual((self.reloads, self.restarts), (1, 1))
+        self.assertFalse(self.watcher.check())
+
+    def test_failed_reload_does_not_restart(self):
+        self.loaded = False
+        self.write(2)
+        self.watcher.check()
+
+        self.assertFalse(self.watcher.check())
+        self.assertEqual((self.reloads, self.restarts), (1, 0))
+        # The broken file is not retried until it changes again
+        self.assertFalse(self.watcher.check())
+        self.assertEqual(self.reloads, 1)
+
+    def test_missing_file_is_ignored(self):
+        os.remove(self.model_path)
+        self.assertFalse(self.watcher.check())
+        self.assertEqual(self.reloads, 0)
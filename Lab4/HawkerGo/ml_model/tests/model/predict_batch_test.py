@@ -0,0 +1,95 @@
+import contextlib
+import io
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from model import HawkerCrowdPredictor
+
+FEATURE_COLUMNS = [
+    'hour', 'minute', 'is_weekend', 'is_peak_hours', 'available_lots', 'occupancy_rate',
+    'num_full_carparks', 'num_bus_services', 'bus_frequency', 'buses_arriving_soon',
+    'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'
+]
+
+def make_training_data(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame(rng.random((rows, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    data['hour'] = rng.integers(0, 24, rows)
+    data['hawker_center_id'] = 'hawker'
+    data['timestamp'] = datetime(2025, 1, 1)
+    data['crowd_level'] = np.where(data['hour'] < 8, 'Low', np.where(data['hour'] < 16, 'Medium', 'High'))
+    return data
+
+class OfflinePredictor(HawkerCrowdPredictor):
+    '''Predictor whose hawker centers have distinct but fixed feature rows.'''
+
+    def get_hawker_center_by_id(self, hawker_center_id):
+        if hawker_center_id == "broken":
+            raise ValueError("No data for hawker center")
+        return {"id": hawker_center_id, "bus_stops": [], "carparks": []}
+
+    def extract_raw_features(self, hawker_center_id, now, descriptor=None):
+        self.get_hawker_center_by_id(hawker_center_id)
+        rng = np.random.default_rng(abs(hash(hawker_center_id)) % 2**32)
+        row = list(rng.random(len(FEATURE_COLUMNS)))
+        row[0] = int(rng.integers(0, 24))
+        return row
+
+class CountingModel:
+    '''Wraps a fitted classifier and counts predict_proba calls.'''
+
+    def __init__(self, model):
+        self.model = model
+        self.classes_ = model.classes_
+        self.proba_calls = 0
+
+    def predict_proba(self, features):
+        self.proba_calls += 1
+        return self.model.predict_proba(features)
+
+class TestPredictCrowdBatch(unittest.TestCase):
+    def setUp(self):
+        self.predictor = OfflinePredictor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.predictor.train_model(make_training_data())
+        self.hawker_ids = [f"hawker-{i}" for i in range(50)]
+
+    def test_batch_matches_single_predictions(self):
+        levels = {0: 'Low', 1: 'Medium', 2: 'High'}
+        now = datetime.now()
+
+        batch = self.predictor.predict_crowd_batch(self.hawker_ids)
+
+        for hawker_id, (level, confidence) in zip(self.hawker_ids, batch):
+            features = self.predictor.scaler.transform(
+                np.array(self.predictor.extract_raw_features(hawker_id, now), dtype=float).reshape(1, -1))
+            self.assertEqual(level, levels[self.predictor.model.predict(features)[0]])
+            self.assertAlmostEqual(confidence, max(self.predictor.model.predict_proba(features)[0]))
+
+    def test_single_forest_evaluation(self):
+        self.predictor.model = CountingModel(self.predictor.model)
+
+        self.predictor.predict_crowd_batch(self.hawker_ids)
+
+        self.assertEqual(self.predictor.model.proba_calls, 1)
+
+    def test_failed_rows_fall_back_to_mock(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            batch = self.predictor.predict_crowd_batch(["hawker-1", "broken", "hawker-2"])
+
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(batch[1], self.predictor.get_consistent_mock_prediction("broken"))
+        self.assertEqual(batch[0], self.predictor.predict_crowd("hawker-1"))
+
+    def test_sources_report_failed_rows(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            batch = self.predictor.predict_crowd_batch(["hawker-1", "broken", "hawker-2"], with_sources=True)
+
+        self.assertEqual([source for _, _, source in batch], [None, "error_fallback", None])
+        self.assertEqual(batch[1][:2], self.predictor.get_consistent_mock_prediction("broken"))
+
+        self.predictor.model = None
+        self.assertEqual(self.predictor.predict_crowd_batch(["hawker-1"], with_sources=True)[0][2], "mock_prediction")
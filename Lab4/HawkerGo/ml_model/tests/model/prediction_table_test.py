@@ -0,0 +1,140 @@
+import contextlib
+import io
+import json
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from hawker_index import HawkerDescriptor
+from live_features import LiveFeatureRefresher, LiveFeatures
+from model import HawkerCrowdPredictor
+from prediction_table import PredictionTable
+
+FEATURE_COLUMNS = [
+    'hour', 'minute', 'is_weekend', 'is_peak_hours', 'available_lots', 'occupancy_rate',
+    'num_full_carparks', 'num_bus_services', 'bus_frequency', 'buses_arriving_soon',
+    'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'
+]
+
+def make_training_data(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame(rng.random((rows, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    data['hour'] = rng.integers(0, 24, rows)
+    data['hawker_center_id'] = 'hawker'
+    data['timestamp'] = datetime(2025, 1, 1)
+    data['crowd_level'] = np.where(data['available_lots'] < 0.3, 'High',
+                                   np.where(data['available_lots'] < 0.6, 'Medium', 'Low'))
+    return data
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class FakeIndex:
+    def __init__(self, descriptors):
+        self.descriptors = descriptors
+        self.version = 1
+
+    def all(self):
+        return self.descriptors
+
+    def resolve(self, hawker_id):
+        return next((d for d in self.descriptors if hawker_id in (d.object_id, d.id)), None)
+
+class StaticRefresher(LiveFeatureRefresher):
+    '''Serves a fixed live feature row per hawker center instead of fetching LTA data.'''
+
+    def refresh(self):
+        rng = np.random.default_rng(self.refreshes)
+        table = {descriptor.object_id: LiveFeatures(*rng.random(6)) for descriptor in self.predictor.hawker_index.all()}
+        self._table = (table, self._clock())
+        self.refreshes += 1
+
+class TestPredictionTable(unittest.TestCase):
+    def setUp(self):
+        self.descriptors = [
+            HawkerDescriptor(object_id=f"oid-{i}", id=f"place-{i}", display_name=f"Hawker {i}", latitude=1.3,
+                             longitude=103.8, postal_code="069184", carpark_ids=(), bus_stop_codes=())
+            for i in range(40)
+        ]
+        self.predictor = HawkerCrowdPredictor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.predictor.train_model(make_training_data())
+        self.predictor.hawker_index = FakeIndex(self.descriptors)
+        self.wall_clock = FakeClock(1000.0)
+        self.predictor.live_features = StaticRefresher(self.predictor, interval=60, clock=self.wall_clock)
+        self.predictor.live_features.refresh()
+
+        self.clock = FakeClock(datetime(2025, 4, 5, 12, 30, 10))
+        self.table = PredictionTable(self.predictor, clock=self.clock)
+
+    def test_table_matches_predictor(self):
+        snapshot = self.table.current()
+
+        # The predictor scores each hawker center from the same live feature table
+        hawker_ids = [descriptor.id for descriptor in self.descriptors]
+        rows = np.array([self.predictor.extract_raw_features(hawker_id, self.clock.now) for hawker_id in hawker_ids])
+        probabilities = self.predictor.model.predict_proba(self.predictor.scaler.transform(rows))
+
+        levels = {0: 'Low', 1: 'Medium', 2: 'High'}
+        for hawker_id, row_probabilities in zip(hawker_ids, probabilities):
+            level, confidence = snapshot.lookup(hawker_id)
+            self.assertEqual(level, levels[self.predictor.model.classes_[row_probabilities.argmax()]])
+            self.assertAlmostEqual(confidence, row_probabilities.max())
+        self.assertEqual(snapshot.lookup("oid-3"), snapshot.lookup("place-3"))
+        self.assertIsNone(snapshot.lookup("unknown"))
+
+    def test_recomputed_only_when_minute_or_live_features_change(self):
+        first = self.table.current()
+        self.clock.now += timedelta(seconds=30)
+        self.assertIs(self.table.current(), first)
+
+        self.clock.now += timedelta(seconds=30)
+        next_minute = self.table.current()
+        self.assertIsNot(next_minute, first)
+
+        self.wall_clock.now += 60
+        self.predictor.live_features.refresh()
+        self.assertIsNot(self.table.current(), next_minute)
+        self.assertEqual(self.table.recomputes, 3)
+
+    def test_etag_only_changes_with_the_response(self):
+        first = self.table.current()
+        self.clock.now += timedelta(minutes=1)
+        next_minute = self.table.current()
+
+        self.assertIsNot(next_minute, first)
+        self.assertEqual(next_minute.etag == first.etag, next_minute.all_body() == first.all_body())
+
+        # Unchanged predictions keep their ETag; new live features change it
+        self.predictor.model.predict_proba = lambda features: np.tile([0.7, 0.2, 0.1], (len(features), 1))
+        self.clock.now += timedelta(minutes=1)
+        constant = self.table.current()
+        self.clock.now += timedelta(minutes=1)
+        self.assertEqual(self.table.current().etag, constant.etag)
+
+        self.wall_clock.now += 60
+        self.predictor.live_features.refresh()
+        self.assertNotEqual(self.table.current().etag, constant.etag)
+
+    def test_all_body_is_built_once(self):
+        snapshot = self.table.current()
+
+        body = snapshot.all_body()
+
+        self.assertIs(snapshot.all_body(), body)
+        results = json.loads(body)
+        self.assertEqual([result["hawker_id"] for result in results], [d.object_id for d in self.descriptors])
+        self.assertEqual(results[0]["features_as_of"], 1000.0)
+
+    def test_no_table_without_model_or_live_features(self):
+        self.predictor.live_features = LiveFeatureRefresher(self.predictor)
+        self.assertIsNone(self.table.current())
+
+        self.predictor.model = None
+        self.assertIsNone(self.table.current())